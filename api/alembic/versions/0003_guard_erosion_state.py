@@ -0,0 +1,31 @@
+"""add guard erosion state
+
+Revision ID: 0003_guard_erosion_state
+Revises: 0002_add_user_auth
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_guard_erosion_state"
+down_revision = "0002_add_user_auth"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "guard_erosion_state",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("score", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("turns", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("recent_json", sa.JSON(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("guard_erosion_state")
@@ -0,0 +1,183 @@
+"""compact orchestrator logs: templates, monthly partitions, daily roll-up
+
+Revision ID: 0004_compact_orchestrator_logs
+Revises: 0003_guard_erosion_state
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_compact_orchestrator_logs"
+down_revision = "0003_guard_erosion_state"
+branch_labels = None
+depends_on = None
+
+LOG_COLUMNS = "id, user_id, input_json, output_json, risk_json, created_at"
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _partition_orchestrator_logs() -> None:
+    """Rebuild orchestrator_logs as a table partitioned by month (Postgres)."""
+    bind = op.get_bind()
+    op.execute("ALTER TABLE orchestrator_logs RENAME TO orchestrator_logs_unpartitioned")
+    op.execute(
+        """
+        CREATE TABLE orchestrator_logs (
+            id VARCHAR NOT NULL,
+            user_id VARCHAR NOT NULL REFERENCES users (id),
+            input_json JSON,
+            output_json JSON,
+            template_hash VARCHAR(64) REFERENCES orchestrator_log_templates (hash),
+            vars_json JSON,
+            risk_json JSON,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE orchestrator_logs_default PARTITION OF orchestrator_logs DEFAULT")
+
+    # One partition per month holding existing rows, through two months ahead
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM orchestrator_logs_unpartitioned")).scalar()
+    month = _month_start(oldest or now)
+    last = _next_month(_next_month(_month_start(now)))
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE orchestrator_logs_y{month.year:04d}m{month.month:02d} PARTITION OF orchestrator_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+
+    op.execute(f"INSERT INTO orchestrator_logs ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM orchestrator_logs_unpartitioned")
+    op.execute("DROP TABLE orchestrator_logs_unpartitioned")
+    op.create_index("ix_orchestrator_logs_user_id", "orchestrator_logs", ["user_id"])
+    op.create_index("ix_orchestrator_logs_created_at", "orchestrator_logs", ["created_at"])
+
+
+def _expand_compact_rows() -> None:
+    """Write full output_json back into rows stored as template + vars."""
+    bind = op.get_bind()
+    templates_table = sa.table("orchestrator_log_templates", sa.column("hash"), sa.column("body_json", sa.JSON))
+    logs = sa.table(
+        "orchestrator_logs",
+        sa.column("id"),
+        sa.column("output_json", sa.JSON),
+        sa.column("template_hash"),
+        sa.column("vars_json", sa.JSON),
+        sa.column("risk_json", sa.JSON),
+    )
+    templates = dict(bind.execute(sa.select(templates_table.c.hash, templates_table.c.body_json)).all())
+    rows = bind.execute(
+        sa.select(logs.c.id, logs.c.template_hash, logs.c.vars_json, logs.c.risk_json).where(
+            logs.c.template_hash.is_not(None)
+        )
+    ).all()
+    for log_id, template, variables, risk in rows:
+        output = dict(templates[template])
+        for key, value in (variables or {}).items():
+            # "section.field", or a top-level field such as "message" (see app.log_store.expand_output)
+            if "." not in key:
+                output[key] = value
+                continue
+            section, field = key.split(".", 1)
+            output[section] = {**output.get(section, {}), field: value}
+        if risk is not None:
+            output["telemetry"] = {**output.get("telemetry", {}), "risk": risk}
+        bind.execute(sa.update(logs).where(logs.c.id == log_id).values(output_json=output))
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orchestrator_log_templates",
+        sa.Column("hash", sa.String(length=64), primary_key=True),
+        sa.Column("body_json", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "orchestrator_log_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("agent", sa.String(), primary_key=True),
+        sa.Column("risk_level", sa.String(), primary_key=True),
+        sa.Column("blocked", sa.Boolean(), primary_key=True),
+        sa.Column("turns", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("users", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("flags_json", sa.JSON(), nullable=True),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        _partition_orchestrator_logs()
+        return
+
+    # SQLite (and anything without declarative partitioning): plain table plus archive
+    with op.batch_alter_table("orchestrator_logs") as batch_op:
+        batch_op.add_column(sa.Column("template_hash", sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column("vars_json", sa.JSON(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_orchestrator_logs_template_hash", "orchestrator_log_templates", ["template_hash"], ["hash"]
+        )
+        batch_op.create_index("ix_orchestrator_logs_created_at", ["created_at"])
+    op.create_table(
+        "orchestrator_logs_archive",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("input_json", sa.JSON(), nullable=True),
+        sa.Column("output_json", sa.JSON(), nullable=True),
+        sa.Column("template_hash", sa.String(length=64), nullable=True),
+        sa.Column("vars_json", sa.JSON(), nullable=True),
+        sa.Column("risk_json", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_orchestrator_logs_archive_created_at", "orchestrator_logs_archive", ["created_at"])
+
+
+def downgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+    if not is_postgres:
+        # Archived rows go back to the main table before it loses its new columns
+        op.execute(
+            "INSERT INTO orchestrator_logs (id, user_id, input_json, output_json, template_hash, vars_json, "
+            "risk_json, created_at) SELECT id, user_id, input_json, output_json, template_hash, vars_json, "
+            "risk_json, created_at FROM orchestrator_logs_archive"
+        )
+        op.drop_index("ix_orchestrator_logs_archive_created_at", table_name="orchestrator_logs_archive")
+        op.drop_table("orchestrator_logs_archive")
+    _expand_compact_rows()
+
+    if is_postgres:
+        op.execute("ALTER TABLE orchestrator_logs RENAME TO orchestrator_logs_partitioned")
+        op.execute("ALTER INDEX ix_orchestrator_logs_user_id RENAME TO ix_orchestrator_logs_user_id_partitioned")
+        op.create_table(
+            "orchestrator_logs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False, index=True),
+            sa.Column("input_json", sa.JSON(), nullable=True),
+            sa.Column("output_json", sa.JSON(), nullable=True),
+            sa.Column("risk_json", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        )
+        op.execute(
+            f"INSERT INTO orchestrator_logs ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM orchestrator_logs_partitioned"
+        )
+        op.execute("DROP TABLE orchestrator_logs_partitioned")
+    else:
+        with op.batch_alter_table("orchestrator_logs") as batch_op:
+            batch_op.drop_index("ix_orchestrator_logs_created_at")
+            batch_op.drop_constraint("fk_orchestrator_logs_template_hash", type_="foreignkey")
+            batch_op.drop_column("vars_json")
+            batch_op.drop_column("template_hash")
+
+    op.drop_table("orchestrator_log_daily")
+    op.drop_table("orchestrator_log_templates")
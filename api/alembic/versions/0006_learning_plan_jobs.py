@@ -0,0 +1,42 @@
+"""add learning plan jobs
+
+Revision ID: 0006_learning_plan_jobs
+Revises: 0005_conversation_context
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_learning_plan_jobs"
+down_revision = "0005_conversation_context"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "learning_plan_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("progress", sa.Integer(), nullable=False),
+        sa.Column("request_json", sa.JSON(), nullable=False),
+        sa.Column("fallback_plan_id", sa.String(), sa.ForeignKey("learning_plans.id"), nullable=True),
+        sa.Column("plan_id", sa.String(), sa.ForeignKey("learning_plans.id"), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_learning_plan_jobs_user_id", "learning_plan_jobs", ["user_id"])
+    op.create_index("ix_learning_plan_jobs_status", "learning_plan_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_learning_plan_jobs_status", table_name="learning_plan_jobs")
+    op.drop_index("ix_learning_plan_jobs_user_id", table_name="learning_plan_jobs")
+    op.drop_table("learning_plan_jobs")
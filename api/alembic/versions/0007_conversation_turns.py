@@ -0,0 +1,93 @@
+"""store conversation context one row per turn
+
+Revision ID: 0007_conversation_turns
+Revises: 0006_learning_plan_jobs
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_conversation_turns"
+down_revision = "0006_learning_plan_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    turns = op.create_table(
+        "conversation_turns",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("turn_id", sa.String(), nullable=False),
+        sa.Column("user_message", sa.Text(), nullable=False),
+        sa.Column("agent", sa.String(), nullable=False),
+        sa.Column("reply", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.UniqueConstraint("user_id", "turn_id", name="uq_conversation_turns_user_turn"),
+    )
+    op.create_index("ix_conversation_turns_user_id", "conversation_turns", ["user_id"])
+
+    # Carry over the per-user ring buffers, oldest turn first
+    bind = op.get_bind()
+    context = sa.table("conversation_context", sa.column("user_id", sa.String()), sa.column("turns_json", sa.JSON()))
+    rows = [
+        {
+            "user_id": user_id,
+            "turn_id": str(item["turn_id"]),
+            "user_message": str(item.get("user_message", "")),
+            "agent": str(item.get("agent", "")),
+            "reply": str(item.get("reply", "")),
+            "created_at": float(item.get("created_at", 0.0)),
+        }
+        for user_id, turns_json in bind.execute(sa.select(context.c.user_id, context.c.turns_json))
+        for item in turns_json or []
+    ]
+    if rows:
+        op.bulk_insert(turns, rows)
+    op.drop_table("conversation_context")
+
+
+def downgrade() -> None:
+    context = op.create_table(
+        "conversation_context",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("turns_json", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    # Fold each user's turns back into one ring buffer, oldest turn first
+    bind = op.get_bind()
+    turns = sa.table(
+        "conversation_turns",
+        sa.column("id", sa.Integer()),
+        sa.column("user_id", sa.String()),
+        sa.column("turn_id", sa.String()),
+        sa.column("user_message", sa.Text()),
+        sa.column("agent", sa.String()),
+        sa.column("reply", sa.Text()),
+        sa.column("created_at", sa.Float()),
+    )
+    buffers: dict[str, list[dict]] = {}
+    rows = bind.execute(
+        sa.select(
+            turns.c.user_id, turns.c.turn_id, turns.c.user_message, turns.c.agent, turns.c.reply, turns.c.created_at
+        ).order_by(turns.c.user_id, turns.c.id)
+    )
+    for user_id, turn_id, user_message, agent, reply, created_at in rows:
+        buffers.setdefault(user_id, []).append(
+            {
+                "turn_id": turn_id,
+                "user_message": user_message,
+                "agent": agent,
+                "reply": reply,
+                "created_at": created_at,
+            }
+        )
+    if buffers:
+        op.bulk_insert(context, [{"user_id": user_id, "turns_json": items} for user_id, items in buffers.items()])
+
+    op.drop_index("ix_conversation_turns_user_id", table_name="conversation_turns")
+    op.drop_table("conversation_turns")
@@ -1,23 +1,27 @@
 from typing import Any
 
-from .utils import build_response
+from app.guard.schemas import AgentResponse
 
+from .templates import ResponseTemplate
 
-def respond(locale: str, context: dict[str, Any]) -> dict[str, Any]:
-    message = (
+TEMPLATE = ResponseTemplate(
+    "BuddyAgent",
+    (
         "Рад видеть тебя снова. Это нормально, что бывают паузы.\n\n"
         "Давай сделаем один микро-шаг на 5 минут: один короткий вопрос и ответ."
-    )
-
-    ui = {
+    ),
+    ui={
         "suggestions": [],
         "quick_replies": ["5 минут", "10 минут", "С завтрашнего дня"],
         "actions": [],
-    }
-
-    telemetry = {
+    },
+    telemetry={
         "events": ["buddy_reactivation", "soft_comeback_used"],
         "risk": {"blocked": False, "level": "low", "flags": [], "notes": ""},
-    }
+    },
+    handoff={"to_agent": "none"},
+)
+
 
-    return build_response("BuddyAgent", locale, message, ui=ui, telemetry=telemetry, handoff={"to_agent": "none"})
+def respond(locale: str, context: dict[str, Any]) -> AgentResponse:
+    return TEMPLATE.render(locale)
@@ -1,28 +1,148 @@
+"""
+Agent routing.
+
+Triggers are word-start stems ("устал" also matches "устала"), each with a
+weight. They are compiled once into a single trie-shaped regex, so a message
+is scanned in one pass however many triggers there are, and every agent is
+scored at once: an agent's score is the sum of the weights of its distinct
+triggers found in the message. The best score wins; ties go to the earlier
+agent in ROUTING_TRIGGERS. Confidence is the winner's share of all trigger
+weight found.
+"""
+
+import re
+from dataclasses import dataclass, field
 from typing import Any
 
+from app.guard.patterns import fold_text
+
+# Agent labels in tie-break order. "TutorWhy" is TutorAgent in rationale mode.
+ROUTING_TRIGGERS: dict[str, dict[str, float]] = {
+    "BuddyAgent": {
+        # ru
+        "пропал": 3, "устал": 3, "стыдно": 3, "нет времени": 3, "выгора": 3, "выгорел": 3,
+        "нет сил": 3, "сдаюсь": 3, "забросил": 3, "нет мотивации": 3, "надоело": 2,
+        "не успеваю": 2, "не получается": 2, "лень": 2, "грустно": 2, "тревож": 2,
+        "переживаю": 2, "стресс": 2, "бросить": 2, "тяжело": 1,
+        # en
+        "burned out": 3, "burnt out": 3, "burnout": 3, "exhausted": 3, "give up": 3,
+        "giving up": 3, "no motivation": 3, "unmotivated": 3, "overwhelmed": 3,
+        "ashamed": 3, "no time": 2, "tired": 2, "stressed": 2, "embarrassed": 2,
+    },
+    "PlannerAgent": {
+        # ru
+        "план": 3, "расписан": 3, "что дальше": 3, "с чего начать": 3, "следующий шаг": 3,
+        "график": 2, "цель": 2, "цели": 2, "на неделю": 2, "на месяц": 2, "дедлайн": 2,
+        "сколько времени": 2, "программа обучения": 2,
+        # en
+        "plan": 3, "schedule": 3, "roadmap": 3, "what next": 3, "next step": 3,
+        "where do i start": 3, "goal": 2, "deadline": 2, "timeline": 2,
+    },
+    "TutorWhy": {
+        # ru
+        "почему": 3, "объясни": 3, "зачем": 3, "в чём разница": 3, "в чем разница": 3,
+        "не понимаю": 2, "как правильно": 2, "что значит": 2, "правило": 2,
+        # en
+        "why": 3, "explain": 3, "difference between": 3, "how come": 2, "what does": 1,
+        "rule": 1,
+    },
+}
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Regex for a set of literals with shared prefixes merged (a trie)."""
+    trie: dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        # A word that prefixes longer triggers makes their tail optional; the
+        # greedy ? tries the longer trigger first
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if ends else body
+
+    return emit(trie)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Routing decision: the winning label, its confidence and all scores."""
 
-BUDDY_TRIGGERS = ["пропал", "устал", "стыдно", "нет времени", "выгораю"]
-PLANNER_TRIGGERS = ["план", "расписание", "что дальше"]
-TUTOR_WHY_TRIGGERS = ["почему", "объясни", "зачем"]
+    label: str | None
+    confidence: float
+    scores: dict[str, float] = field(default_factory=dict)
 
 
-def select_agent(message: str, fsm_state: str, context: dict[str, Any] | None, risk_level: str) -> tuple[str, dict[str, Any]]:
+class RoutingIndex:
+    """Weighted trigger automaton over folded (lowercased, normalized) text."""
+
+    def __init__(self, triggers: dict[str, dict[str, float]]):
+        self.labels = list(triggers)
+        self._owner: dict[str, tuple[str, float]] = {}
+        for label, weights in triggers.items():
+            for trigger, weight in weights.items():
+                key = fold_text(trigger)
+                if key in self._owner:
+                    raise ValueError(f"Trigger {trigger!r} is listed for more than one agent")
+                self._owner[key] = (label, float(weight))
+        self._pattern = re.compile(r"(?<!\w)" + _trie_pattern(list(self._owner)))
+
+    def score(self, folded: str) -> Route:
+        """Score every label against text already passed through fold_text()."""
+        owner = self._owner
+        scores: dict[str, float] = {}
+        seen = set()
+        for match in self._pattern.finditer(folded):
+            trigger = match.group()
+            if trigger not in seen:
+                seen.add(trigger)
+                label, weight = owner[trigger]
+                scores[label] = scores.get(label, 0.0) + weight
+        if not scores:
+            return Route(None, 0.0)
+        best = max(self.labels, key=lambda label: scores.get(label, 0.0))
+        return Route(best, round(scores[best] / sum(scores.values()), 2), scores)
+
+
+ROUTING_INDEX = RoutingIndex(ROUTING_TRIGGERS)
+
+
+def select_agent(
+    message: str,
+    fsm_state: str,
+    context: dict[str, Any] | None,
+    risk_level: str,
+    routing_text: str | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """
+    Pick the agent for a turn.
+
+    ``routing_text`` is the guard verdict's folded, normalized message; when
+    omitted the message is folded here. The returned context carries
+    ``routing_confidence`` (0.0 when no trigger matched).
+    """
     ctx = context.copy() if context else {}
-    lowered = message.lower()
 
     if risk_level == "high":
         return "BuddyAgent", {"blocked": True}
 
-    if any(trigger in lowered for trigger in BUDDY_TRIGGERS):
-        return "BuddyAgent", ctx
+    route = ROUTING_INDEX.score(fold_text(message) if routing_text is None else routing_text)
+    ctx["routing_confidence"] = route.confidence
 
-    if any(trigger in lowered for trigger in PLANNER_TRIGGERS):
-        return "PlannerAgent", ctx
-
-    if any(trigger in lowered for trigger in TUTOR_WHY_TRIGGERS):
+    if route.label == "TutorWhy":
         ctx["rationale_mode"] = True
         return "TutorAgent", ctx
 
+    if route.label is not None:
+        return route.label, ctx
+
     if "diagnostic" in fsm_state or (context and context.get("mode") == "diagnostic"):
         return "AssessorAgent", ctx
 
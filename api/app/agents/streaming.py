@@ -0,0 +1,40 @@
+"""
+Message sources for streamed orchestrator responses.
+
+An agent renders its response from a template; a message source then
+produces the user-visible message text for it, chunk by chunk. The
+template source releases the rendered message at once; app.bench.fake_llm
+has a source that stands in for a model. The orchestrator validates the
+generated text like any agent message (see with_message).
+"""
+
+from typing import Any, AsyncIterator, Protocol
+
+from app.guard.schemas import AgentResponse
+
+
+class MessageSource(Protocol):
+    def stream(self, response: AgentResponse, context: dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the message text for response in chunks."""
+        ...
+
+
+class TemplateSource:
+    """The rendered template message, as one chunk."""
+
+    async def stream(self, response: AgentResponse, context: dict[str, Any]) -> AsyncIterator[str]:
+        yield response.message
+
+
+def with_message(response: AgentResponse, message: str) -> AgentResponse:
+    """
+    response with message as its text, validated against the schema like
+    build_response's (stripped, non-empty, at most 4000 characters).
+    Raises pydantic.ValidationError otherwise.
+    """
+    return AgentResponse(**{**dict(response), "message": message})
+
+
+async def collect(source: MessageSource, response: AgentResponse, context: dict[str, Any]) -> str:
+    """The whole message from source (for non-streaming responses)."""
+    return "".join([chunk async for chunk in source.stream(response, context)])
@@ -0,0 +1,117 @@
+"""
+Precompiled, immutable agent response templates.
+
+Each agent's response skeleton is built and validated once, at import, and
+its blocks are frozen and shared by every response rendered from it.
+render() overlays the per-turn fields copy-on-write: the response object
+is new, and so is the learning block when it has per-turn values. The ui,
+telemetry and handoff blocks are the shared frozen instances. Code that
+changes a rendered response must assign a new block, e.g.
+``response.handoff = AgentHandoff(...)``, never mutate one in place.
+Nested plain lists and dicts inside frozen blocks (plan payloads, event
+lists) are shared too and must not be mutated.
+"""
+
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+from app.guard.schemas import (
+    AgentHandoff,
+    AgentLearning,
+    AgentResponse,
+    AgentTelemetry,
+    AgentTelemetryRisk,
+    AgentUI,
+    AgentUIAction,
+)
+
+from .utils import build_response
+
+
+# Frozen variants of the response blocks. Module-level so they pickle into
+# the guard process pool; serialized exactly like their parents.
+class FrozenUIAction(AgentUIAction):
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenUI(AgentUI):
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenLearning(AgentLearning):
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenTelemetryRisk(AgentTelemetryRisk):
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenTelemetry(AgentTelemetry):
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenHandoff(AgentHandoff):
+    model_config = ConfigDict(frozen=True)
+
+
+_FROZEN: dict[type[BaseModel], type[BaseModel]] = {
+    AgentUIAction: FrozenUIAction,
+    AgentUI: FrozenUI,
+    AgentLearning: FrozenLearning,
+    AgentTelemetryRisk: FrozenTelemetryRisk,
+    AgentTelemetry: FrozenTelemetry,
+    AgentHandoff: FrozenHandoff,
+}
+
+
+def freeze(block: BaseModel) -> BaseModel:
+    """Frozen copy of a validated response block (nested blocks included)."""
+    values = {}
+    for name, value in block.__dict__.items():
+        if isinstance(value, BaseModel):
+            value = freeze(value)
+        elif isinstance(value, list) and any(isinstance(item, BaseModel) for item in value):
+            value = [freeze(item) if isinstance(item, BaseModel) else item for item in value]
+        values[name] = value
+    return _FROZEN[type(block)].model_construct(_fields_set=block.model_fields_set, **values)
+
+
+class ResponseTemplate:
+    """An agent response skeleton, validated once and rendered per turn."""
+
+    def __init__(
+        self,
+        agent: str,
+        message: str,
+        ui: dict[str, Any] | None = None,
+        learning: dict[str, Any] | None = None,
+        telemetry: dict[str, Any] | None = None,
+        handoff: dict[str, Any] | None = None,
+    ):
+        # Full schema validation happens here, once per template
+        skeleton = build_response(agent, "ru", message, ui=ui, learning=learning, telemetry=telemetry, handoff=handoff)
+        self.agent = skeleton.agent
+        self.message = skeleton.message
+        self.ui = freeze(skeleton.ui)
+        self.learning = freeze(skeleton.learning)
+        self.telemetry = freeze(skeleton.telemetry)
+        self.handoff = freeze(skeleton.handoff)
+        self._learning_fields = dict(self.learning.__dict__)
+
+    def render(self, locale: str, learning: dict[str, Any] | None = None) -> AgentResponse:
+        """
+        Response for one turn.
+
+        ``learning`` holds the per-turn learning fields. They come from
+        request context, so the learning block is validated when given.
+        """
+        return AgentResponse.model_construct(
+            agent=self.agent,
+            locale=locale,
+            message=self.message,
+            ui=self.ui,
+            learning=self.learning if learning is None else AgentLearning(**{**self._learning_fields, **learning}),
+            telemetry=self.telemetry,
+            handoff=self.handoff,
+        )
@@ -1,5 +1,7 @@
 from typing import Any
 
+from app.guard.schemas import AgentResponse
+
 
 def build_response(
     agent: str,
@@ -9,18 +11,24 @@ def build_response(
     learning: dict[str, Any] | None = None,
     telemetry: dict[str, Any] | None = None,
     handoff: dict[str, Any] | None = None,
-) -> dict[str, Any]:
-    return {
-        "agent": agent,
-        "locale": locale,
-        "message": message,
-        "ui": ui
+) -> AgentResponse:
+    """
+    Build an agent response validated against the strict output schema.
+    
+    The result is trusted by output_check_v2 and the orchestrator, so schema
+    validation happens exactly once, here.
+    """
+    return AgentResponse(
+        agent=agent,
+        locale=locale,
+        message=message,
+        ui=ui
         or {
             "suggestions": [],
             "quick_replies": [],
             "actions": [],
         },
-        "learning": learning
+        learning=learning
         or {
             "fsm_state": "",
             "level": "unknown",
@@ -28,7 +36,7 @@ def build_response(
             "micro_fix": [],
             "mini_practice": None,
         },
-        "telemetry": telemetry
+        telemetry=telemetry
         or {
             "events": [],
             "risk": {
@@ -38,5 +46,5 @@ def build_response(
                 "notes": "",
             },
         },
-        "handoff": handoff or {"to_agent": "none"},
-    }
+        handoff=handoff or {"to_agent": "none"},
+    )
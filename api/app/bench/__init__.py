@@ -0,0 +1 @@
+"""Offline benchmarks for SmartSpeek API hot paths."""
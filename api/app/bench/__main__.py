@@ -0,0 +1,225 @@
+"""
+Offline load test for the whole API (main.app) with a fake Gemini.
+
+Drives the ASGI app in-process through httpx.ASGITransport, with the app's
+lifespan (log writer, guard pool) running as in production and every
+middleware in place. Before anything from app is imported, the harness:
+
+  - starts a local fake Gemini (app.bench.fake_gemini) with the given
+    latency and points LLM_API_BASE at it
+  - points DATABASE_URL at a fresh SQLite file (or --database-url), which
+    is seeded with app.seed plus --users synthetic users with JWTs
+
+Then --concurrency virtual users loop over a weighted scenario mix until
+--seconds have passed:
+
+    orchestrator   POST /api/orchestrator/message
+    dashboard      GET  /api/dashboard
+    courses        GET  /api/courses, then one course's lessons
+    minigame       start a true/false session, then answer + next per question
+    learning_plan  POST /api/learning-plan/generate (calls the fake Gemini)
+
+Reports requests, throughput and p50/p95/p99 latency per endpoint. 429s
+are counted apart from errors; rate limits are per user, so raise --users
+or pass --no-rate-limit to measure without them.
+
+Usage:
+    python -m app.bench [--seconds S] [--concurrency C] [--users N]
+                        [--llm-latency-ms MS] [--llm-jitter-ms MS]
+                        [--database-url URL] [--no-rate-limit]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+from app.bench.fake_gemini import FakeGemini
+
+SCENARIOS = {"orchestrator": 40, "dashboard": 15, "courses": 15, "minigame": 20, "learning_plan": 10}
+
+MESSAGES = [
+    "Как сказать, что я закончил задачу вчера?",
+    "I have went to the office yesterday",
+    "Почему здесь Present Perfect?",
+    "Составь план на неделю",
+    "Я устал, нет времени учиться",
+    "She don't like the new deploy process",
+]
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.limited: dict[str, int] = defaultdict(int)
+        self.topics: list[str] = []
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.samples[name].append(time.perf_counter() - start)
+        if response.status_code == 429:
+            self.limited[name] += 1
+        elif response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _seed_users(count: int) -> list[tuple[str, str]]:
+    """Create synthetic users and return (user_id, bearer token) pairs."""
+    from app.db import SessionLocal
+    from app.models import User, UserProfile
+    from app.security import create_access_token
+
+    users = [f"bench_{i:05d}" for i in range(count)]
+    with SessionLocal() as db:
+        for user_id in users:
+            db.add(User(id=user_id, email=f"{user_id}@bench.local", name=user_id))
+            db.add(UserProfile(user_id=user_id, fsm_state="lesson", level="B1", preferences_json={}))
+        db.commit()
+    return [(user_id, create_access_token({"sub": user_id})) for user_id in users]
+
+
+async def _orchestrator(client, record: Recorder, user_id: str, rng: random.Random) -> None:
+    payload = {"user_id": user_id, "last_user_message": rng.choice(MESSAGES), "turn_id": uuid4().hex}
+    await record.call(client, "orchestrator", "POST", "/api/orchestrator/message", json=payload)
+
+
+async def _dashboard(client, record: Recorder, user_id: str, rng: random.Random) -> None:
+    await record.call(client, "dashboard", "GET", "/api/dashboard")
+
+
+async def _courses(client, record: Recorder, user_id: str, rng: random.Random) -> None:
+    response = await record.call(client, "courses", "GET", "/api/courses")
+    if response.status_code == 200 and response.json():
+        course = rng.choice(response.json())
+        await record.call(client, "course_lessons", "GET", f"/api/courses/{course['id']}/lessons")
+
+
+async def _minigame(client, record: Recorder, user_id: str, rng: random.Random) -> None:
+    payload = {"topic_id": rng.choice(record.topics), "n_questions": 5}
+    response = await record.call(client, "minigame_start", "POST", "/api/minigames/truefalse/sessions", json=payload)
+    if response.status_code != 200:
+        return
+    session = response.json()
+    while session.get("status") == "active" and session.get("current_question"):
+        answer = {"question_id": session["current_question"]["id"], "user_answer": rng.random() < 0.5}
+        base = f"/api/minigames/truefalse/sessions/{session['id']}"
+        response = await record.call(client, "minigame_answer", "POST", f"{base}/answer", json=answer)
+        if response.status_code != 200:
+            return
+        response = await record.call(client, "minigame_next", "GET", f"{base}/next")
+        if response.status_code != 200:
+            return
+        session = response.json()
+
+
+async def _learning_plan(client, record: Recorder, user_id: str, rng: random.Random) -> None:
+    payload = {"plan_length": 7, "cefr_level": "B1", "goals": ["standups"], "role": "backend developer"}
+    await record.call(client, "learning_plan", "POST", "/api/learning-plan/generate", json=payload)
+
+
+RUNNERS = {
+    "orchestrator": _orchestrator,
+    "dashboard": _dashboard,
+    "courses": _courses,
+    "minigame": _minigame,
+    "learning_plan": _learning_plan,
+}
+
+
+async def _virtual_user(app, record: Recorder, users, deadline: float, seed: int) -> None:
+    import httpx
+
+    rng = random.Random(seed)
+    names, weights = list(SCENARIOS), list(SCENARIOS.values())
+    transport = httpx.ASGITransport(app=app, client=(f"10.0.{seed // 250}.{seed % 250}", 40000 + seed))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        while time.perf_counter() < deadline:
+            user_id, token = rng.choice(users)
+            client.headers["Authorization"] = f"Bearer {token}"
+            await RUNNERS[rng.choices(names, weights)[0]](client, record, user_id, rng)
+
+
+def _report(record: Recorder, elapsed: float, gemini: FakeGemini) -> None:
+    print(f"{elapsed:.1f}s, fake Gemini calls: {gemini.calls}")
+    print(f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'429':>6}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = sorted(record.samples.items())
+    rows.append(("all", [sample for _, samples in rows for sample in samples]))
+    for name, samples in rows:
+        ordered = sorted(samples)
+        errors = sum(record.errors.values()) if name == "all" else record.errors[name]
+        limited = sum(record.limited.values()) if name == "all" else record.limited[name]
+        print(
+            f"{name:<16}{len(ordered):>9}{errors:>8}{limited:>6}{len(ordered) / elapsed:>9.1f}"
+            + "".join(f"{_percentile(ordered, f) * 1e3:>8.1f}ms" for f in (0.50, 0.95, 0.99))
+        )
+
+
+async def _run(args: argparse.Namespace, gemini: FakeGemini) -> None:
+    # Imported only now: settings are read from the environment set up in main()
+    import main as api
+    from sqlalchemy import func
+
+    from app.db import SessionLocal
+    from app.models import GlossaryTerm
+    from app.seed import seed
+
+    seed()
+    users = _seed_users(args.users)
+    record = Recorder()
+    with SessionLocal() as db:
+        # Topics with fewer than three terms cannot start a quiz
+        playable = db.query(GlossaryTerm.topic_id).group_by(GlossaryTerm.topic_id).having(func.count() >= 3)
+        record.topics = [topic_id for (topic_id,) in playable]
+    if args.no_rate_limit:
+        # The middleware reads this dict when the stack is built on first request
+        api.rate_limits.clear()
+
+    async with api.app.router.lifespan_context(api.app):
+        start = time.perf_counter()
+        deadline = start + args.seconds
+        await asyncio.gather(
+            *(_virtual_user(api.app, record, users, deadline, seed) for seed in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - start
+    _report(record, elapsed, gemini)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20.0, help="load duration")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users running at once")
+    parser.add_argument("--users", type=int, default=200, help="synthetic accounts the virtual users rotate over")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="fake Gemini response latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0, help="uniform jitter around the latency")
+    parser.add_argument("--database-url", help="seed and use this database instead of a fresh SQLite file")
+    parser.add_argument("--no-rate-limit", action="store_true", help="disable the per-user rate limits")
+    args = parser.parse_args()
+
+    gemini = FakeGemini(args.llm_latency_ms, args.llm_jitter_ms)
+    gemini.start()
+    os.environ["LLM_API_BASE"] = gemini.url
+    os.environ.setdefault("LLM_API_KEY", "bench-key")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    try:
+        asyncio.run(_run(args, gemini))
+    finally:
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
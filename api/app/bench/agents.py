@@ -0,0 +1,91 @@
+"""
+Per-call cost of agent responses: validate per call vs precompiled template.
+
+    per call  rebuild the response dicts (a recursive copy of the skeleton
+              stands in for the literals agents used to build) and validate
+              them with build_response, as every call used to
+    template  agent.respond(): the precompiled template overlaid with the
+              per-turn fields
+
+Reports microseconds per call and bytes retained per response (memory that
+stays allocated while the response is alive).
+
+Usage:
+    python -m app.bench.agents [--calls N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from app.agents import assessor, buddy, planner, tutor
+from app.agents.utils import build_response
+
+AGENTS = {"tutor": tutor, "buddy": buddy, "planner": planner, "assessor": assessor}
+
+CONTEXT = {
+    "last_user_message": "I am work on the feature yesterday",
+    "fsm_state": "lesson",
+    "locale": "ru",
+}
+
+
+def _copy_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+def _per_call(module) -> Callable[[], Any]:
+    skeleton = module.respond("ru", dict(CONTEXT)).model_dump()
+
+    def call():
+        fresh = _copy_json(skeleton)
+        return build_response(
+            fresh["agent"],
+            "ru",
+            fresh["message"],
+            ui=fresh["ui"],
+            learning=fresh["learning"],
+            telemetry=fresh["telemetry"],
+            handoff=fresh["handoff"],
+        )
+
+    return call
+
+
+def _measure(func: Callable[[], Any], calls: int) -> tuple[float, float]:
+    func()
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    per_call = (time.perf_counter() - start) / calls
+
+    tracemalloc.start()
+    kept = [func() for _ in range(1000)]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return per_call, retained / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000, help="calls per agent and variant")
+    args = parser.parse_args()
+
+    print(f"{'agent':<10}{'per call':>12}{'template':>12}{'bytes/resp':>18}")
+    for name, module in AGENTS.items():
+        before, before_bytes = _measure(_per_call(module), args.calls)
+        after, after_bytes = _measure(lambda: module.respond("ru", dict(CONTEXT)), args.calls)
+        print(
+            f"{name:<10}{before * 1e6:>10.1f}us{after * 1e6:>10.1f}us"
+            f"{before_bytes:>9.0f} -> {after_bytes:<6.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
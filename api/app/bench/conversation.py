@@ -0,0 +1,74 @@
+"""
+Request size and parse cost: client-resent history vs server-side context.
+
+    resent     the client sends its last K messages in
+               context.recent_messages on every turn; the route parses them
+               into OrchestratorRequest
+    turn id    the client sends a turn id only; the orchestrator reads the
+               history from ConversationStore (in-memory hit)
+
+Reports bytes per request and microseconds per request for the parse plus,
+for the turn id variant, the store lookup.
+
+Usage:
+    python -m app.bench.conversation [--requests N] [--turns 10,50,200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+# Settings require a database URL; the bench never touches the database
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from app.conversation import ConversationStore, Turn
+from app.schemas import OrchestratorRequest
+
+MESSAGE = "Yesterday I have went to the office and my manager ask me about the report"
+
+
+def _body(history: int, server_side: bool) -> bytes:
+    payload = {"user_id": "user-1", "locale": "ru", "fsm_state": "lesson", "last_user_message": MESSAGE}
+    if server_side:
+        payload["turn_id"] = "0f8c2b1e-6d1a-4a53-9d54-1c0e5b7a3c21"
+    else:
+        payload["context"] = {"recent_messages": [f"{MESSAGE} ({i})" for i in range(history)]}
+    return json.dumps(payload, ensure_ascii=False).encode()
+
+
+async def _per_request(body: bytes, store: ConversationStore | None, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        payload = OrchestratorRequest.model_validate_json(body)
+        if store is not None:
+            await store.recent(payload.user_id)
+    return (time.perf_counter() - start) / requests
+
+
+async def _run(args: argparse.Namespace) -> None:
+    print(f"{'turns':>6}{'resent':>22}{'turn id':>22}")
+    for history in (int(turns) for turns in args.turns.split(",")):
+        store = ConversationStore(max_turns=history)
+        for i in range(history):
+            await store.append("user-1", Turn(turn_id=str(i), user_message=f"{MESSAGE} ({i})", agent="TutorAgent", reply=""))
+        resent, compact = _body(history, False), _body(history, True)
+        before = await _per_request(resent, None, args.requests)
+        after = await _per_request(compact, store, args.requests)
+        print(
+            f"{history:>6}{len(resent):>9}B {before * 1e6:>8.1f}us"
+            f"{len(compact):>9}B {after * 1e6:>8.1f}us"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per variant and history length")
+    parser.add_argument("--turns", default="10,50,200", help="history lengths to compare")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
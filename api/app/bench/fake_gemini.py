@@ -0,0 +1,191 @@
+"""
+Local fake of the Gemini generateContent API for benchmarks.
+
+Answers POST /v1beta/models/{model}:generateContent after a configurable
+latency (plus uniform jitter) with a response shaped like Gemini's, and
+:streamGenerateContent?alt=sse with the same text as SSE chunks of
+``chunk_chars`` characters, ``token_ms`` apart. generateContent also
+waits for the chunks it would have streamed, so both take equally long
+to finish. Learning-plan prompts get a valid plan for the requested plan_length;
+everything else gets a short JSON feedback text. Runs under uvicorn in a
+child process; point the API at it with LLM_API_BASE=server.url.
+
+Imports nothing from app, so it can be started before the API's settings
+are loaded.
+"""
+
+import asyncio
+import json
+import random
+import multiprocessing
+import socket
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+PLAN_MARKER = "LEARNING PLAN GENERATOR"
+
+
+def _plan(user_input: dict) -> dict:
+    length = int(user_input.get("plan_length", 7))
+    level = user_input.get("cefr_level", "B1")
+    lessons = [
+        {
+            "lesson_index": index,
+            "title": f"Standup updates {index}",
+            "goals": ["Give a short status update", "Ask a clarifying question"],
+            "focus_terms": [f"term_{index}"],
+            "activities": [
+                {
+                    "type": "mcq",
+                    "prompt": f"What does 'term_{index}' mean?",
+                    "options": ["A work term", "A database", "A pattern", "A framework"],
+                    "answer_key": 0,
+                    "explanation_simple": "It is used in daily updates.",
+                }
+            ],
+        }
+        for index in range(1, length + 1)
+    ]
+    return {
+        "cefr_level": level,
+        "plan_length": length,
+        "persona": {"role": user_input.get("role") or "IT role", "tone": "supportive"},
+        "plan_summary": "Plan for daily work communication.",
+        "lessons": lessons,
+    }
+
+
+def _answer(prompt: str) -> str:
+    if PLAN_MARKER in prompt:
+        _, _, raw_input = prompt.partition("User input:\n")
+        try:
+            user_input = json.loads(raw_input)
+        except json.JSONDecodeError:
+            user_input = {}
+        return json.dumps(_plan(user_input), ensure_ascii=False)
+    return json.dumps({"feedback": "Good answer. Try a shorter sentence.", "score": 0.8})
+
+
+def _create_app(
+    calls, latency_ms: float, jitter_ms: float, seed: int, token_ms: float, chunk_chars: int
+) -> Starlette:
+    rng = random.Random(seed)
+
+    async def _text(request: Request) -> str:
+        with calls.get_lock():
+            calls.value += 1
+        body = await request.json()
+        prompt = "".join(
+            part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+        )
+        delay = latency_ms + rng.uniform(-jitter_ms, jitter_ms)
+        await asyncio.sleep(max(delay, 0.0) / 1000)
+        return _answer(prompt)
+
+    def _chunk(text: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+    async def generate(request: Request) -> JSONResponse:
+        text = await _text(request)
+        await asyncio.sleep(token_ms * -(-len(text) // chunk_chars) / 1000)
+        return JSONResponse(_chunk(text))
+
+    async def stream_generate(request: Request) -> StreamingResponse:
+        text = await _text(request)
+
+        async def events():
+            for start in range(0, len(text), chunk_chars):
+                if start:
+                    await asyncio.sleep(token_ms / 1000)
+                yield f"data: {json.dumps(_chunk(text[start : start + chunk_chars]))}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(
+        routes=[
+            Route("/v1beta/models/{model}:generateContent", generate, methods=["POST"]),
+            Route("/v1beta/models/{model}:streamGenerateContent", stream_generate, methods=["POST"]),
+        ]
+    )
+
+
+def _serve(sock: socket.socket, calls, *options) -> None:
+    config = uvicorn.Config(_create_app(calls, *options), log_level="warning", lifespan="off")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class FakeGemini:
+    """
+    The fake API served by uvicorn in a child process on localhost.
+
+    A separate process keeps the fake off the caller's GIL and event loop,
+    which would otherwise add their own stalls to every measured call.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        seed: int = 0,
+        token_ms: float = 0.0,
+        chunk_chars: int = 64,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        self.token_ms = token_ms
+        self.chunk_chars = chunk_chars
+        self._context = multiprocessing.get_context("spawn")
+        self._calls = self._context.Value("i", 0)
+        self._socket: socket.socket | None = None
+        self._process = None
+
+    @property
+    def calls(self) -> int:
+        return self._calls.value
+
+    def _bind(self) -> socket.socket:
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            # Accepted connections inherit this; uvicorn only sets it on sockets it creates
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._socket.bind(("127.0.0.1", 0))
+            # Connections made before the child is serving wait in the backlog
+            self._socket.listen(128)
+        return self._socket
+
+    @property
+    def url(self) -> str:
+        """Base URL; known before start() (the port is bound up front)."""
+        host, port = self._bind().getsockname()
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._process = self._context.Process(
+            target=_serve,
+            args=(
+                self._bind(),
+                self._calls,
+                self.latency_ms,
+                self.jitter_ms,
+                self.seed,
+                self.token_ms,
+                self.chunk_chars,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=5)
+            self._process = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
@@ -0,0 +1,32 @@
+"""
+Local stand-in for an LLM behind the orchestrator's message source.
+
+FakeLLMSource emits the agent's rendered message token by token with a
+configurable time to first token; app.bench.streaming installs it as
+orchestrator.MESSAGE_SOURCE to measure streaming without a model.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator
+
+from app.guard.schemas import AgentResponse
+
+
+class FakeLLMSource:
+    """
+    Waits ``first_token_ms``, then yields the rendered message in tokens of
+    ``chars_per_token`` characters, ``token_ms`` apart.
+    """
+
+    def __init__(self, first_token_ms: float = 300.0, token_ms: float = 20.0, chars_per_token: int = 4):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.chars_per_token = chars_per_token
+
+    async def stream(self, response: AgentResponse, context: dict[str, Any]) -> AsyncIterator[str]:
+        message = response.message
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for start in range(0, len(message), self.chars_per_token):
+            if start:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield message[start : start + self.chars_per_token]
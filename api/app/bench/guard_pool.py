@@ -0,0 +1,113 @@
+"""
+DB-bound latency under guard load, threadpool vs process pool.
+
+Seeds a throwaway SQLite database, then measures /api/dashboard latency
+while concurrent clients hammer /api/orchestrator/message with unique
+(uncacheable) guard-heavy messages. Runs once with the guard in the shared
+threadpool (GUARD_POOL_WORKERS=0 behaviour) and once in the process pool.
+
+Usage:
+    python -m app.bench.guard_pool [--clients N] [--samples N] [--workers N] [--niceness N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+# Long, mostly non-ASCII messages: normalization plus every pattern family
+_FILLER = "Как правильно сказать на созвоне, что задача почти готова? " * 90
+
+
+def _build_app():
+    from fastapi import FastAPI
+
+    from app.routers import dashboard, orchestrator
+
+    # No rate limiting or CORS: only the routes under test
+    app = FastAPI()
+    app.include_router(dashboard.router, prefix="/api")
+    app.include_router(orchestrator.router, prefix="/api")
+    return app, orchestrator.GUARD_EXECUTOR
+
+
+async def _dashboard_latencies(client, headers: dict, samples: int) -> list[float]:
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        response = await client.get("/api/dashboard", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def _guard_load(client, stop: asyncio.Event, worker: int) -> int:
+    sent = 0
+    while not stop.is_set():
+        message = f"{sent} {worker} {_FILLER}"[:6000]
+        await client.post(
+            "/api/orchestrator/message",
+            json={"user_id": "user_demo", "last_user_message": message},
+        )
+        sent += 1
+    return sent
+
+
+async def _run(app, headers: dict, clients: int, samples: int) -> tuple[list[float], float]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        start = time.perf_counter()
+        load = [asyncio.create_task(_guard_load(client, stop, i)) for i in range(clients)]
+        await asyncio.sleep(0.2)
+        latencies = await _dashboard_latencies(client, headers, samples)
+        stop.set()
+        sent = sum(await asyncio.gather(*load))
+        return latencies, sent / (time.perf_counter() - start)
+
+
+def _summary(latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"p50 {statistics.median(ordered) * 1e3:6.1f}ms  p95 {p95 * 1e3:6.1f}ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent orchestrator clients")
+    parser.add_argument("--samples", type=int, default=100, help="dashboard requests per scenario")
+    parser.add_argument("--workers", type=int, default=2, help="guard process pool size")
+    parser.add_argument("--niceness", type=int, default=None, help="nice increment for guard workers")
+    args = parser.parse_args()
+
+    from app.seed import seed
+    from app.security import create_access_token
+
+    seed()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user_demo'})}"}
+    app, executor = _build_app()
+    executor.max_pending = max(executor.max_pending, args.clients * 2)
+
+    idle, _ = asyncio.run(_run(app, headers, 0, args.samples))
+    print(f"{'no guard load':<24}{_summary(idle)}")
+
+    for label, workers in (("guard in threadpool", 0), (f"guard in {args.workers} processes", args.workers)):
+        executor.shutdown()
+        executor.workers = workers
+        if args.niceness is not None:
+            executor.niceness = args.niceness
+        latencies, rate = asyncio.run(_run(app, headers, args.clients, args.samples))
+        print(f"{label:<24}{_summary(latencies)}  ({rate:.0f} orchestrator req/s)")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
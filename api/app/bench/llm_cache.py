@@ -0,0 +1,105 @@
+"""
+Latency and provider calls for repeated diagnostic prompts, with and
+without the LLM response cache (app.llm_cache).
+
+Sends --requests evaluate_diagnostic prompts through ai._call_gemini to a
+local fake Gemini (app.bench.fake_gemini). Prompts are drawn from
+--distinct question/answer pairs with a skewed distribution (fixed
+questions, common answers repeat):
+
+    off     no cache: every request goes to the provider
+    memory  in-memory LRU tier
+    disk    SQLite file tier only (memory tier disabled), i.e. what a
+            fresh worker process sees
+
+Usage:
+    python -m app.bench.llm_cache [--requests N] [--distinct K] [--llm-latency-ms MS]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.bench.fake_gemini import FakeGemini
+
+
+def _prompts(requests: int, distinct: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    pairs = [(f"Fix the sentence #{i}: I have went home", f"I went home ({i})") for i in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return [
+        {"step_type": "grammar", "question": question, "answer": answer}
+        for question, answer in rng.choices(pairs, weights, k=requests)
+    ]
+
+
+async def _run(args: argparse.Namespace, gemini: FakeGemini) -> None:
+    # Imported only now: settings are read from the environment set up in main()
+    from app.llm_cache import LLMResponseCache, SqliteResponseStore
+    from app.routers import ai
+
+    variants = {
+        "off": LLMResponseCache(max_entries=0),
+        "memory": LLMResponseCache(),
+        "disk": LLMResponseCache(
+            max_entries=0, disk=SqliteResponseStore(os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite3"))
+        ),
+    }
+    prompts = _prompts(args.requests, args.distinct)
+    print(f"{args.requests} requests over {args.distinct} distinct prompts, fake LLM {args.llm_latency_ms:.0f}ms")
+    print(f"{'':8}{'median':>10}{'p95':>10}{'provider calls':>16}")
+    for name, cache in variants.items():
+        ai.LLM_CACHE = cache
+        before = gemini.calls
+        timings = []
+        for answer in prompts:
+            request_body = {
+                "contents": [
+                    {
+                        "parts": [
+                            {
+                                "text": (
+                                    "Ты — профессиональный методист английского языка. Оцени ответ студента. "
+                                    f"Тип задания: {answer['step_type']}. Вопрос: {answer['question']}. "
+                                    f"Ответ студента: {answer['answer']}."
+                                )
+                            }
+                        ]
+                    }
+                ]
+            }
+            start = time.perf_counter()
+            await ai._call_gemini(ai.DEFAULT_MODEL, request_body, "evaluate_diagnostic")
+            timings.append(time.perf_counter() - start)
+        ordered = sorted(timings)
+        print(
+            f"{name:<8}{statistics.median(ordered) * 1e3:>8.2f}ms"
+            f"{ordered[round(0.95 * len(ordered)) - 1] * 1e3:>8.2f}ms{gemini.calls - before:>16}"
+        )
+    await ai.LLM_CLIENT.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="requests per variant")
+    parser.add_argument("--distinct", type=int, default=40, help="distinct question/answer pairs")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="fake Gemini response latency")
+    args = parser.parse_args()
+
+    gemini = FakeGemini(args.llm_latency_ms, jitter_ms=0)
+    gemini.start()
+    os.environ["LLM_API_BASE"] = gemini.url
+    os.environ.setdefault("LLM_API_KEY", "bench-key")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    try:
+        asyncio.run(_run(args, gemini))
+    finally:
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
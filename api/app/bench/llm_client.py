@@ -0,0 +1,112 @@
+"""
+Per-call overhead of the Gemini client: a new httpx client per call vs
+the shared pool (app.llm.GeminiClient).
+
+Calls a local fake Gemini (app.bench.fake_gemini) with zero latency, so
+what is left is client construction, connection setup and the request
+itself:
+
+    per-call  ``async with httpx.AsyncClient()`` / ``with httpx.Client()``
+              around every request (the old ai / learning_plan code)
+    pooled    one client whose keep-alive connections are reused
+
+The fake runs on plain HTTP over loopback, so the numbers leave out the
+TLS handshake that a new connection to the real API also pays.
+
+Usage:
+    python -m app.bench.llm_client [--requests N] [--concurrency C]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# Settings require a database URL; the bench never touches the database
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import httpx
+
+from app.bench.fake_gemini import FakeGemini
+from app.llm import GeminiClient
+
+PAYLOAD = {"contents": [{"parts": [{"text": "Give one tip for standups."}]}]}
+
+
+async def _per_call_async(url: str) -> None:
+    async with httpx.AsyncClient(timeout=30) as client:
+        (await client.post(url, params={"key": "bench"}, json=PAYLOAD)).raise_for_status()
+
+
+def _per_call_sync(url: str) -> None:
+    with httpx.Client(timeout=30) as client:
+        client.post(url, params={"key": "bench"}, json=PAYLOAD).raise_for_status()
+
+
+async def _timed_async(call, requests: int, concurrency: int) -> list[float]:
+    timings: list[float] = []
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            start = time.perf_counter()
+            await call()
+            timings.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    return timings
+
+
+def _timed_sync(call, requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _row(name: str, timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[max(0, round(0.95 * len(ordered)) - 1)]
+    return f"{name:<18}{statistics.median(ordered) * 1e3:>9.2f}ms{p95 * 1e3:>9.2f}ms"
+
+
+async def _run(args: argparse.Namespace, gemini: FakeGemini) -> None:
+    client = GeminiClient(gemini.url, "bench")
+    url = client.url()
+
+    async def pooled_async() -> None:
+        (await client.generate(PAYLOAD)).raise_for_status()
+
+    def pooled_sync() -> None:
+        client.generate_sync(PAYLOAD).raise_for_status()
+
+    # Warm up the fake server and the pools
+    await pooled_async()
+    pooled_sync()
+
+    print(f"{args.requests} requests, async concurrency {args.concurrency} (median, p95)")
+    print(_row("async per-call", await _timed_async(lambda: _per_call_async(url), args.requests, args.concurrency)))
+    print(_row("async pooled", await _timed_async(pooled_async, args.requests, args.concurrency)))
+    print(_row("sync per-call", _timed_sync(lambda: _per_call_sync(url), args.requests)))
+    print(_row("sync pooled", _timed_sync(pooled_sync, args.requests)))
+    await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="requests per variant")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent async callers")
+    args = parser.parse_args()
+
+    gemini = FakeGemini(latency_ms=0, jitter_ms=0)
+    gemini.start()
+    try:
+        asyncio.run(_run(args, gemini))
+    finally:
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
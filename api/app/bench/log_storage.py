@@ -0,0 +1,88 @@
+"""
+Bytes per orchestrator_logs row, full JSON vs template + vars.
+
+Builds a realistic mix of tutor, buddy and planner turns with the real
+agents, stores them once as before (full output_json plus risk_json) and
+once compacted (see app.log_store) in two throwaway SQLite files, and
+compares the file sizes after VACUUM.
+
+Usage:
+    python -m app.bench.log_storage [--rows N]
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timezone
+
+# Settings require a database URL; the bench uses its own files
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.agents import buddy, planner, tutor
+from app.db import Base
+from app.log_store import TemplateStore
+from app.models import OrchestratorLog
+
+MIX = [tutor] * 5 + [buddy] * 3 + [planner] * 2
+
+
+def _rows(count: int) -> list[dict]:
+    rows = []
+    for i in range(count):
+        message = f"Как сказать, что я закончил задачу номер {i}?"
+        response = MIX[i % len(MIX)].respond("ru", {"last_user_message": message, "fsm_state": "learning"})
+        output = response.model_dump()
+        rows.append(
+            {
+                "id": f"log-{i:08d}",
+                "user_id": f"user-{i % 500}",
+                "input_json": {"message": message},
+                "output_json": output,
+                "risk_json": output["telemetry"]["risk"],
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
+    return rows
+
+
+def _store(path: str, rows: list[dict], compact: bool) -> int:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    templates = TemplateStore()
+    with session_factory() as db:
+        for start in range(0, len(rows), 500):
+            batch = rows[start : start + 500]
+            if compact:
+                batch, hashes = templates.compact_rows(db, batch)
+            else:
+                batch = [{**row, "template_hash": None, "vars_json": None} for row in batch]
+            db.execute(insert(OrchestratorLog), batch)
+            db.commit()
+            if compact:
+                templates.remember(hashes)
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    engine.dispose()
+    return os.path.getsize(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="log rows to store")
+    args = parser.parse_args()
+
+    rows = _rows(args.rows)
+    directory = tempfile.mkdtemp()
+    full = _store(os.path.join(directory, "full.db"), rows, compact=False)
+    compact = _store(os.path.join(directory, "compact.db"), rows, compact=True)
+    print(f"full JSON        {full / args.rows:8.0f} bytes/row  ({full / 2**20:.1f} MiB)")
+    print(f"template + vars  {compact / args.rows:8.0f} bytes/row  ({compact / 2**20:.1f} MiB)")
+    print(f"reduction        {full / compact:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
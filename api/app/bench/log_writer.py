@@ -0,0 +1,94 @@
+"""
+Orchestrator latency with write-through vs write-behind audit logging.
+
+Seeds a database (a throwaway SQLite file unless DATABASE_URL is set, so
+Postgres can be measured too), then drives /api/orchestrator/message
+with concurrent clients twice: once committing each OrchestratorLog row
+in the request (writer not started) and once through the background
+writer. Guard checks run in the threadpool to keep the pool out of the
+comparison.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m app.bench.log_writer [--clients N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+MESSAGES = [
+    "Как сказать на созвоне, что задача почти готова?",
+    "Помоги составить план на неделю",
+    "Проверь фразу: I have finished the task yesterday",
+]
+
+
+def _build_app():
+    from fastapi import FastAPI
+
+    from app.routers import orchestrator
+
+    app = FastAPI()
+    app.include_router(orchestrator.router, prefix="/api")
+    orchestrator.GUARD_EXECUTOR.workers = 0
+    return app, orchestrator.LOG_WRITER
+
+
+async def _client(client, requests: int, worker: int, latencies: list[float]) -> None:
+    for i in range(requests):
+        # Unique text per request: every call misses the verdict cache
+        message = f"{MESSAGES[i % len(MESSAGES)]} ({worker}-{i})"
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/orchestrator/message",
+            json={"user_id": "user_demo", "last_user_message": message},
+        )
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def _run(app, writer, write_behind: bool, clients: int, requests: int) -> tuple[list[float], float]:
+    import httpx
+
+    if write_behind:
+        await writer.start()
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_client(client, requests, i, latencies) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+    # Shutdown flush is part of the cost of the run
+    await writer.stop()
+    return latencies, clients * requests / elapsed
+
+
+def _summary(latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    return f"p50 {statistics.median(ordered) * 1e3:6.1f}ms  p99 {p99 * 1e3:6.1f}ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    args = parser.parse_args()
+
+    from app.seed import seed
+
+    seed()
+    app, writer = _build_app()
+    for label, write_behind in (("commit in request", False), ("write-behind", True)):
+        latencies, rate = asyncio.run(_run(app, writer, write_behind, args.clients, args.requests))
+        print(f"{label:<20}{_summary(latencies)}  ({rate:.0f} req/s)")
+
+
+if __name__ == "__main__":
+    main()
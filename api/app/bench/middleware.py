@@ -0,0 +1,130 @@
+"""
+Per-request middleware overhead on /api/health.
+
+Calls the ASGI app directly (no HTTP client in the loop) with no
+middleware, with the previous BaseHTTPMiddleware implementations (kept
+here as a reference) and with the pure-ASGI ones, and reports the cost
+added on top of the bare route.
+
+Usage:
+    python -m app.bench.middleware [--requests N]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Callable
+
+# Settings require a database URL even though nothing here touches the DB
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.guard.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from app.guard.ratelimit import MemoryRateLimitStore
+
+LIMITS = {
+    "/api/auth/login": (10, 60),
+    "/api/auth/register": (10, 60),
+    "/api/orchestrator/message": (30, 60),
+    "/api/ai": (20, 60),
+}
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Previous implementation, kept for comparison."""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["Referrer-Policy"] = "no-referrer"
+        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+        response.headers["Content-Security-Policy"] = (
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https:; "
+            "font-src 'self' data:;"
+        )
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """Previous dispatch path for /api/health, kept for comparison."""
+
+    def __init__(self, app, limits: dict[str, tuple[int, int]]):
+        super().__init__(app)
+        self.limits = limits
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.url.path == "/api/health":
+            return await call_next(request)
+        return await call_next(request)
+
+
+def _build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/health")
+    def health_check():
+        return {"status": "ok"}
+
+    if variant == "legacy":
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+        app.add_middleware(LegacyRateLimitMiddleware, limits=LIMITS)
+    elif variant == "asgi":
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RateLimitMiddleware, limits=LIMITS, store=MemoryRateLimitStore())
+    return app
+
+
+async def _per_request(app: FastAPI, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/health",
+        "raw_path": b"/api/health",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="requests per variant")
+    args = parser.parse_args()
+
+    timings = {
+        variant: asyncio.run(_per_request(_build_app(variant), args.requests))
+        for variant in ("bare", "legacy", "asgi")
+    }
+    bare = timings["bare"]
+    for variant, seconds in timings.items():
+        overhead = "" if variant == "bare" else f"  (+{(seconds - bare) * 1e6:.1f}us middleware)"
+        print(f"{variant:<8}{seconds * 1e6:8.1f}us/request{overhead}")
+
+
+if __name__ == "__main__":
+    main()
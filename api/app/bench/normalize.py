@@ -0,0 +1,128 @@
+"""
+Micro-benchmark for normalize_for_guard.
+
+Compares the current normalizer with the previous implementation (kept here
+as a reference) on 1 KB, 4 KB and 6 KB inputs, reporting time per call and
+bytes allocated per call.
+
+Usage:
+    python -m app.bench.normalize [--repeat N]
+"""
+
+import argparse
+import base64
+import timeit
+import tracemalloc
+import unicodedata
+import urllib.parse
+from typing import Callable, Tuple
+
+from app.guard.patterns import MAX_INPUT_CHARS
+from app.guard.utils import normalize_for_guard
+
+SIZES = {"1KB": 1024, "4KB": 4096, "6KB": 6000}
+
+SAMPLES = {
+    "ascii": "Could you check my standup update about the feature we shipped yesterday? ",
+    "cyrillic": "Как правильно использовать Present Perfect в рабочих письмах? ",
+    "zero_width": "Как\u200bправильно использовать\u200d Present Perfect? ",
+}
+
+
+def legacy_normalize_for_guard(text: str) -> Tuple[str, dict]:
+    """Previous normalizer, kept verbatim for comparison."""
+    metadata = {
+        "original_length": len(text),
+        "normalizations_applied": [],
+    }
+    normalized = unicodedata.normalize("NFKC", text)
+    metadata["normalizations_applied"].append("NFKC")
+    original_normalized = normalized
+    for char in ["\u200B", "\u200C", "\u200D", "\uFEFF"]:
+        normalized = normalized.replace(char, "")
+    if normalized != original_normalized:
+        metadata["normalizations_applied"].append("zero_width_removal")
+    try:
+        decoded = urllib.parse.unquote(normalized)
+        if decoded != normalized:
+            normalized = decoded
+            metadata["normalizations_applied"].append("url_decode")
+    except Exception:
+        pass
+    base64_like = len(normalized) > 10 and all(
+        c.isalnum() or c in "+/=" for c in normalized.replace(" ", "").replace("\n", "")
+    )
+    if base64_like:
+        try:
+            decoded_bytes = base64.b64decode(normalized.replace(" ", "").replace("\n", ""), validate=True)
+            decoded_str = decoded_bytes.decode("utf-8", errors="ignore")
+            if decoded_str.isprintable() and len(decoded_str) > 5:
+                normalized = decoded_str
+                metadata["normalizations_applied"].append("base64_decode")
+        except Exception:
+            pass
+    if len(normalized) > MAX_INPUT_CHARS:
+        normalized = normalized[:MAX_INPUT_CHARS]
+        metadata["normalizations_applied"].append("truncated")
+        metadata["truncated_to"] = MAX_INPUT_CHARS
+    metadata["normalized_length"] = len(normalized)
+    return normalized, metadata
+
+
+def _make_input(sample: str, size: int) -> str:
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def _allocated_bytes(func: Callable[[str], object], text: str) -> int:
+    """Total bytes allocated by one call (tracemalloc peak above baseline)."""
+    func(text)  # warm up caches
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func(text)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - baseline)
+
+
+def _time_per_call_us(func: Callable[[str], object], text: str, repeat: int) -> float:
+    timer = timeit.Timer(lambda: func(text))
+    return min(timer.repeat(repeat=5, number=repeat)) / repeat * 1e6
+
+
+def run(repeat: int = 2000) -> list[dict]:
+    rows = []
+    for sample_name, sample in SAMPLES.items():
+        for size_name, size in SIZES.items():
+            text = _make_input(sample, size)
+            assert normalize_for_guard(text) == legacy_normalize_for_guard(text)
+            rows.append(
+                {
+                    "input": f"{sample_name}/{size_name}",
+                    "legacy_us": _time_per_call_us(legacy_normalize_for_guard, text, repeat),
+                    "current_us": _time_per_call_us(normalize_for_guard, text, repeat),
+                    "legacy_bytes": _allocated_bytes(legacy_normalize_for_guard, text),
+                    "current_bytes": _allocated_bytes(normalize_for_guard, text),
+                }
+            )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per timing sample")
+    args = parser.parse_args()
+
+    print(f"{'input':<20}{'legacy us':>12}{'current us':>12}{'speedup':>9}{'legacy B':>11}{'current B':>11}")
+    for row in run(args.repeat):
+        speedup = row["legacy_us"] / row["current_us"] if row["current_us"] else float("inf")
+        print(
+            f"{row['input']:<20}{row['legacy_us']:>12.1f}{row['current_us']:>12.1f}{speedup:>8.1f}x"
+            f"{row['legacy_bytes']:>11}{row['current_bytes']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
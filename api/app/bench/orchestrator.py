@@ -0,0 +1,126 @@
+"""
+Throughput benchmark for the orchestrator response path.
+
+Runs each agent, the output guard and response serialization the way the
+route does, and reports responses per second for:
+
+    before  agents build dicts (emulated by dumping the rendered response
+            into fresh dicts), output_check_v2 validates and dumps them,
+            FastAPI validates the dict again against OrchestratorResponse
+    after   agents build a validated AgentResponse, output_check_v2 only
+            checks content, the route serializes it directly
+
+Usage:
+    python -m app.bench.orchestrator [--seconds N]
+"""
+
+import argparse
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.agents import assessor, buddy, planner, tutor
+from app.guard.guard_v2 import output_check_v2
+from app.schemas import OrchestratorResponse
+
+AGENTS = {"tutor": tutor, "buddy": buddy, "planner": planner, "assessor": assessor}
+
+CONTEXT = {
+    "last_user_message": "I am work on the feature yesterday",
+    "fsm_state": "lesson",
+    "locale": "ru",
+}
+
+
+def legacy_build_response(
+    agent: str,
+    locale: str,
+    message: str,
+    ui: dict[str, Any] | None = None,
+    learning: dict[str, Any] | None = None,
+    telemetry: dict[str, Any] | None = None,
+    handoff: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Previous dict-returning build_response, kept for comparison."""
+    return {
+        "agent": agent,
+        "locale": locale,
+        "message": message,
+        "ui": ui or {"suggestions": [], "quick_replies": [], "actions": []},
+        "learning": learning
+        or {"fsm_state": "", "level": "unknown", "confidence_score": 0.0, "micro_fix": [], "mini_practice": None},
+        "telemetry": telemetry
+        or {"events": [], "risk": {"blocked": False, "level": "low", "flags": [], "notes": ""}},
+        "handoff": handoff or {"to_agent": "none"},
+    }
+
+
+@contextmanager
+def _legacy_agents() -> Iterator[None]:
+    originals = {name: module.respond for name, module in AGENTS.items()}
+
+    def dict_agent(respond: Callable[..., Any]) -> Callable[..., dict[str, Any]]:
+        return lambda locale, context: legacy_build_response(**respond(locale, context).model_dump())
+
+    for name, module in AGENTS.items():
+        module.respond = dict_agent(originals[name])
+    try:
+        yield
+    finally:
+        for name, module in AGENTS.items():
+            module.respond = originals[name]
+
+
+def _response_field():
+    """Same field FastAPI builds for response_model=OrchestratorResponse."""
+    return create_model_field(name="Response_orchestrator", type_=OrchestratorResponse, mode="serialization")
+
+
+def _before(module, field, loop: asyncio.AbstractEventLoop) -> bytes:
+    response = output_check_v2(module.respond("ru", dict(CONTEXT)))["response"]
+    content = loop.run_until_complete(serialize_response(field=field, response_content=response))
+    return JSONResponse(content).body
+
+
+def _after(module) -> bytes:
+    response = output_check_v2(module.respond("ru", dict(CONTEXT)))["response"]
+    return response.public_json().encode()
+
+
+def _throughput(func: Callable[[], bytes], seconds: float) -> float:
+    func()  # warm up
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            func()
+        calls += 50
+    return calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="measurement time per case")
+    args = parser.parse_args()
+
+    field = _response_field()
+    loop = asyncio.new_event_loop()
+    try:
+        print(f"{'agent':<10}{'before':>12}{'after':>12}{'speedup':>10}")
+        for name, module in AGENTS.items():
+            with _legacy_agents():
+                before = _throughput(lambda: _before(module, field, loop), args.seconds)
+            after = _throughput(lambda: _after(module), args.seconds)
+            print(f"{name:<10}{before:>10.0f}/s{after:>10.0f}/s{after / before:>9.2f}x")
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
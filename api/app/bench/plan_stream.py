@@ -0,0 +1,116 @@
+"""
+Background plan generation: when lesson 1 of the LLM plan becomes usable,
+buffered vs streamed (LEARNING_PLAN_STREAM).
+
+Runs the PLAN_JOBS handler (learning_plan._generate_plan_job) against a
+local fake Gemini (app.bench.fake_gemini) that writes the plan out in
+chunks ``--token-ms`` apart, on a file SQLite database, and polls the
+database for the new plan's lessons:
+
+    buffered  one generateContent call; every lesson is stored at the end
+    streamed  streamGenerateContent; each lesson is stored as it arrives
+
+Usage:
+    python -m app.bench.plan_stream [--plan-length 7|21] [--runs N] [--llm-latency-ms MS] [--token-ms MS]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from uuid import uuid4
+
+from app.bench.fake_gemini import FakeGemini
+
+
+async def _generate(learning_plan, runner, db_factory, payload) -> tuple[float, float]:
+    """One job; seconds until lesson 1 and until the whole plan were stored."""
+    from app.models import LearningPlan, LearningPlanLesson, User
+
+    with db_factory() as db:
+        user = User(id=str(uuid4()), name="bench")
+        db.add(user)
+        fallback = learning_plan._persist_plan(db, user.id, payload, learning_plan._fallback_plan(payload))
+        db.commit()
+        job = {
+            "id": "bench",
+            "user_id": user.id,
+            "request": payload.model_dump(),
+            "fallback_plan_id": fallback.id,
+            "plan_id": None,
+        }
+
+    def stored() -> int:
+        with db_factory() as db:
+            return (
+                db.query(LearningPlanLesson)
+                .join(LearningPlan, LearningPlan.id == LearningPlanLesson.plan_id)
+                .filter(LearningPlan.user_id == job["user_id"], LearningPlan.id != job["fallback_plan_id"])
+                .count()
+            )
+
+    start = time.perf_counter()
+    task = asyncio.ensure_future(learning_plan._generate_plan_job(job, runner))
+    first = None
+    while not task.done():
+        if first is None and await asyncio.to_thread(stored):
+            first = time.perf_counter() - start
+        await asyncio.sleep(0.005)
+    total = time.perf_counter() - start
+    if await task is None:
+        raise RuntimeError("plan job was superseded")
+    return first if first is not None else total, total
+
+
+async def _run(args: argparse.Namespace) -> None:
+    # Imported only now: settings are read from the environment set up in main()
+    from app.db import Base, SessionLocal, engine
+    from app.plan_jobs import PlanJobRunner
+    from app.routers import learning_plan
+    from app.schemas import LearningPlanGenerateRequest
+
+    Base.metadata.create_all(engine)
+    runner = PlanJobRunner(SessionLocal, learning_plan._generate_plan_job)
+    payload = LearningPlanGenerateRequest(plan_length=args.plan_length, cefr_level="B1", goals=["standups"])
+    # Warm-up: connection to the fake, imports, first SQLite writes
+    await learning_plan.LLM_CLIENT.generate({"contents": [{"parts": [{"text": "ping"}]}]})
+
+    print(
+        f"{args.plan_length}-lesson plan x {args.runs} runs, fake LLM {args.llm_latency_ms:.0f}ms"
+        f" + {args.token_ms:.0f}ms per {args.chunk_chars}-char chunk"
+    )
+    print(f"{'':10}{'lesson 1 usable':>17}{'plan complete':>15}")
+    for name, stream in (("buffered", False), ("streamed", True)):
+        learning_plan.settings.learning_plan_stream = stream
+        results = [await _generate(learning_plan, runner, SessionLocal, payload) for _ in range(args.runs)]
+        first = statistics.median(r[0] for r in results)
+        total = statistics.median(r[1] for r in results)
+        print(f"{name:<10}{first * 1e3:>15.0f}ms{total * 1e3:>13.0f}ms")
+    await learning_plan.LLM_CLIENT.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plan-length", type=int, choices=(7, 21), default=21, help="lessons in the plan")
+    parser.add_argument("--runs", type=int, default=5, help="plans generated per mode")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="fake Gemini time to first chunk")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="fake Gemini delay between chunks")
+    parser.add_argument("--chunk-chars", type=int, default=64, help="characters per streamed chunk")
+    args = parser.parse_args()
+
+    gemini = FakeGemini(args.llm_latency_ms, jitter_ms=0, token_ms=args.token_ms, chunk_chars=args.chunk_chars)
+    gemini.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LLM_API_BASE"] = gemini.url
+        os.environ.setdefault("LLM_API_KEY", "bench-key")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/plans.db"
+        try:
+            asyncio.run(_run(args))
+        finally:
+            gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
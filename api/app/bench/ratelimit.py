@@ -0,0 +1,112 @@
+"""
+Per-request cost and memory of the rate limiter versus client count.
+
+Replays round-robin traffic from N distinct clients over ten simulated
+minutes (so periodic cleanup kicks in) against the previous timestamp-list
+limiter (kept here as a reference) and the sliding-window limiter with the
+in-process and shared-memory stores. Reports mean and worst per-request
+time and retained memory per client.
+
+Usage:
+    python -m app.bench.ratelimit [--clients 1000,10000,100000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable
+
+from app.guard.ratelimit import MemoryRateLimitStore, SharedMemoryRateLimitStore, SlidingWindowLimiter
+
+LIMIT, WINDOW = 30, 60
+SIMULATED_SECONDS = 600
+
+
+class LegacyLimiter:
+    """Previous timestamp-list limiter, kept for comparison."""
+
+    def __init__(self) -> None:
+        self.requests: dict[str, list[float]] = defaultdict(list)
+        self._cleanup_interval = 300
+        self._last_cleanup = 0.0
+
+    def hit(self, identifier: str, now: float) -> bool:
+        if now - self._last_cleanup > self._cleanup_interval:
+            cutoff = now - WINDOW
+            for key in list(self.requests.keys()):
+                self.requests[key] = [ts for ts in self.requests[key] if ts > cutoff]
+                if not self.requests[key]:
+                    del self.requests[key]
+            self._last_cleanup = now
+        in_window = [ts for ts in self.requests[identifier] if now - ts < WINDOW]
+        self.requests[identifier] = in_window
+        if len(in_window) >= LIMIT:
+            return False
+        in_window.append(now)
+        return True
+
+
+def _replay(hit: Callable[[str, float], object], clients: int, trace: bool = False) -> tuple[float, float, int]:
+    """Return (mean seconds, worst seconds, retained bytes) for the replay."""
+    total = max(200_000, 2 * clients)
+    step = SIMULATED_SECONDS / total
+    keys = [f"/api/orchestrator/message:10.0.{i // 256}.{i % 256}" for i in range(clients)]
+    start_time = 1_000_000.0
+
+    # tracemalloc slows every allocation, so memory is measured in its own pass
+    if trace:
+        tracemalloc.start()
+    worst = 0.0
+    started = time.perf_counter()
+    for i in range(total):
+        before = time.perf_counter()
+        hit(keys[i % clients], start_time + i * step)
+        worst = max(worst, time.perf_counter() - before)
+    elapsed = time.perf_counter() - started
+    retained = 0
+    if trace:
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed / total, worst, retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1000,10000,100000", help="comma-separated client counts")
+    args = parser.parse_args()
+
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    print(f"{'limiter':<10}{'clients':>9}{'mean':>10}{'worst':>11}{'bytes/client':>14}")
+    for clients in (int(n) for n in args.clients.split(",")):
+        shm_path = os.path.join(shm_dir, f"ratelimit-bench-{os.getpid()}")
+        shared_store = SharedMemoryRateLimitStore(shm_path, slots=1 << 18)
+
+        def cases():
+            # Fresh limiters for every pass
+            memory = SlidingWindowLimiter(MemoryRateLimitStore())
+            shared_store._map[:] = bytes(len(shared_store._map))
+            shared = SlidingWindowLimiter(shared_store)
+            return {
+                "legacy": LegacyLimiter().hit,
+                "memory": lambda key, now: memory.hit(key, LIMIT, WINDOW, now),
+                "shared": lambda key, now: shared.hit(key, LIMIT, WINDOW, now),
+            }
+
+        try:
+            for name in ("legacy", "memory", "shared"):
+                mean, worst, _ = _replay(cases()[name], clients)
+                _, _, retained = _replay(cases()[name], clients, trace=True)
+                print(
+                    f"{name:<10}{clients:>9}{mean * 1e6:>8.2f}us{worst * 1e3:>9.2f}ms"
+                    f"{retained / clients:>14.0f}"
+                )
+        finally:
+            shared_store.close()
+            os.unlink(shm_path)
+
+
+if __name__ == "__main__":
+    main()
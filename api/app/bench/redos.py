@@ -0,0 +1,127 @@
+"""
+Adversarial worst-case benchmark for the guard pattern engine.
+
+Feeds inputs crafted against each pattern family (long near-miss runs,
+repeated trigger prefixes) to the input and output matchers at growing sizes
+and fits the growth exponent of the matching time: ~1.0 means linear. The
+pre-hardening versions of the rewritten patterns are measured alongside for
+comparison.
+
+Usage:
+    python -m app.bench.redos [--check]
+"""
+
+import argparse
+import math
+import re
+import sys
+import timeit
+from typing import Callable
+
+from app.guard.patterns import INPUT_MATCHER, MAX_INPUT_CHARS, OUTPUT_MATCHER
+
+SIZES = (750, 1500, 3000, MAX_INPUT_CHARS)
+
+# Exponent above which --check fails (leaves room for timer noise)
+MAX_EXPONENT = 1.35
+
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+ADVERSARIAL_INPUTS: dict[str, Callable[[int], str]] = {
+    "roleplay_you_are": lambda n: _repeat("you are ", n),
+    "roleplay_words": lambda n: "you are " + _repeat("word ", n - 8),
+    "override_spaces": lambda n: "ignore" + " " * (n - 6),
+    "override_repeated": lambda n: _repeat("ignore previous ", n),
+    "policy_repeated": lambda n: _repeat("what are your ", n),
+    "email_no_domain": lambda n: "a" * (n - 1) + "@",
+    "email_dotted_domain": lambda n: "x@" + _repeat("a.", n - 2),
+    "non_ascii_runs": lambda n: _repeat("я" * 49 + " ", n),
+    "control_runs": lambda n: _repeat("\x01\x02 ", n),
+    "zero_width_runs": lambda n: _repeat("\u200b\u200b ", n),
+    "digit_runs": lambda n: _repeat("123456 ", n),
+    "hex_runs": lambda n: _repeat("0" * 31 + " ", n),
+    "bearer_spaces": lambda n: "Bearer" + " " * (n - 6),
+}
+
+# Patterns as they were before the ReDoS hardening
+LEGACY_PATTERNS = {
+    "ROLEPLAY_INJECTION": r"(?i)you\s+are\s+(\w+\s+)*(a\s+)?(hacker|admin|root|developer|system|god|unrestricted)",
+    "PII_email": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
+    "OBFUSCATION": r"[^\x00-\x7F]{50,}",
+}
+
+LEGACY_INPUTS = {
+    "ROLEPLAY_INJECTION": "roleplay_you_are",
+    "PII_email": "email_no_domain",
+    "OBFUSCATION": "non_ascii_runs",
+}
+
+
+def _seconds(func: Callable[[], object], target: float = 0.02) -> float:
+    """Best-of-3 time per call, with enough calls to fill the target window."""
+    timer = timeit.Timer(func)
+    single = timer.timeit(number=1)
+    number = max(1, int(target / max(single, 1e-7)))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def _exponent(times: list[float]) -> float:
+    """Least-squares slope of log(time) over log(size)."""
+    xs = [math.log(n) for n in SIZES]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    den = sum((x - mean_x) ** 2 for x in xs)
+    return num / den
+
+
+def _measure(func: Callable[[str], object], make_input: Callable[[int], str]) -> tuple[list[float], float]:
+    times = []
+    for size in SIZES:
+        text = make_input(size)
+        times.append(_seconds(lambda: func(text)))
+    return times, _exponent(times)
+
+
+def _scan_both(text: str) -> None:
+    INPUT_MATCHER.scan(text)
+    OUTPUT_MATCHER.scan(text)
+
+
+def run() -> tuple[list[tuple[str, list[float], float]], list[tuple[str, list[float], float]]]:
+    current = [(name, *_measure(_scan_both, make)) for name, make in ADVERSARIAL_INPUTS.items()]
+    legacy = []
+    for family, pattern in LEGACY_PATTERNS.items():
+        regex = re.compile(pattern)
+        legacy.append((family, *_measure(regex.search, ADVERSARIAL_INPUTS[LEGACY_INPUTS[family]])))
+    return current, legacy
+
+
+def _print_rows(title: str, rows: list[tuple[str, list[float], float]]) -> None:
+    header = "".join(f"{n:>10}" for n in SIZES)
+    print(f"\n{title}\n{'input':<22}{header}  exponent")
+    for name, times, exponent in rows:
+        cells = "".join(f"{t * 1e6:>8.0f}us" for t in times)
+        print(f"{name:<22}{cells}  {exponent:>6.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help=f"exit 1 if any exponent exceeds {MAX_EXPONENT}")
+    args = parser.parse_args()
+
+    current, legacy = run()
+    _print_rows("Current matchers (input + output scan)", current)
+    _print_rows("Legacy patterns (single regex search)", legacy)
+
+    worst = max(current, key=lambda row: row[2])
+    print(f"\nworst exponent: {worst[2]:.2f} ({worst[0]})")
+    if args.check and worst[2] > MAX_EXPONENT:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-message cost of agent routing: list scans vs the compiled routing index.
+
+    scan   the previous router: lowercase the message, then any(trigger in
+           lowered) over each agent's trigger list, first match wins
+    index  app.agents.router.RoutingIndex.score() on the guard's folded
+           text: one pass of the trie regex, every agent scored
+
+Both run over the same trigger set, and the set is grown with synthetic
+triggers to show how each scales with the number of triggers. Messages are
+a mix of trigger-free practice sentences (the common case, and the worst
+case for a scan) and messages that hit a trigger.
+
+Usage:
+    python -m app.bench.router [--messages N] [--sizes 50,200,1000]
+"""
+
+import argparse
+import random
+import time
+
+from app.agents.router import ROUTING_TRIGGERS, RoutingIndex
+from app.guard.patterns import fold_text
+
+MESSAGES = [
+    "Yesterday I have went to the cinema with my friends",
+    "Как сказать по-английски, что я закончил отчёт?",
+    "She don't like coffee, is it correct?",
+    "Я устала и не понимаю, что делать дальше",
+    "Составь мне расписание на неделю",
+    "Why do we use the Present Perfect here?",
+]
+
+
+def legacy_select(message: str, triggers: dict[str, list[str]]) -> str | None:
+    lowered = message.lower()
+    for label, words in triggers.items():
+        if any(word in lowered for word in words):
+            return label
+    return None
+
+
+def _grown(extra: int, seed: int = 7) -> dict[str, dict[str, float]]:
+    """The real triggers plus ``extra`` synthetic ones spread over the agents."""
+    rng = random.Random(seed)
+    triggers = {label: dict(words) for label, words in ROUTING_TRIGGERS.items()}
+    labels = list(triggers)
+    letters = "абвгдежзиклмнопрстуфхцчшщэюяabcdefghijklmnopqrstuvwxyz"
+    for i in range(extra):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(5, 10)))
+        triggers[labels[i % len(labels)]].setdefault(f"{word}{i}", 1)
+    return triggers
+
+
+def _per_message(func, messages: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            func(message)
+    return (time.perf_counter() - start) / (rounds * len(messages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=30000, help="messages routed per variant and size")
+    parser.add_argument("--sizes", default="0,200,1000", help="synthetic triggers added on top of the real ones")
+    args = parser.parse_args()
+
+    rounds = max(1, args.messages // len(MESSAGES))
+    # The guard already folded these; the index gets them for free
+    folded = [fold_text(message) for message in MESSAGES]
+
+    print(f"{'triggers':>9}{'scan':>12}{'index':>12}")
+    for extra in (int(size) for size in args.sizes.split(",")):
+        triggers = _grown(extra)
+        lists = {label: list(words) for label, words in triggers.items()}
+        index = RoutingIndex(triggers)
+        for message, text in zip(MESSAGES, folded):
+            route = index.score(text)
+            assert route.label is None or legacy_select(message, lists) is not None
+        scan = _per_message(lambda message: legacy_select(message, lists), MESSAGES, rounds)
+        scored = _per_message(index.score, folded, rounds)
+        count = sum(len(words) for words in triggers.values())
+        print(f"{count:>9}{scan * 1e6:>10.2f}us{scored * 1e6:>10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+A class hitting the same diagnostic step at once: provider calls and
+latency with and without single-flight coalescing (app.llm.SingleFlight).
+
+Fires --students concurrent evaluate_diagnostic calls with the same
+prompt through ai._call_gemini at a local fake Gemini
+(app.bench.fake_gemini), with the response cache disabled so only
+coalescing differs:
+
+    separate   every caller makes its own provider call (the old behavior)
+    coalesced  callers share the one call already in flight
+
+Usage:
+    python -m app.bench.single_flight [--students N] [--rounds R] [--llm-latency-ms MS]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.bench.fake_gemini import FakeGemini
+
+PAYLOAD = {
+    "contents": [
+        {
+            "parts": [
+                {
+                    "text": (
+                        "Ты — профессиональный методист английского языка. Оцени ответ студента. "
+                        "Тип задания: grammar. Вопрос: Fix: I have went home. Ответ студента: I went home."
+                    )
+                }
+            ]
+        }
+    ]
+}
+
+
+class _Separate:
+    """Stand-in for LLM_FLIGHTS that never coalesces."""
+
+    async def do(self, key, call):
+        return await call()
+
+
+async def _run(args: argparse.Namespace, gemini: FakeGemini) -> None:
+    # Imported only now: settings are read from the environment set up in main()
+    from app.llm import SingleFlight
+    from app.llm_cache import LLMResponseCache
+    from app.routers import ai
+
+    ai.LLM_CACHE = LLMResponseCache(max_entries=0)
+    print(f"{args.students} simultaneous identical requests x {args.rounds} rounds, fake LLM {args.llm_latency_ms:.0f}ms")
+    print(f"{'':11}{'median':>10}{'max':>10}{'provider calls':>16}")
+    for name, flights in (("separate", _Separate()), ("coalesced", SingleFlight())):
+        ai.LLM_FLIGHTS = flights
+        before = gemini.calls
+        timings: list[float] = []
+
+        async def student() -> None:
+            start = time.perf_counter()
+            await ai._call_gemini(ai.DEFAULT_MODEL, PAYLOAD, "evaluate_diagnostic")
+            timings.append(time.perf_counter() - start)
+
+        for _ in range(args.rounds):
+            await asyncio.gather(*(student() for _ in range(args.students)))
+        print(
+            f"{name:<11}{statistics.median(timings) * 1e3:>8.1f}ms{max(timings) * 1e3:>8.1f}ms"
+            f"{gemini.calls - before:>16}"
+        )
+    await ai.LLM_CLIENT.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=40, help="concurrent identical requests per round")
+    parser.add_argument("--rounds", type=int, default=5, help="bursts to run")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="fake Gemini response latency")
+    args = parser.parse_args()
+
+    gemini = FakeGemini(args.llm_latency_ms, jitter_ms=0)
+    gemini.start()
+    os.environ["LLM_API_BASE"] = gemini.url
+    os.environ.setdefault("LLM_API_KEY", "bench-key")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    try:
+        asyncio.run(_run(args, gemini))
+    finally:
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Time to first token: JSON orchestrator response vs the SSE stream.
+
+Drives the orchestrator routes as raw ASGI calls (so nothing buffers the
+body) with FakeLLMSource standing in for the model, and records when the
+client sees text:
+
+    json  POST /api/orchestrator/message: the message arrives with the
+          complete body, after generation, output guard and logging
+    sse   POST /api/orchestrator/message/stream: first ``delta`` event
+          (first token past the output guard's sliding window), and the
+          final ``done`` event
+
+Usage:
+    python -m app.bench.streaming [--requests N] [--first-token-ms MS] [--token-ms MS]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+# Settings require a database URL; the bench logs to its own file
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.bench.fake_llm import FakeLLMSource
+from app.conversation import ConversationStore
+from app.db import Base
+from app.guard.executor import GuardExecutor
+from app.log_writer import OrchestratorLogWriter
+from app.routers import orchestrator
+
+MESSAGES = [
+    "Как сказать, что я закончил задачу вчера?",
+    "I have went to the office yesterday",
+    "Почему здесь Present Perfect?",
+]
+
+
+async def _request(app: FastAPI, path: str, message: str) -> tuple[float, float]:
+    """(seconds to first message text, seconds to end of body) for one call."""
+    body = json.dumps({"user_id": "bench", "last_user_message": message}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    start = time.perf_counter()
+    first = None
+
+    async def send(message):
+        nonlocal first
+        if message["type"] != "http.response.body" or first is not None:
+            return
+        chunk = message.get("body", b"")
+        if b"event: delta" in chunk or (chunk and not path.endswith("/stream")):
+            first = time.perf_counter() - start
+
+    await app(scope, receive, send)
+    return first, time.perf_counter() - start
+
+
+def _ms(values: list[float]) -> str:
+    return f"{statistics.median(values) * 1e3:8.1f}ms"
+
+
+async def _run(args: argparse.Namespace) -> None:
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    Base.metadata.create_all(engine)
+    orchestrator.GUARD_EXECUTOR = GuardExecutor(workers=0)
+    orchestrator.LOG_WRITER = OrchestratorLogWriter(sessionmaker(bind=engine))
+    orchestrator.MESSAGE_SOURCE = FakeLLMSource(args.first_token_ms, args.token_ms)
+    orchestrator.CONVERSATIONS = ConversationStore()
+    app = FastAPI()
+    app.include_router(orchestrator.router, prefix="/api")
+
+    results: dict[str, list[tuple[float, float]]] = {"json": [], "sse": []}
+    for i in range(args.requests):
+        message = MESSAGES[i % len(MESSAGES)]
+        results["json"].append(await _request(app, "/api/orchestrator/message", message))
+        results["sse"].append(await _request(app, "/api/orchestrator/message/stream", message))
+
+    print(f"fake LLM: first token {args.first_token_ms:.0f}ms, then {args.token_ms:.0f}ms per token (medians)")
+    print(f"{'':6}{'first text':>12}{'complete':>12}")
+    for name, timings in results.items():
+        print(f"{name:<6}{_ms([t[0] for t in timings]):>12}{_ms([t[1] for t in timings]):>12}")
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10, help="requests per route")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="fake LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="fake LLM delay between tokens")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -5,11 +7,51 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     database_url: str = Field(..., alias="DATABASE_URL")
     llm_api_key: str | None = Field(default=None, alias="LLM_API_KEY")
+    llm_api_base: str = Field("https://generativelanguage.googleapis.com", alias="LLM_API_BASE")
+    llm_timeout_s: float = Field(30.0, alias="LLM_TIMEOUT_S")
+    llm_max_connections: int = Field(20, alias="LLM_MAX_CONNECTIONS")
+    llm_max_keepalive: int = Field(10, alias="LLM_MAX_KEEPALIVE")
+    llm_keepalive_expiry_s: float = Field(30.0, alias="LLM_KEEPALIVE_EXPIRY_S")
+    llm_http2: bool = Field(True, alias="LLM_HTTP2")
+    llm_cache_max_entries: int = Field(2000, alias="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_path: str = Field("llm_cache.sqlite3", alias="LLM_CACHE_PATH")
+    llm_cache_ttl_onboarding_s: float = Field(86_400, alias="LLM_CACHE_TTL_ONBOARDING_S")
+    llm_cache_ttl_tutor_insights_s: float = Field(21_600, alias="LLM_CACHE_TTL_TUTOR_INSIGHTS_S")
+    llm_cache_ttl_diagnostic_s: float = Field(604_800, alias="LLM_CACHE_TTL_DIAGNOSTIC_S")
     telegram_bot_token: str | None = Field(default=None, alias="TELEGRAM_BOT_TOKEN")
     telegram_webhook_secret: str | None = Field(default=None, alias="TELEGRAM_WEBHOOK_SECRET")
     jwt_secret: str = Field("change-me-in-prod", alias="JWT_SECRET")
     jwt_algorithm: str = Field("HS256", alias="JWT_ALGORITHM")
     access_token_expire_minutes: int = Field(60, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    guard_erosion_persist: bool = Field(False, alias="GUARD_EROSION_PERSIST")
+    guard_pool_workers: int = Field(2, alias="GUARD_POOL_WORKERS")
+    guard_pool_max_pending: int = Field(64, alias="GUARD_POOL_MAX_PENDING")
+    guard_pool_niceness: int = Field(10, alias="GUARD_POOL_NICENESS")
+    orchestrator_log_queue_size: int = Field(10_000, alias="ORCHESTRATOR_LOG_QUEUE_SIZE")
+    orchestrator_log_batch_size: int = Field(200, alias="ORCHESTRATOR_LOG_BATCH_SIZE")
+    orchestrator_log_flush_ms: int = Field(50, alias="ORCHESTRATOR_LOG_FLUSH_MS")
+    orchestrator_log_hot_days: int = Field(30, alias="ORCHESTRATOR_LOG_HOT_DAYS")
+    orchestrator_log_retention_days: int = Field(90, alias="ORCHESTRATOR_LOG_RETENTION_DAYS")
+    orchestrator_timing: bool = Field(False, alias="ORCHESTRATOR_TIMING")
+    # Internal /api/health/* stats (queues, pools, caches, latencies); signed-in users only
+    health_details: bool = Field(False, alias="HEALTH_DETAILS")
+    orchestrator_stream_guard_window: int = Field(64, alias="ORCHESTRATOR_STREAM_GUARD_WINDOW")
+    conversation_turns: int = Field(20, alias="CONVERSATION_TURNS")
+    conversation_max_users: int = Field(10_000, alias="CONVERSATION_MAX_USERS")
+    conversation_persist: bool = Field(True, alias="CONVERSATION_PERSIST")
+    conversation_cache_ttl_s: float = Field(60.0, alias="CONVERSATION_CACHE_TTL_S")
+    conversation_queue_size: int = Field(10_000, alias="CONVERSATION_QUEUE_SIZE")
+    learning_plan_jobs: bool = Field(True, alias="LEARNING_PLAN_JOBS")
+    learning_plan_job_workers: int = Field(2, alias="LEARNING_PLAN_JOB_WORKERS")
+    learning_plan_job_max_attempts: int = Field(3, alias="LEARNING_PLAN_JOB_MAX_ATTEMPTS")
+    learning_plan_job_poll_s: float = Field(0.5, alias="LEARNING_PLAN_JOB_POLL_S")
+    learning_plan_job_stale_s: float = Field(120.0, alias="LEARNING_PLAN_JOB_STALE_S")
+    learning_plan_job_sweep_s: float = Field(30.0, alias="LEARNING_PLAN_JOB_SWEEP_S")
+    learning_plan_job_events_timeout_s: float = Field(600.0, alias="LEARNING_PLAN_JOB_EVENTS_TIMEOUT_S")
+    learning_plan_stream: bool = Field(True, alias="LEARNING_PLAN_STREAM")
+    rate_limit_backend: Literal["memory", "shared", "redis"] = Field("memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_shm_path: str = Field("/dev/shm/smartspeek-ratelimit", alias="RATE_LIMIT_SHM_PATH")
+    rate_limit_redis_url: str | None = Field(default=None, alias="RATE_LIMIT_REDIS_URL")
     allowed_origins: list[str] = Field(
         default_factory=lambda: ["http://localhost:3000"],
         alias="ALLOWED_ORIGINS"
@@ -0,0 +1,261 @@
+"""
+Server-side conversation context.
+
+The orchestrator keeps each user's last N turns on the server instead of
+having clients resend their history in every request. They live in
+per-process ring buffers in an in-memory LRU, which answers recent()
+without touching the database. With a backend the database holds every
+turn as one row: a user missing from the LRU (new process, evicted, or
+older than ``cache_ttl``, so other workers' turns show up) is loaded
+from it, and new turns are written through to it behind the response,
+queued like the orchestrator's audit log.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Protocol
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import ConversationTurn
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class Turn:
+    """One exchange: the guarded user message and the agent's reply."""
+
+    turn_id: str
+    user_message: str
+    agent: str
+    reply: str
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Turn":
+        return cls(
+            turn_id=str(data["turn_id"]),
+            user_message=str(data.get("user_message", "")),
+            agent=str(data.get("agent", "")),
+            reply=str(data.get("reply", "")),
+            created_at=float(data.get("created_at", 0.0)),
+        )
+
+
+class ConversationBackend(Protocol):
+    """Optional persistence behind the in-memory LRU."""
+
+    def load(self, user_id: str, limit: int) -> list[Turn]: ...
+
+    def append(self, user_id: str, turn: Turn, keep: int) -> bool: ...
+
+
+class ConversationStore:
+    """
+    Per-user ring buffers of recent turns, most recently used users kept.
+
+    Meant to be used from the event loop; backend calls run in the
+    threadpool. Appending a turn whose turn_id is already in the user's
+    buffer (a client retry) changes nothing; the backend ignores retries
+    the buffer no longer shows.
+
+    After start(), appended turns are queued for a background task that
+    stores them in order (at most ``max_queue`` waiting: append() then
+    waits for room); stop() stores everything still queued. Before start()
+    (scripts, tests without lifespan) they are stored before append()
+    returns.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 20,
+        max_users: int = 10_000,
+        backend: ConversationBackend | None = None,
+        cache_ttl: float = 60.0,
+        max_queue: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_turns = max_turns
+        self.max_users = max_users
+        self.backend = backend
+        self.cache_ttl = cache_ttl
+        self.max_queue = max_queue
+        self._clock = clock
+        # user_id -> (loaded at, buffer); only entries filled from the backend expire
+        self._buffers: OrderedDict[str, tuple[float, deque[Turn]]] = OrderedDict()
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or self.backend is None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="conversation-writer")
+
+    async def stop(self) -> None:
+        """Store queued turns and stop the writer."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def _cached(self, user_id: str) -> deque[Turn] | None:
+        entry = self._buffers.get(user_id)
+        if entry is None:
+            return None
+        loaded_at, buffer = entry
+        if self.backend and self._clock() - loaded_at >= self.cache_ttl:
+            del self._buffers[user_id]
+            return None
+        self._buffers.move_to_end(user_id)
+        return buffer
+
+    def _fill(self, user_id: str, turns: list[Turn]) -> deque[Turn]:
+        buffer = deque(turns, maxlen=self.max_turns)
+        # Keep turns appended while the load was running (not stored yet)
+        current = self._buffers.get(user_id)
+        if current is not None:
+            loaded = {turn.turn_id for turn in turns}
+            buffer.extend(turn for turn in current[1] if turn.turn_id not in loaded)
+        self._buffers[user_id] = (self._clock(), buffer)
+        self._buffers.move_to_end(user_id)
+        while len(self._buffers) > self.max_users:
+            self._buffers.popitem(last=False)
+        return buffer
+
+    async def recent(self, user_id: str) -> list[Turn]:
+        """The user's turns, oldest first."""
+        buffer = self._cached(user_id)
+        if buffer is None:
+            turns = await run_in_threadpool(self.backend.load, user_id, self.max_turns) if self.backend else []
+            buffer = self._fill(user_id, turns)
+        return list(buffer)
+
+    async def append(self, user_id: str, turn: Turn) -> bool:
+        """Add a turn; False if the buffer shows it was a retry."""
+        buffer = self._cached(user_id)
+        if buffer is None and self.backend is None:
+            buffer = self._fill(user_id, [])
+        if buffer is not None:
+            if any(known.turn_id == turn.turn_id for known in buffer):
+                return False
+            buffer.append(turn)
+        if self.backend is None:
+            return True
+        if not self.running:
+            return await run_in_threadpool(self.backend.append, user_id, turn, self.max_turns)
+        # Backpressure: wait for the writer rather than buffering without bound
+        await self._queue.put((user_id, turn))
+        return True
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            batch = [item]
+            while not queue.empty() and batch[-1] is not _STOP:
+                batch.append(queue.get_nowait())
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                await run_in_threadpool(self._write, batch)
+            if stopping:
+                return
+
+    def _write(self, batch: list[tuple[str, Turn]]) -> None:
+        for user_id, turn in batch:
+            try:
+                self.backend.append(user_id, turn, self.max_turns)
+                self.written += 1
+            except Exception:
+                # One bad turn (e.g. unknown user_id) must not stop the others
+                self.failed += 1
+                logger.exception("Failed to store conversation turn for user %s", user_id)
+
+    def reset(self, user_id: str | None = None) -> None:
+        """Forget one user's buffer, or everybody's (the backend keeps its turns)."""
+        if user_id is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(user_id, None)
+
+
+class SqlConversationBackend:
+    """Backend on the conversation_turns table (one row per turn, last ``keep`` kept per user)."""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def load(self, user_id: str, limit: int) -> list[Turn]:
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(ConversationTurn)
+                .filter(ConversationTurn.user_id == user_id)
+                .order_by(ConversationTurn.id.desc())
+                .limit(limit)
+                .all()
+            )
+            return [
+                Turn(row.turn_id, row.user_message, row.agent, row.reply, row.created_at) for row in reversed(rows)
+            ]
+        finally:
+            db.close()
+
+    def append(self, user_id: str, turn: Turn, keep: int) -> bool:
+        db = self.session_factory()
+        try:
+            # Insert and prune in one write transaction (no read-then-write
+            # lock upgrade to deadlock on with concurrent appends)
+            window = (
+                select(ConversationTurn.id)
+                .where(ConversationTurn.user_id == user_id)
+                .order_by(ConversationTurn.id.desc())
+                .offset(keep)
+                .limit(1)
+                .scalar_subquery()
+            )
+            try:
+                db.add(ConversationTurn(user_id=user_id, **turn.to_dict()))
+                db.flush()
+                db.execute(delete(ConversationTurn).where(ConversationTurn.user_id == user_id, ConversationTurn.id <= window))
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                # A retry of a stored turn hits uq_conversation_turns_user_turn;
+                # anything else (e.g. an unknown user's foreign key) is a real error
+                if self._has_turn(db, user_id, turn.turn_id):
+                    return False
+                raise
+            return True
+        finally:
+            db.close()
+
+    @staticmethod
+    def _has_turn(db: Session, user_id: str, turn_id: str) -> bool:
+        return (
+            db.query(ConversationTurn.id)
+            .filter(ConversationTurn.user_id == user_id, ConversationTurn.turn_id == turn_id)
+            .first()
+            is not None
+        )
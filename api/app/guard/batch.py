@@ -0,0 +1,94 @@
+"""Batch entry points for Guard v2 (log replay, bulk moderation)."""
+
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+from .guard_v2 import input_check_v2, output_check_v2
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_CHUNK_SIZE = 64
+
+
+def _chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _input_chunk(messages: list[str]) -> list[dict[str, Any]]:
+    # Replayed history would only evict live entries from the verdict cache
+    return [input_check_v2(message, use_cache=False) for message in messages]
+
+
+def _output_chunk(responses: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [output_check_v2(response) for response in responses]
+
+
+def _stream(
+    func: Callable[[list[T]], list[R]],
+    items: Iterable[T],
+    workers: int,
+    chunk_size: int,
+    executor: Executor | None,
+) -> Iterator[R]:
+    """
+    Apply func to chunks of items and yield results in input order.
+
+    At most ``2 * workers`` chunks are in flight, so memory stays bounded no
+    matter how long the input iterable is.
+    """
+    chunks = _chunked(items, chunk_size)
+    if executor is None and workers <= 1:
+        for chunk in chunks:
+            yield from func(chunk)
+        return
+
+    owned = executor is None
+    pool = ProcessPoolExecutor(max_workers=workers) if owned else executor
+    max_pending = 2 * max(workers, 1)
+    pending: deque = deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True)
+
+
+def input_check_batch(
+    messages: Iterable[str],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    executor: Executor | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Run input_check_v2 over many messages, streaming verdicts in order.
+
+    Args:
+        messages: Any iterable of user messages (consumed lazily)
+        workers: Process pool size; 1 runs in the calling process. With an
+            executor it only bounds the number of chunks in flight.
+        chunk_size: Messages sent to a worker per task
+        executor: Reuse an existing executor instead of creating a pool
+    """
+    return _stream(_input_chunk, messages, workers, chunk_size, executor)
+
+
+def output_check_batch(
+    responses: Iterable[dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    executor: Executor | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Run output_check_v2 over many agent responses, streaming verdicts in order."""
+    return _stream(_output_chunk, responses, workers, chunk_size, executor)
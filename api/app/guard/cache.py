@@ -0,0 +1,100 @@
+"""Bounded LRU/TTL cache for guard verdicts."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+def fingerprint(*parts: str) -> str:
+    """Stable short hash of the given text parts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8", errors="surrogatepass"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.
+
+    Entries are tagged with the pattern set version they were computed under;
+    when ``version_getter`` reports a different version the whole cache is
+    dropped, so verdicts never outlive the patterns that produced them.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        version_getter: Callable[[], str],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._version_getter = version_getter
+        self._clock = clock
+        self._version = version_getter()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_version(self) -> None:
+        version = self._version_getter()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: str) -> Any | None:
+        """Return cached value or None (counts a hit or a miss)."""
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < self._clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value, evicting the least recently used entry if full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / total if total else 0.0,
+                "version": self._version,
+            }
@@ -0,0 +1,138 @@
+"""Server-side incremental multi-turn erosion detector."""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+from .cache import fingerprint
+from .patterns import (
+    EROSION_DECAY,
+    EROSION_KEYWORDS,
+    EROSION_MAX_USERS,
+    EROSION_MIN_TURNS,
+    EROSION_RECENT_FINGERPRINTS,
+    EROSION_THRESHOLD,
+)
+
+
+@dataclass
+class ErosionState:
+    """Compact rolling state for one user."""
+    score: float = 0.0  # exponentially decayed trigger count
+    turns: int = 0
+    recent: list[str] = field(default_factory=list)  # last N message fingerprints
+    updated_at: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"score": self.score, "turns": self.turns, "recent": list(self.recent), "updated_at": self.updated_at}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ErosionState":
+        return cls(
+            score=float(data.get("score", 0.0)),
+            turns=int(data.get("turns", 0)),
+            recent=list(data.get("recent", [])),
+            updated_at=float(data.get("updated_at", 0.0)),
+        )
+
+
+class ErosionStore(Protocol):
+    """Optional persistence behind the in-memory LRU."""
+
+    def load(self, user_id: str) -> ErosionState | None: ...
+
+    def save(self, user_id: str, state: ErosionState) -> None: ...
+
+
+def count_triggers(message: str) -> int:
+    """Number of erosion keywords present in one message."""
+    lowered = message.lower()
+    return sum(1 for keyword in EROSION_KEYWORDS if keyword in lowered)
+
+
+class ErosionDetector:
+    """
+    Per-user erosion tracking updated in O(1) per turn.
+
+    Each turn decays the user's trigger score and adds the triggers found in
+    the new message, so the verdict no longer depends on the client resending
+    its history. A message identical to the previous turn (client retry) does
+    not advance the state.
+    """
+
+    def __init__(
+        self,
+        max_users: int = EROSION_MAX_USERS,
+        decay: float = EROSION_DECAY,
+        threshold: float = EROSION_THRESHOLD,
+        min_turns: int = EROSION_MIN_TURNS,
+        recent_size: int = EROSION_RECENT_FINGERPRINTS,
+        store: ErosionStore | None = None,
+    ):
+        self.max_users = max_users
+        self.decay = decay
+        self.threshold = threshold
+        self.min_turns = min_turns
+        self.recent_size = recent_size
+        self.store = store
+        self._states: OrderedDict[str, ErosionState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, user_id: str, state: ErosionState) -> ErosionState:
+        """Insert a loaded state unless another thread got there first."""
+        existing = self._states.get(user_id)
+        if existing is not None:
+            return existing
+        self._states[user_id] = state
+        while len(self._states) > self.max_users:
+            self._states.popitem(last=False)
+        return state
+
+    def observe(self, user_id: str, message: str) -> bool:
+        """Record one user turn and return True if erosion is suspected."""
+        message_fp = fingerprint(message)
+        triggers = count_triggers(message)
+
+        with self._lock:
+            known = user_id in self._states
+        if not known:
+            # Load outside the lock so a slow store never blocks other users
+            loaded = self.store.load(user_id) if self.store else None
+            with self._lock:
+                self._remember(user_id, loaded or ErosionState())
+
+        with self._lock:
+            state = self._remember(user_id, ErosionState())
+            self._states.move_to_end(user_id)
+            changed = not state.recent or state.recent[-1] != message_fp
+            if changed:
+                state.score = state.score * self.decay + triggers
+                state.turns += 1
+                state.recent.append(message_fp)
+                if len(state.recent) > self.recent_size:
+                    del state.recent[0]
+                state.updated_at = time.time()
+            flagged = self.is_eroding(state)
+            snapshot = ErosionState.from_dict(state.to_dict()) if changed and self.store else None
+
+        if snapshot is not None:
+            self.store.save(user_id, snapshot)
+        return flagged
+
+    def is_eroding(self, state: ErosionState) -> bool:
+        return state.turns >= self.min_turns and state.score >= self.threshold
+
+    def state_for(self, user_id: str) -> ErosionState | None:
+        """Current in-memory state (for inspection and tests)."""
+        with self._lock:
+            return self._states.get(user_id)
+
+    def reset(self, user_id: str | None = None) -> None:
+        """Forget one user's state, or everybody's."""
+        with self._lock:
+            if user_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(user_id, None)
@@ -0,0 +1,46 @@
+"""Database persistence for the multi-turn erosion detector."""
+
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app.models import GuardErosionState
+
+from .erosion import ErosionState
+
+
+class SqlErosionStore:
+    """Write-through store backed by the guard_erosion_state table."""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def load(self, user_id: str) -> ErosionState | None:
+        db = self.session_factory()
+        try:
+            row = db.get(GuardErosionState, user_id)
+            if row is None:
+                return None
+            return ErosionState(
+                score=row.score,
+                turns=row.turns,
+                recent=list(row.recent_json or []),
+                updated_at=row.updated_at.timestamp() if row.updated_at else 0.0,
+            )
+        finally:
+            db.close()
+
+    def save(self, user_id: str, state: ErosionState) -> None:
+        db = self.session_factory()
+        try:
+            db.merge(
+                GuardErosionState(
+                    user_id=user_id,
+                    score=state.score,
+                    turns=state.turns,
+                    recent_json=state.recent,
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,154 @@
+"""Dedicated process pool for CPU-bound guard work in async routes."""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.timing import call_timed, current_timer
+
+from .guard_v2 import (
+    EROSION_DETECTOR,
+    INPUT_VERDICT_CACHE,
+    _apply_erosion,
+    _cache_verdict,
+    _copy_verdict,
+    _input_check_uncached,
+    _oversized_verdict,
+    _verdict_cache_key,
+    output_check_v2,
+)
+from .schemas import AgentResponse
+
+
+class GuardOverloadedError(RuntimeError):
+    """Raised when the guard queue is full and a check cannot be accepted."""
+
+
+def _lower_priority(niceness: int) -> None:
+    if niceness > 0 and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+class GuardExecutor:
+    """
+    Bounded executor for guard checks.
+
+    With ``workers > 0`` checks run in a lazily started process pool, so
+    regex scanning no longer holds the GIL next to DB-bound routes in the
+    shared threadpool. ``workers == 0`` keeps the old behaviour (threadpool).
+    At most ``max_pending`` checks may be queued or running; further calls
+    raise GuardOverloadedError instead of growing the backlog. Workers run
+    at a raised ``niceness`` so that, when cores are saturated, the OS keeps
+    serving request handlers first.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64, niceness: int = 0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.niceness = niceness
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a process that is running threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority,
+                initargs=(self.niceness,),
+            )
+        return self._pool
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func(*args) off the event loop and return its result."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise GuardOverloadedError(f"{self.pending} guard checks pending")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._get_pool(), func, *args)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool next time and finish this call here
+                self._pool = None
+                return await run_in_threadpool(func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+async def _run_timed(executor: GuardExecutor, func: Callable[..., Any], *args: Any) -> Any:
+    """executor.run, carrying guard stage timings back from the worker."""
+    timer = current_timer()
+    if timer is None:
+        return await executor.run(func, *args)
+    result, stages = await executor.run(call_timed, func, *args)
+    timer.merge(stages)
+    return result
+
+
+async def input_check_async(
+    executor: GuardExecutor,
+    message: str,
+    user_id: str | None = None,
+) -> dict[str, Any]:
+    """
+    input_check_v2 for async routes.
+
+    The length check, verdict cache and erosion state stay in this process;
+    only cache misses are scanned in the executor.
+    """
+    oversized = _oversized_verdict(message)
+    if oversized is not None:
+        return oversized
+
+    eroding = False
+    if user_id is not None:
+        if EROSION_DETECTOR.store is None:
+            eroding = EROSION_DETECTOR.observe(user_id, message)
+        else:
+            eroding = await run_in_threadpool(EROSION_DETECTOR.observe, user_id, message)
+
+    key = _verdict_cache_key(message, None)
+    cached = INPUT_VERDICT_CACHE.get(key)
+    if cached is None:
+        cached = await _run_timed(executor, _input_check_uncached, message, None)
+        _cache_verdict(key, cached)
+    result = _copy_verdict(cached)
+
+    if eroding:
+        _apply_erosion(result)
+    return result
+
+
+async def output_check_async(executor: GuardExecutor, response: AgentResponse) -> dict[str, Any]:
+    """output_check_v2 for async routes, run in the executor."""
+    return await _run_timed(executor, output_check_v2, response)
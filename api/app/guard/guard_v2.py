@@ -2,39 +2,107 @@
 
 from typing import Any, Literal
 
+from app.timing import stage
+
+from . import patterns
+from .cache import VerdictCache, fingerprint
+from .erosion import ErosionDetector
 from .patterns import (
     RISK_BLOCK_THRESHOLD,
     RISK_SAFE_MODE_THRESHOLD,
     RISK_SCORES,
     RISK_WARN_THRESHOLD,
-    check_patterns,
-    find_pii,
-    find_sensitive_data,
-    INSTRUCTION_OVERRIDE,
-    SYSTEM_PROMPT_PROBING,
-    POLICY_EXTRACTION,
-    ROLEPLAY_INJECTION,
-    ENCODING_EVASION,
-    OBFUSCATION,
-    SOCIAL_ENGINEERING,
-    POLICY_LEAKAGE_OUTPUT,
+    pii_types_from_hits,
+    OUTPUT_MATCHER,
+    EROSION_KEYWORDS,
     MAX_INPUT_CHARS,
+    VERDICT_CACHE_MAX_ENTRIES,
+    VERDICT_CACHE_TTL_SECONDS,
 )
-from .redact import redact_in_response, redact_policy_leakage, redact_sensitive_data
+from .redact import redact_response
 from .schemas import AgentResponse
 from .utils import normalize_for_guard
 
+# Repeated messages (quick replies, retries) skip normalization and matching;
+# keyed to the compiled set input_check_v2 scans with (patterns.INPUT_MATCHER)
+INPUT_VERDICT_CACHE = VerdictCache(
+    max_entries=VERDICT_CACHE_MAX_ENTRIES,
+    ttl_seconds=VERDICT_CACHE_TTL_SECONDS,
+    version_getter=lambda: patterns.INPUT_MATCHER.version,
+)
+
+
+# Per-user multi-turn state; orchestrator may attach a persistent store
+EROSION_DETECTOR = ErosionDetector()
+
+
+def _verdict_cache_key(message: str, context_messages: list[str] | None) -> str:
+    """Key on the message plus the part of the context the erosion check reads."""
+    if context_messages and len(context_messages) > 5:
+        return fingerprint(message, *(str(m) for m in context_messages[-3:]))
+    return fingerprint(message)
+
+
+def _copy_verdict(result: dict[str, Any]) -> dict[str, Any]:
+    """Copy a verdict so callers can mutate it without touching the cache."""
+    risk = result["risk"]
+    return {
+        "sanitized_user_message": result["sanitized_user_message"],
+        "routing_text": result["routing_text"],
+        "risk": {**risk, "flags": list(risk["flags"])},
+        "mode": result["mode"],
+    }
+
+
+def _cache_verdict(key: str, result: dict[str, Any]) -> None:
+    INPUT_VERDICT_CACHE.set(key, result)
+
+
+def _oversized_verdict(message: str) -> dict[str, Any] | None:
+    """Blocked verdict for inputs over MAX_INPUT_CHARS, else None."""
+    original_length = len(message)
+    if original_length <= MAX_INPUT_CHARS:
+        return None
+    return {
+        "sanitized_user_message": "Запрос отклонён: нарушение политики безопасности. Сформулируйте вопрос по английскому.",
+        "routing_text": "",
+        "risk": {
+            "blocked": True,
+            "level": "high",
+            "score": RISK_SCORES["DOS_INPUT_TOO_LONG"],
+            "flags": ["DOS_INPUT_TOO_LONG"],
+            "notes": f"Input too long: {original_length} chars (max {MAX_INPUT_CHARS})",
+        },
+        "mode": "normal",
+    }
+
+
+def _apply_erosion(result: dict[str, Any]) -> None:
+    """Add the MULTI_TURN_EROSION flag to a verdict in place."""
+    risk = result["risk"]
+    risk["flags"].append("MULTI_TURN_EROSION")
+    risk["score"] = max(risk["score"], RISK_SCORES["MULTI_TURN_EROSION"])
+    if not risk["blocked"] and risk["level"] == "low":
+        risk["level"] = "medium"
+
 
 def input_check_v2(
     message: str,
     context_messages: list[str] | None = None,
+    use_cache: bool = True,
+    user_id: str | None = None,
 ) -> dict[str, Any]:
     """
     Enhanced input guard with normalization and comprehensive threat detection.
     
+    Verdicts are memoized in INPUT_VERDICT_CACHE unless use_cache is False.
+    When user_id is given, multi-turn erosion is tracked server-side by
+    EROSION_DETECTOR and context_messages is ignored.
+    
     Returns:
         {
             "sanitized_user_message": str,
+            "routing_text": str,  # folded normalized message for the agent router
             "risk": {
                 "blocked": bool,
                 "level": "low" | "medium" | "high",
@@ -46,22 +114,35 @@ def input_check_v2(
         }
     """
     # Check length BEFORE normalization (DoS protection)
-    original_length = len(message)
-    if original_length > MAX_INPUT_CHARS:
-        return {
-            "sanitized_user_message": "Запрос отклонён: нарушение политики безопасности. Сформулируйте вопрос по английскому.",
-            "risk": {
-                "blocked": True,
-                "level": "high",
-                "score": RISK_SCORES["DOS_INPUT_TOO_LONG"],
-                "flags": ["DOS_INPUT_TOO_LONG"],
-                "notes": f"Input too long: {original_length} chars (max {MAX_INPUT_CHARS})",
-            },
-            "mode": "normal",
-        }
+    oversized = _oversized_verdict(message)
+    if oversized is not None:
+        return oversized
     
+    eroding = False
+    if user_id is not None:
+        eroding = EROSION_DETECTOR.observe(user_id, message)
+        context_messages = None
+    
+    if not use_cache:
+        result = _input_check_uncached(message, context_messages)
+    else:
+        key = _verdict_cache_key(message, context_messages)
+        cached = INPUT_VERDICT_CACHE.get(key)
+        if cached is None:
+            cached = _input_check_uncached(message, context_messages)
+            _cache_verdict(key, cached)
+        result = _copy_verdict(cached)
+    
+    if eroding:
+        _apply_erosion(result)
+    return result
+
+
+def _input_check_uncached(message: str, context_messages: list[str] | None) -> dict[str, Any]:
+    """Run normalization and all input checks (see input_check_v2)."""
     # Normalize input
-    normalized, norm_metadata = normalize_for_guard(message)
+    with stage("guard_normalize"):
+        normalized, norm_metadata = normalize_for_guard(message)
     
     flags: list[str] = []
     risk_score = 0.0
@@ -69,8 +150,15 @@ def input_check_v2(
     level: Literal["low", "medium", "high"] = "low"
     notes = ""
     
+    # Prefiltered scan for every threat family and PII type. Always complete:
+    # the patterns are checked for backtracking (safety.py) and the input is
+    # capped at MAX_INPUT_CHARS, so the cost is bounded by the message alone
+    with stage("guard_patterns"):
+        folded = patterns.fold_text(normalized)
+        hits = patterns.INPUT_MATCHER.scan(normalized, folded)
+    
     # Check instruction override (highest priority)
-    if check_patterns(normalized, INSTRUCTION_OVERRIDE):
+    if "INSTRUCTION_OVERRIDE" in hits:
         flags.append("INSTRUCTION_OVERRIDE")
         risk_score = max(risk_score, RISK_SCORES["INSTRUCTION_OVERRIDE"])
         blocked = True
@@ -78,7 +166,7 @@ def input_check_v2(
         notes = "Instruction override attempt detected"
     
     # Check system prompt probing
-    if check_patterns(normalized, SYSTEM_PROMPT_PROBING):
+    if "SYSTEM_PROMPT_PROBING" in hits:
         flags.append("SYSTEM_PROMPT_PROBING")
         risk_score = max(risk_score, RISK_SCORES["SYSTEM_PROMPT_PROBING"])
         blocked = True
@@ -86,7 +174,7 @@ def input_check_v2(
         notes = "System prompt probing detected"
     
     # Check policy extraction
-    if check_patterns(normalized, POLICY_EXTRACTION):
+    if "POLICY_EXTRACTION" in hits:
         flags.append("POLICY_EXTRACTION")
         risk_score = max(risk_score, RISK_SCORES["POLICY_EXTRACTION"])
         if not blocked:
@@ -94,7 +182,7 @@ def input_check_v2(
             notes = "Policy extraction attempt"
     
     # Check roleplay injection
-    if check_patterns(normalized, ROLEPLAY_INJECTION):
+    if "ROLEPLAY_INJECTION" in hits:
         flags.append("ROLEPLAY_INJECTION")
         risk_score = max(risk_score, RISK_SCORES["ROLEPLAY_INJECTION"])
         if not blocked:
@@ -103,7 +191,7 @@ def input_check_v2(
             notes = "Roleplay injection detected"
     
     # Check encoding evasion
-    if check_patterns(normalized, ENCODING_EVASION):
+    if "ENCODING_EVASION" in hits:
         flags.append("ENCODING_EVASION")
         risk_score = max(risk_score, RISK_SCORES["ENCODING_EVASION"])
         if not blocked:
@@ -111,7 +199,7 @@ def input_check_v2(
             notes = "Encoding evasion attempt"
     
     # Check obfuscation
-    if check_patterns(normalized, OBFUSCATION):
+    if "OBFUSCATION" in hits:
         flags.append("OBFUSCATION")
         risk_score = max(risk_score, RISK_SCORES["OBFUSCATION"])
         if not blocked:
@@ -119,14 +207,14 @@ def input_check_v2(
             notes = "Obfuscation detected"
     
     # Check social engineering
-    if check_patterns(normalized, SOCIAL_ENGINEERING):
+    if "SOCIAL_ENGINEERING" in hits:
         flags.append("SOCIAL_ENGINEERING")
         risk_score = max(risk_score, RISK_SCORES["SOCIAL_ENGINEERING"])
         if not blocked and level == "low":
             level = "medium"
     
     # Check PII
-    pii_found = find_pii(normalized)
+    pii_found = pii_types_from_hits(hits)
     if pii_found:
         flags.append("PII_DETECTED")
         flags.extend([f"PII_{t}" for t in pii_found])
@@ -139,12 +227,9 @@ def input_check_v2(
     if context_messages and len(context_messages) > 5:
         # Check if recent messages contain erosion triggers
         recent_text = " ".join(context_messages[-3:]).lower()
-        if any(
-            trigger in recent_text
-            for trigger in ["remember", "recall", "earlier", "previous", "continue", "go on"]
-        ):
+        if any(trigger in recent_text for trigger in EROSION_KEYWORDS):
             flags.append("MULTI_TURN_EROSION")
-            risk_score = max(risk_score, 0.60)
+            risk_score = max(risk_score, RISK_SCORES["MULTI_TURN_EROSION"])
             if not blocked and level == "low":
                 level = "medium"
     
@@ -156,11 +241,13 @@ def input_check_v2(
     # Sanitize message
     if blocked or risk_score >= RISK_BLOCK_THRESHOLD:
         sanitized = "Запрос отклонён: нарушение политики безопасности. Сформулируйте вопрос по английскому."
+        folded = ""  # nothing of a rejected message is routed on
     else:
         sanitized = message  # Keep original for medium/low risk
     
     return {
         "sanitized_user_message": sanitized,
+        "routing_text": folded,
         "risk": {
             "blocked": blocked,
             "level": level,
@@ -172,10 +259,15 @@ def input_check_v2(
     }
 
 
-def output_check_v2(response: dict[str, Any]) -> dict[str, Any]:
+def output_check_v2(response: dict[str, Any] | AgentResponse) -> dict[str, Any]:
     """
     Enhanced output guard with schema validation and redaction.
     
+    An AgentResponse (as built by app.agents.utils.build_response) is already
+    schema-valid, so only its content is checked and the returned "response"
+    is an AgentResponse as well. Plain dicts are validated first and come
+    back as dicts.
+    
     Returns:
         {
             "accepted": bool,
@@ -186,7 +278,7 @@ def output_check_v2(response: dict[str, Any]) -> dict[str, Any]:
                 "flags": list[str],
                 "notes": str
             },
-            "response": dict (possibly redacted)
+            "response": dict | AgentResponse (possibly redacted)
         }
     """
     flags: list[str] = []
@@ -195,10 +287,12 @@ def output_check_v2(response: dict[str, Any]) -> dict[str, Any]:
     level: Literal["low", "medium", "high"] = "low"
     notes = ""
     
-    # Schema validation
+    trusted = isinstance(response, AgentResponse)
+    
+    # Schema validation (trusted responses were validated on construction)
     try:
-        validated = AgentResponse.model_validate(response)
-        response = validated.model_dump()  # Use validated version
+        if not trusted:
+            response = AgentResponse.model_validate(response).model_dump()
     except Exception as e:
         flags.append("FORMAT_VIOLATION")
         risk_score = max(risk_score, RISK_SCORES["FORMAT_VIOLATION"])
@@ -219,40 +313,44 @@ def output_check_v2(response: dict[str, Any]) -> dict[str, Any]:
         }
     
     # Check message content
-    message = response.get("message", "")
-    if isinstance(message, str):
-        # Check for policy leakage
-        if check_patterns(message, POLICY_LEAKAGE_OUTPUT):
-            flags.append("POLICY_LEAKAGE_OUTPUT")
-            risk_score = max(risk_score, RISK_SCORES["POLICY_LEAKAGE_OUTPUT"])
-            blocked = True
-            level = "high"
-            notes = "Policy leakage in output"
-            message = redact_policy_leakage(message)
-            response["message"] = message
-        
-        # Check for sensitive data
-        sensitive_found = find_sensitive_data(message)
-        if sensitive_found:
-            flags.append("SENSITIVE_DATA_EXPOSURE")
-            risk_score = max(risk_score, RISK_SCORES["SENSITIVE_DATA_EXPOSURE"])
-            blocked = True
-            level = "high"
-            notes = "Sensitive data exposure in output"
-            redacted_msg, redacted_types = redact_sensitive_data(message)
-            response["message"] = redacted_msg
-            flags.extend([f"redacted_{t}" for t in redacted_types])
-        
-        # Heuristic: off-topic (simplified - check if message is too short or generic)
-        if len(message.strip()) < 10:
-            flags.append("OFF_TOPIC_OUTPUT")
-            risk_score = max(risk_score, RISK_SCORES["OFF_TOPIC_OUTPUT"])
-            if not blocked:
-                level = "medium"
+    message = response.message if trusted else response.get("message", "")
+    with stage("guard_output_scan"):
+        hits = OUTPUT_MATCHER.scan(message) if isinstance(message, str) else set()
+    
+    # One redaction pass over message, ui and learning (incl. action payloads)
+    with stage("guard_redact"):
+        response, redacted_types, quoted_types = redact_response(response)
+    sensitive_types = [t for t in redacted_types + quoted_types if t != "policy_leakage"]
     
-    # Redact entire response if needed
-    if blocked:
-        response = redact_in_response(response)
+    # Check for policy leakage; in echoed user text and action payloads it is
+    # only redacted ("describe how I work" is an ordinary learner message)
+    if "POLICY_LEAKAGE_OUTPUT" in hits or "policy_leakage" in redacted_types:
+        flags.append("POLICY_LEAKAGE_OUTPUT")
+        risk_score = max(risk_score, RISK_SCORES["POLICY_LEAKAGE_OUTPUT"])
+        blocked = True
+        level = "high"
+        notes = "Policy leakage in output"
+    
+    # Check for sensitive data; tokens the redactor does not know (e.g. bare
+    # hex) are still flagged if they survived redaction of the message
+    message = response.message if trusted else response.get("message", "")
+    if redacted_types and not sensitive_types and "SENSITIVE_DATA" in hits:
+        if not OUTPUT_MATCHER.search(message, "SENSITIVE_DATA"):
+            hits.discard("SENSITIVE_DATA")
+    if sensitive_types or "SENSITIVE_DATA" in hits:
+        flags.append("SENSITIVE_DATA_EXPOSURE")
+        risk_score = max(risk_score, RISK_SCORES["SENSITIVE_DATA_EXPOSURE"])
+        blocked = True
+        level = "high"
+        notes = "Sensitive data exposure in output"
+        flags.extend([f"redacted_{t}" for t in sensitive_types])
+    
+    # Heuristic: off-topic (simplified - check if message is too short or generic)
+    if isinstance(message, str) and len(message.strip()) < 10:
+        flags.append("OFF_TOPIC_OUTPUT")
+        risk_score = max(risk_score, RISK_SCORES["OFF_TOPIC_OUTPUT"])
+        if not blocked:
+            level = "medium"
     
     return {
         "accepted": not blocked,
@@ -267,6 +365,45 @@ def output_check_v2(response: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def combine_risk(input_risk: dict[str, Any], output_risk: dict[str, Any]) -> dict[str, Any]:
+    """Merge input and output risk blocks into the final telemetry risk."""
+    # Combine flags
+    risk_flags = list(set(input_risk.get("flags", []) + output_risk.get("flags", [])))
+    
+    # Determine final level (max of both)
+    level_map = {"low": 0, "medium": 1, "high": 2}
+    final_level = max(
+        input_risk.get("level", "low"),
+        output_risk.get("level", "low"),
+        key=lambda x: level_map.get(x, 0)
+    )
+    
+    # Final score (max of both)
+    final_score = max(
+        input_risk.get("score", 0.0),
+        output_risk.get("score", 0.0)
+    )
+    
+    # Blocked if either is blocked
+    final_blocked = input_risk.get("blocked", False) or output_risk.get("blocked", False)
+    
+    # Combine notes
+    notes_parts = []
+    if input_risk.get("notes"):
+        notes_parts.append(f"Input: {input_risk['notes']}")
+    if output_risk.get("notes"):
+        notes_parts.append(f"Output: {output_risk['notes']}")
+    final_notes = " | ".join(notes_parts) if notes_parts else ""
+    
+    return {
+        "blocked": final_blocked,
+        "level": final_level,
+        "score": final_score,
+        "flags": risk_flags,
+        "notes": final_notes,
+    }
+
+
 def _get_fallback_response() -> dict[str, Any]:
     """Get safe fallback response when output is blocked."""
     return {
@@ -1,121 +1,166 @@
 """Security middleware for FastAPI."""
 
-import time
-from collections import defaultdict
-from typing import Callable
+from functools import lru_cache
 
-from fastapi import Request, Response, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import settings
 
+from .ratelimit import (
+    MemoryRateLimitStore,
+    RateLimitStore,
+    RedisRateLimitStore,
+    SharedMemoryRateLimitStore,
+    SlidingWindowLimiter,
+)
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Referrer-Policy"] = "no-referrer"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        # Minimal CSP (adjust based on your frontend needs)
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data: https:; "
-            "font-src 'self' data:;"
+
+# Prebuilt once: (name, value) pairs as the raw ASGI header bytes
+SECURITY_HEADERS: list[tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"referrer-policy", b"no-referrer"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    # Minimal CSP (adjust based on your frontend needs)
+    (
+        b"content-security-policy",
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
+        b"style-src 'self' 'unsafe-inline'; "
+        b"img-src 'self' data: https:; "
+        b"font-src 'self' data:;",
+    ),
+]
+_SECURITY_HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADERS)
+
+
+class SecurityHeadersMiddleware:
+    """Add security headers to all responses (pure ASGI, streaming-safe)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = message.get("headers") or []
+                # Ours win over any the route set, as with response.headers[...] = ...
+                message["headers"] = [
+                    header for header in headers if header[0].lower() not in _SECURITY_HEADER_NAMES
+                ] + SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def build_rate_limit_store() -> RateLimitStore:
+    """Create the counter store selected by RATE_LIMIT_BACKEND."""
+    backend = settings.rate_limit_backend
+    if backend == "memory":
+        return MemoryRateLimitStore()
+    if backend == "shared":
+        return SharedMemoryRateLimitStore(settings.rate_limit_shm_path)
+    if backend == "redis":
+        if not settings.rate_limit_redis_url:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires RATE_LIMIT_REDIS_URL")
+        return RedisRateLimitStore.from_url(settings.rate_limit_redis_url)
+    raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+@lru_cache(maxsize=4096)
+def _token_subject(token: str) -> str | None:
+    """JWT ``sub`` if the token's signature is valid, else None."""
+    try:
+        payload = jwt.decode(
+            token,
+            settings.jwt_secret,
+            algorithms=[settings.jwt_algorithm],
+            # An expired token still says who is calling; the route rejects it
+            options={"verify_exp": False},
         )
-        
-        return response
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    return str(subject) if subject is not None else None
+
+
+class RateLimitMiddleware:
+    """Sliding-window rate limiter with O(1) state per client (pure ASGI)."""
 
+    EXEMPT_PATHS = frozenset({"/api/health"})
+    _RATE_LIMITED_BODY = b'{"detail":"Rate limit exceeded"}'
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple in-memory rate limiter."""
-    
-    def __init__(self, app, limits: dict[str, tuple[int, int]]):
+    def __init__(self, app: ASGIApp, limits: dict[str, tuple[int, int]], store: RateLimitStore | None = None):
         """
         Args:
-            limits: Dict mapping path prefix to (max_requests, window_seconds)
+            limits: Dict mapping path prefix to (max_requests, window_seconds);
+                the longest matching prefix applies
+            store: Counter backend; defaults to build_rate_limit_store()
         """
-        super().__init__(app)
-        self.limits = limits
-        self.requests: dict[str, list[float]] = defaultdict(list)
-        self._cleanup_interval = 300  # Clean up old entries every 5 minutes
-        self._last_cleanup = time.time()
-    
-    def _get_identifier(self, request: Request) -> str:
-        """Get identifier for rate limiting (IP or user_id)."""
-        # Try to get user_id from JWT if available
-        # For now, use IP address
-        client_ip = request.client.host if request.client else "unknown"
-        return f"{request.url.path}:{client_ip}"
-    
-    def _is_rate_limited(self, identifier: str, path: str) -> bool:
-        """Check if request should be rate limited."""
-        # Find matching limit
-        limit_config = None
-        for prefix, config in self.limits.items():
-            if path.startswith(prefix):
-                limit_config = config
+        self.app = app
+        self.limits = dict(limits)
+        # Longest-prefix lookup: one dict probe per distinct prefix length
+        self._prefix_lengths = sorted({len(prefix) for prefix in self.limits}, reverse=True)
+        self.limiter = SlidingWindowLimiter(store if store is not None else build_rate_limit_store())
+
+    def _match(self, path: str) -> str | None:
+        """Longest configured prefix of path, if any."""
+        for length in self._prefix_lengths:
+            if length <= len(path) and path[:length] in self.limits:
+                return path[:length]
+        return None
+
+    def _get_identifier(self, scope: Scope) -> str:
+        """User id from a valid bearer token, else the client IP."""
+        for name, value in scope.get("headers") or ():
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    subject = _token_subject(token.strip())
+                    if subject is not None:
+                        return f"user:{subject}"
                 break
-        
-        if not limit_config:
-            return False
-        
-        max_requests, window_seconds = limit_config
-        now = time.time()
-        
-        # Clean up old entries periodically
-        if now - self._last_cleanup > self._cleanup_interval:
-            self._cleanup_old_entries(now)
-            self._last_cleanup = now
-        
-        # Get requests in window
-        requests_in_window = [
-            ts for ts in self.requests[identifier]
-            if now - ts < window_seconds
-        ]
-        self.requests[identifier] = requests_in_window
-        
-        # Check limit
-        if len(requests_in_window) >= max_requests:
-            return True
-        
-        # Record this request
-        self.requests[identifier].append(now)
-        return False
-    
-    def _cleanup_old_entries(self, now: float):
-        """Remove old entries from rate limit tracking."""
-        window_max = max(w for _, w in self.limits.values())
-        cutoff = now - window_max
-        
-        for identifier in list(self.requests.keys()):
-            self.requests[identifier] = [
-                ts for ts in self.requests[identifier]
-                if ts > cutoff
-            ]
-            if not self.requests[identifier]:
-                del self.requests[identifier]
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Skip rate limiting for health check
-        if request.url.path == "/api/health":
-            return await call_next(request)
-        
-        identifier = self._get_identifier(request)
-        path = request.url.path
-        
-        if self._is_rate_limited(identifier, path):
-            return Response(
-                content='{"detail":"Rate limit exceeded"}',
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                media_type="application/json",
-            )
-        
-        return await call_next(request)
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        prefix = self._match(scope["path"])
+        if prefix is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_requests, window_seconds = self.limits[prefix]
+        # Keyed by prefix: a prefix limit covers every endpoint under it
+        key = f"{prefix}:{self._get_identifier(scope)}"
+        if self.limiter.store.blocking:
+            # Redis round trips and flock waits must not stall the event loop
+            decision = await run_in_threadpool(self.limiter.hit, key, max_requests, window_seconds)
+        else:
+            decision = self.limiter.hit(key, max_requests, window_seconds)
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.HTTP_429_TOO_MANY_REQUESTS,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(self._RATE_LIMITED_BODY)).encode()),
+                    (b"retry-after", str(decision.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": self._RATE_LIMITED_BODY})
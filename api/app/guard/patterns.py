@@ -1,7 +1,10 @@
 """Threat patterns and risk scoring for Guard v2."""
 
+import hashlib
 import re
-from typing import Literal
+from typing import Iterable, Literal
+
+from .safety import assert_patterns_safe
 
 # Input threat patterns
 INSTRUCTION_OVERRIDE = [
@@ -29,7 +32,8 @@ POLICY_EXTRACTION = [
 ]
 
 ROLEPLAY_INJECTION = [
-    r"(?i)you\s+are\s+(\w+\s+)*(a\s+)?(hacker|admin|root|developer|system|god|unrestricted)",
+    # Up to 10 words between "you are" and the role (bounded to stay linear)
+    r"(?i)you\s+are\s+(\w{1,64}\s{1,16}){0,10}(a\s+)?(hacker|admin|root|developer|system|god|unrestricted)",
     r"(?i)act\s+as\s+(a\s+)?(hacker|admin|root|developer|system|god|unrestricted)",
     r"(?i)(elevate|escalate)\s+(privileges?|access|permissions?)",
 ]
@@ -39,6 +43,9 @@ MULTI_TURN_EROSION_TRIGGERS = [
     r"(?i)(continue|go\s+on|keep\s+going|more)",
 ]
 
+# Lowercase keywords counted per turn by the multi-turn erosion heuristic
+EROSION_KEYWORDS = ("remember", "recall", "earlier", "previous", "continue", "go on")
+
 ENCODING_EVASION = [
     r"(?i)(base64|base\s*64|b64)",
     r"(?i)(hex|hexadecimal)",
@@ -46,10 +53,11 @@ ENCODING_EVASION = [
     r"(?i)(rot13|caesar|shift)",
 ]
 
+# Lookbehinds make each run start a match attempt only once (linear time)
 OBFUSCATION = [
-    r"[^\x00-\x7F]{50,}",  # Excessive non-ASCII
-    r"[\x00-\x08\x0B-\x1F\x7F-\x9F]{3,}",  # Control chars
-    r"[\u200B-\u200D\uFEFF]{3,}",  # Zero-width chars
+    r"(?<![^\x00-\x7F])[^\x00-\x7F]{50,}",  # Excessive non-ASCII
+    r"(?<![\x00-\x08\x0B-\x1F\x7F-\x9F])[\x00-\x08\x0B-\x1F\x7F-\x9F]{3,}",  # Control chars
+    r"(?<![\u200B-\u200D\uFEFF])[\u200B-\u200D\uFEFF]{3,}",  # Zero-width chars
 ]
 
 SOCIAL_ENGINEERING = [
@@ -59,7 +67,7 @@ SOCIAL_ENGINEERING = [
 ]
 
 # PII patterns
-PII_EMAIL = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+PII_EMAIL = r"(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
 PII_PHONE = r"\+?\d{7,}"
 PII_CREDIT_CARD = r"\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b"
 PII_SSN = r"\b\d{3}-\d{2}-\d{4}\b"
@@ -85,7 +93,7 @@ SENSITIVE_DATA_PATTERNS = [
     r"-----BEGIN\s+(RSA\s+)?(PRIVATE\s+)?KEY-----",  # Private key
     r"xox[baprs]-[0-9a-zA-Z-]{10,}",  # Slack token
     r"ghp_[0-9a-zA-Z]{36}",  # GitHub token
-    r"[0-9a-f]{32,}",  # Generic hex token (weak, but catches some)
+    r"(?<![0-9a-f])[0-9a-f]{32,}",  # Generic hex token (weak, but catches some)
 ]
 
 # Risk scores (0.0 to 1.0)
@@ -104,6 +112,7 @@ RISK_SCORES: dict[str, float] = {
     "SENSITIVE_DATA_EXPOSURE": 0.95,
     "OFF_TOPIC_OUTPUT": 0.30,
     "LOW_EDUCATIONAL_VALUE": 0.25,
+    "MULTI_TURN_EROSION": 0.60,
 }
 
 # Risk thresholds
@@ -116,6 +125,203 @@ MAX_INPUT_CHARS = 6000
 MAX_MESSAGE_CHARS = 4000
 MAX_QUICK_REPLIES = 10
 
+# Server-side multi-turn erosion state (per user)
+EROSION_MIN_TURNS = 6  # same as requiring more than 5 context messages
+EROSION_DECAY = 0.5  # a trigger two turns back still weighs 0.25
+EROSION_THRESHOLD = 0.25
+EROSION_RECENT_FINGERPRINTS = 8
+EROSION_MAX_USERS = 50_000
+
+# Verdict cache for input_check_v2
+VERDICT_CACHE_MAX_ENTRIES = 4096
+VERDICT_CACHE_TTL_SECONDS = 600
+
+
+# Families scanned together by input_check_v2
+INPUT_PATTERN_FAMILIES: dict[str, list[str]] = {
+    "INSTRUCTION_OVERRIDE": INSTRUCTION_OVERRIDE,
+    "SYSTEM_PROMPT_PROBING": SYSTEM_PROMPT_PROBING,
+    "POLICY_EXTRACTION": POLICY_EXTRACTION,
+    "ROLEPLAY_INJECTION": ROLEPLAY_INJECTION,
+    "ENCODING_EVASION": ENCODING_EVASION,
+    "OBFUSCATION": OBFUSCATION,
+    "SOCIAL_ENGINEERING": SOCIAL_ENGINEERING,
+    "PII_email": [PII_EMAIL],
+    "PII_phone": [PII_PHONE],
+    "PII_credit_card": [PII_CREDIT_CARD],
+    "PII_ssn": [PII_SSN],
+}
+
+# Families scanned together by output_check_v2
+OUTPUT_PATTERN_FAMILIES: dict[str, list[str]] = {
+    "POLICY_LEAKAGE_OUTPUT": POLICY_LEAKAGE_OUTPUT,
+    "SENSITIVE_DATA": SENSITIVE_DATA_PATTERNS,
+}
+
+# Required literals per family (lowercase, matched case-insensitively).
+# Every match of every pattern in a family must contain at least one of its
+# literals; families without an entry have no such literal and always run.
+FAMILY_LITERALS: dict[str, list[str]] = {
+    "INSTRUCTION_OVERRIDE": [
+        "ignore", "forget", "disregard", "override", "new", "different", "another", "pretend",
+    ],
+    "SYSTEM_PROMPT_PROBING": [
+        "system", "internal", "original", "initial", "base", "developer", "behind", "hood", "how",
+    ],
+    "POLICY_EXTRACTION": [
+        "policie", "guideline", "restriction", "limitation", "constraint", "what",
+        "measure", "protocol", "safeguard",
+    ],
+    "ROLEPLAY_INJECTION": [
+        "hacker", "admin", "root", "developer", "system", "god", "unrestricted", "elevate", "escalate",
+    ],
+    "ENCODING_EVASION": ["base", "b64", "hex", "unicode", "utf", "rot13", "caesar", "shift"],
+    "SOCIAL_ENGINEERING": [
+        "urgent", "emergency", "asap", "immediately", "right",
+        "trust", "believe", "promise", "swear", "this", "seriously",
+    ],
+    "PII_email": ["@"],
+    "POLICY_LEAKAGE_OUTPUT": ["system", "internal", "developer", "behind", "hood", "how", "instruction"],
+}
+
+
+def _scoped(pattern: str) -> str:
+    """Turn a leading global (?i) into a scoped group so patterns can be merged."""
+    if pattern.startswith("(?i)"):
+        return f"(?i:{pattern[4:]})"
+    return f"(?:{pattern})"
+
+
+# Non-ASCII characters that (?i) matching treats as ASCII letters and that
+# str.lower() does not map onto them (U+212A KELVIN SIGN already lowers to "k")
+_CASEFOLD_FIXES = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+_CASEFOLD_CHARS = tuple(chr(code) for code in _CASEFOLD_FIXES)
+
+
+def fold_text(text: str) -> str:
+    """Fold text the way ``(?i)`` matching folds ASCII letters, then lowercase it."""
+    # translate() is slow on non-ASCII text, so only pay for it when needed
+    if not text.isascii() and any(char in text for char in _CASEFOLD_CHARS):
+        text = text.translate(_CASEFOLD_FIXES)
+    return text.lower()
+
+
+class LiteralPrefilter:
+    """
+    Keyword prefilter that tells which families can possibly match.
+
+    The text is folded once the same way ``(?i)`` matching folds ASCII
+    letters, then each family's literals are looked up with C-level substring
+    search, stopping at the first hit per family. Benign text therefore
+    skips every gated regex family.
+    """
+
+    def __init__(self, literals: dict[str, list[str]]):
+        self._literals = {
+            family: tuple(sorted(set(words), key=len)) for family, words in literals.items()
+        }
+        self.gated = frozenset(literals)
+
+    def families(self, text: str, folded: str | None = None) -> set[str]:
+        """
+        Return gated families whose required literals occur in text.
+
+        ``folded`` is fold_text(text) when the caller already has it.
+        """
+        if folded is None:
+            folded = fold_text(text)
+        found = set()
+        for family, words in self._literals.items():
+            for word in words:
+                if word in folded:
+                    found.add(family)
+                    break
+        return found
+
+
+def pattern_set_fingerprint(families: dict[str, list[str]], literals: dict[str, list[str]] | None) -> str:
+    """Hash of everything that influences a verdict computed with these families."""
+    payload = repr(
+        (
+            families,
+            literals,
+            MULTI_TURN_EROSION_TRIGGERS,
+            EROSION_KEYWORDS,
+            sorted(RISK_SCORES.items()),
+            RISK_BLOCK_THRESHOLD,
+            RISK_SAFE_MODE_THRESHOLD,
+            RISK_WARN_THRESHOLD,
+            MAX_INPUT_CHARS,
+        )
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CompiledPatternSet:
+    """
+    Precompiled matcher for several pattern families.
+
+    Each family is compiled once into a single alternation. A literal
+    prefilter runs first and drops families whose required keywords are
+    absent, so only the surviving families are searched.
+
+    ``version`` fingerprints the families, literals and scoring constants
+    the set was built with. The input verdict cache keys off the version of
+    the set in use, so installing a rebuilt set drops cached verdicts.
+    Scores and thresholds are read once here: editing them in a running
+    process without rebuilding the set is not detected (a restart is).
+    """
+
+    def __init__(self, families: dict[str, list[str]], literals: dict[str, list[str]] | None = None):
+        self.families = list(families)
+        self.version = pattern_set_fingerprint(families, literals)
+        self._per_family = {
+            family: re.compile("|".join(_scoped(p) for p in patterns))
+            for family, patterns in families.items()
+        }
+        gated = {f: words for f, words in (literals or {}).items() if f in families}
+        self._prefilter = LiteralPrefilter(gated) if gated else None
+        self._always = frozenset(f for f in self.families if f not in gated)
+
+    def candidates(self, text: str, folded: str | None = None) -> list[str]:
+        """Families that survive the literal prefilter, in declaration order."""
+        if self._prefilter is None:
+            return self.families
+        present = self._prefilter.families(text, folded)
+        return [f for f in self.families if f in present or f in self._always]
+
+    def scan(self, text: str, folded: str | None = None) -> set[str]:
+        """Return the names of all families that match anywhere in text."""
+        per_family = self._per_family
+        return {family for family in self.candidates(text, folded) if per_family[family].search(text)}
+
+    def search(self, text: str, family: str) -> bool:
+        """Check a single family using its precompiled regex."""
+        return self._per_family[family].search(text) is not None
+
+
+# Reject patterns prone to catastrophic backtracking before compiling them
+assert_patterns_safe(
+    {
+        **INPUT_PATTERN_FAMILIES,
+        **OUTPUT_PATTERN_FAMILIES,
+        "MULTI_TURN_EROSION_TRIGGERS": MULTI_TURN_EROSION_TRIGGERS,
+    }
+)
+
+INPUT_MATCHER = CompiledPatternSet(INPUT_PATTERN_FAMILIES, FAMILY_LITERALS)
+OUTPUT_MATCHER = CompiledPatternSet(OUTPUT_PATTERN_FAMILIES, FAMILY_LITERALS)
+
+
+# Order in which PII types are reported
+PII_TYPES = ("email", "phone", "credit_card", "ssn")
+
+
+def pii_types_from_hits(hits: Iterable[str]) -> list[str]:
+    """Extract detected PII types (in canonical order) from a matcher scan."""
+    hit_set = set(hits)
+    return [t for t in PII_TYPES if f"PII_{t}" in hit_set]
+
 
 def check_patterns(text: str, patterns: list[str]) -> bool:
     """Check if any pattern matches in text."""
@@ -0,0 +1,270 @@
+"""Sliding-window-counter rate limiting with pluggable counter stores."""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    remaining: int
+    retry_after: int  # seconds, 0 when allowed
+
+
+class RateLimitStore(Protocol):
+    """
+    Counter backend for SlidingWindowLimiter.
+
+    A key only ever needs the counts of the current and previous window, so
+    every store keeps O(1) state per key. ``blocking`` stores do I/O or take
+    a cross-process lock; the middleware calls them from the threadpool.
+    """
+
+    blocking: bool
+
+    def incr(self, key: str, window_id: int, window: int) -> tuple[int, int]:
+        """
+        Atomically count one request in window_id (window length in seconds).
+
+        Returns the (previous, current) counts, the new request included.
+        """
+        ...
+
+    def decr(self, key: str, window_id: int) -> None:
+        """Take back a request counted by incr() (it was rejected)."""
+        ...
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding window counter (weighted current + previous fixed window).
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window, which approximates a true sliding log with two
+    integers per key. The request is counted first and the decision made
+    from the counts the increment returned, so concurrent workers cannot
+    all pass at limit - 1; rejected requests are then taken back out.
+    """
+
+    def __init__(self, store: RateLimitStore):
+        self.store = store
+
+    def hit(self, key: str, limit: int, window: int, now: float | None = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        window_id = int(now // window)
+        elapsed = now - window_id * window
+        previous, current = self.store.incr(key, window_id, window)
+        estimated = previous * (1 - elapsed / window) + current
+
+        if estimated > limit:
+            self.store.decr(key, window_id)
+            return RateLimitDecision(False, 0, _retry_after(previous, current - 1, limit, window, elapsed))
+
+        return RateLimitDecision(True, max(0, math.floor(limit - estimated)), 0)
+
+
+def _retry_after(previous: int, current: int, limit: int, window: int, elapsed: float) -> int:
+    """Seconds until one more request fits under the limit."""
+    if current + 1 > limit:
+        # Wait for the next window, then for this window's weight to fade
+        wait = (window - elapsed) + window * (1 - (limit - 1) / max(current, 1))
+    else:
+        # previous * (1 - (elapsed + t) / window) + current + 1 <= limit
+        wait = window * (1 - (limit - 1 - current) / previous) - elapsed
+    return max(1, math.ceil(wait))
+
+
+class MemoryRateLimitStore:
+    """
+    Per-process store: one [window_id, current, previous, expires_at] entry per key.
+
+    Entries are kept in least-recently-used order, so expired ones collect at
+    the front and a few are dropped on every write. There is no full scan.
+    """
+
+    SWEEP_PER_CALL = 8
+    blocking = False
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _roll(entry: list, window_id: int) -> None:
+        if entry[0] == window_id:
+            return
+        entry[2] = entry[1] if entry[0] == window_id - 1 else 0
+        entry[1] = 0
+        entry[0] = window_id
+
+    def incr(self, key: str, window_id: int, window: int) -> tuple[int, int]:
+        expires_at = (window_id + 2) * window
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [window_id, 0, 0, expires_at]
+            else:
+                self._roll(entry, window_id)
+                entry[3] = expires_at
+                self._entries.move_to_end(key)
+            entry[1] += 1
+            counts = entry[2], entry[1]
+            self._sweep(window_id * window)
+            return counts
+
+    def decr(self, key: str, window_id: int) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == window_id and entry[1] > 0:
+                entry[1] -= 1
+
+    def _sweep(self, now: float) -> None:
+        for _ in range(self.SWEEP_PER_CALL):
+            if not self._entries:
+                return
+            key, entry = next(iter(self._entries.items()))
+            if entry[3] > now:
+                return
+            del self._entries[key]
+
+
+class SharedMemoryRateLimitStore:
+    """
+    Fixed-size counter table in a memory-mapped file shared by all workers.
+
+    Keys hash into ``slots`` fixed 24-byte records (key hash, window id,
+    current, previous) with short linear probing; stale records are reused
+    and, when a probe run is full, the one with the oldest window is
+    evicted. Memory is constant no matter how many clients there are.
+    Updates are serialized with flock, so put the file on a local tmpfs
+    such as /dev/shm.
+    """
+
+    _SLOT = struct.Struct("<QqII")
+    PROBES = 8
+    blocking = True
+
+    def __init__(self, path: str, slots: int = 1 << 16):
+        self.path = path
+        self.slots = slots
+        size = slots * self._SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # flock excludes other processes; threads share the descriptor
+        self._lock = threading.Lock()
+
+    def _hash(self, key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def _find(self, key_hash: int, window_id: int, claim: bool) -> tuple[int, tuple] | None:
+        """Return (offset, record) of the key's slot, claiming one if asked."""
+        start = key_hash % self.slots
+        victim = None
+        for probe in range(self.PROBES):
+            offset = ((start + probe) % self.slots) * self._SLOT.size
+            record = self._SLOT.unpack_from(self._map, offset)
+            if record[0] == key_hash:
+                return offset, record
+            if victim is None or record[1] < victim[1][1]:
+                victim = (offset, record)
+        if not claim:
+            return None
+        offset, _ = victim
+        return offset, (key_hash, window_id, 0, 0)
+
+    def _locked(self):
+        return _FileLock(self._fd, self._lock)
+
+    def incr(self, key: str, window_id: int, window: int) -> tuple[int, int]:
+        key_hash = self._hash(key)
+        with self._locked():
+            offset, (_, slot_window, current, previous) = self._find(key_hash, window_id, claim=True)
+            if slot_window != window_id:
+                previous = current if slot_window == window_id - 1 else 0
+                current = 0
+            self._SLOT.pack_into(self._map, offset, key_hash, window_id, current + 1, previous)
+        return previous, current + 1
+
+    def decr(self, key: str, window_id: int) -> None:
+        key_hash = self._hash(key)
+        with self._locked():
+            found = self._find(key_hash, window_id, claim=False)
+            if found is None:
+                return
+            offset, (_, slot_window, current, previous) = found
+            if slot_window == window_id and current > 0:
+                self._SLOT.pack_into(self._map, offset, key_hash, window_id, current - 1, previous)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class _FileLock:
+    def __init__(self, fd: int, lock: threading.Lock):
+        self._fd = fd
+        self._lock = lock
+
+    def __enter__(self) -> None:
+        self._lock.acquire()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc: Any) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+class RedisRateLimitStore:
+    """
+    Store backed by a Redis-compatible server.
+
+    Each (key, window) counter is its own Redis key with a two-window TTL,
+    so the server expires idle clients. incr() is one MULTI/EXEC round trip
+    (INCR + EXPIRE of the current counter, GET of the previous one), so the
+    count it returns is exact under any number of workers. ``client`` needs
+    ``pipeline`` and ``decr`` (redis-py, or any fake with the same methods).
+    """
+
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "rl:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitStore":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        return cls(redis.Redis.from_url(url))
+
+    def _key(self, key: str, window_id: int) -> str:
+        return f"{self.prefix}{key}:{window_id}"
+
+    def incr(self, key: str, window_id: int, window: int) -> tuple[int, int]:
+        redis_key = self._key(key, window_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(redis_key)
+        pipe.expire(redis_key, 2 * window)
+        pipe.get(self._key(key, window_id - 1))
+        current, _, previous = pipe.execute()
+        return int(previous or 0), int(current)
+
+    def decr(self, key: str, window_id: int) -> None:
+        self.client.decr(self._key(key, window_id))
@@ -1,74 +1,312 @@
 """Redaction utilities for sensitive data removal."""
 
+import json
 import re
+from functools import lru_cache
 from typing import Any, Tuple
 
-from .patterns import SENSITIVE_DATA_PATTERNS
+from pydantic import BaseModel
+
+from .patterns import LiteralPrefilter
+from .safety import assert_patterns_safe
+
+# (type, pattern) in priority order; matches become [REDACTED_<TYPE>]
+SENSITIVE_REDACTIONS: list[tuple[str, str]] = [
+    ("openai_key", r"sk-[A-Za-z0-9]{32,}"),
+    ("google_key", r"AIza[0-9A-Za-z_-]{35}"),
+    ("bearer_token", r"Bearer\s+[A-Za-z0-9\-._~+/]+=*"),
+    (
+        "private_key",
+        r"-----BEGIN\s+(?:RSA\s+)?(?:PRIVATE\s+)?KEY-----[\s\S]*?-----END\s+(?:RSA\s+)?(?:PRIVATE\s+)?KEY-----",
+    ),
+    ("slack_token", r"xox[baprs]-[0-9a-zA-Z-]{10,}"),
+    ("github_token", r"ghp_[0-9a-zA-Z]{36}"),
+]
+
+# Policy leakage swallows the rest of the line. The lookahead lists every
+# character (?i) lets a match start with, so the engine can skip ahead.
+POLICY_REDACTIONS: list[tuple[str, str]] = [
+    (
+        "policy_leakage",
+        r"(?=[SsIiDdBbUuHhMm\u017f\u0130\u0131])"
+        r"(?i:system\s+prompt|internal\s+prompt|developer\s+message|internal\s+rule"
+        r"|behind\s+the\s+scenes|under\s+the\s+hood|how\s+i\s+work"
+        r"|my\s+instructions?\s+(?:are|say|state|tell))[^\n]*",
+    ),
+]
+
+# Required literals per redaction type (lowercase, folded like (?i))
+REDACTION_LITERALS: dict[str, list[str]] = {
+    "openai_key": ["sk-"],
+    "google_key": ["aiza"],
+    "bearer_token": ["bearer"],
+    "private_key": ["-----begin"],
+    "slack_token": ["xox"],
+    "github_token": ["ghp_"],
+    "policy_leakage": ["system", "internal", "developer", "behind", "hood", "how", "instruction"],
+}
+
+# Top-level response fields that carry user-visible content
+REDACTED_FIELDS = ("message", "ui", "learning")
+
+# Subtrees the agent did not write itself: the user's own text echoed back
+# (micro_fix "before") and action payloads (plan content). Matches in them are
+# redacted but reported separately, so they never count as the agent leaking.
+# "*" stands for any list index.
+QUOTED_PATHS: tuple[tuple[str, ...], ...] = (
+    ("ui", "actions", "*", "payload"),
+    ("learning", "micro_fix", "*", "before"),
+)
+
+assert_patterns_safe({"REDACTION": [p for _, p in SENSITIVE_REDACTIONS + POLICY_REDACTIONS]})
+
+
+_RULES = dict(SENSITIVE_REDACTIONS + POLICY_REDACTIONS)
+_TYPE_ORDER = tuple(_RULES)
+_SENSITIVE_TYPES = tuple(name for name, _ in SENSITIVE_REDACTIONS)
+_POLICY_TYPES = tuple(name for name, _ in POLICY_REDACTIONS)
+_PREFILTER = LiteralPrefilter(REDACTION_LITERALS)
+
+
+@lru_cache(maxsize=None)
+def _combined(names: tuple[str, ...]) -> re.Pattern:
+    """One alternation of the given rules, each in its own named group."""
+    return re.compile("|".join(f"(?P<{name}>{_RULES[name]})" for name in names))
+
+
+def _ordered(found: set[str]) -> list[str]:
+    return [name for name in _TYPE_ORDER if name in found]
+
+
+def _candidates(text: str, types: tuple[str, ...] = _TYPE_ORDER) -> tuple[str, ...]:
+    """Types whose required literals occur in text, in priority order."""
+    found = _PREFILTER.families(text)
+    return tuple(name for name in types if name in found)
+
+
+def _sub(text: str, found: set[str], types: tuple[str, ...] = _TYPE_ORDER, prefilter: bool = True) -> str:
+    """
+    Redact all matches of the given types in a single scan.
+
+    The prefilter drops types whose literals are absent, so the alternation
+    only carries rules that can match (usually one, which keeps the regex
+    engine's literal-prefix search).
+    """
+    names = _candidates(text, types) if prefilter else types
+    if not names:
+        return text
+
+    def replace(match: re.Match) -> str:
+        found.add(match.lastgroup)
+        return f"[REDACTED_{match.lastgroup.upper()}]"
+
+    redacted, count = _combined(names).subn(replace, text)
+    return redacted if count else text
+
+
+def redact_text(text: str) -> Tuple[str, list[str]]:
+    """
+    Redact sensitive tokens and policy leakage from text in a single pass.
+
+    Returns:
+        Tuple of (redacted_text, list_of_redacted_types)
+    """
+    found: set[str] = set()
+    return _sub(text, found), _ordered(found)
 
 
 def redact_sensitive_data(text: str) -> Tuple[str, list[str]]:
     """
     Redact sensitive data from text.
-    
+
     Returns:
         Tuple of (redacted_text, list_of_redacted_types)
     """
-    redacted = text
-    redacted_types = []
-    
-    # Redact API keys and tokens
-    patterns_to_redact = [
-        (r"sk-[A-Za-z0-9]{32,}", "openai_key"),
-        (r"AIza[0-9A-Za-z_-]{35}", "google_key"),
-        (r"Bearer\s+[A-Za-z0-9\-._~+/]+=*", "bearer_token"),
-        (r"-----BEGIN\s+(RSA\s+)?(PRIVATE\s+)?KEY-----[\s\S]*?-----END\s+(RSA\s+)?(PRIVATE\s+)?KEY-----", "private_key"),
-        (r"xox[baprs]-[0-9a-zA-Z-]{10,}", "slack_token"),
-        (r"ghp_[0-9a-zA-Z]{36}", "github_token"),
-    ]
-    
-    for pattern, token_type in patterns_to_redact:
-        matches = re.findall(pattern, redacted)
-        if matches:
-            redacted = re.sub(pattern, f"[REDACTED_{token_type.upper()}]", redacted)
-            redacted_types.append(token_type)
-    
-    return redacted, redacted_types
+    found: set[str] = set()
+    return _sub(text, found, _SENSITIVE_TYPES), _ordered(found)
 
 
 def redact_policy_leakage(text: str) -> str:
     """Redact policy/system prompt leakage from text."""
-    patterns = [
-        r"(?i)(system\s+prompt|internal\s+prompt|developer\s+message|internal\s+rule)[^\n]*",
-        r"(?i)(behind\s+the\s+scenes|under\s+the\s+hood|how\s+i\s+work)[^\n]*",
-        r"(?i)(my\s+instructions?\s+(are|say|state|tell))[^\n]*",
-    ]
+    return _sub(text, set(), _POLICY_TYPES)
+
+
+# Openers of rules whose match only completes much later; text from an
+# unclosed opener on is held back by StreamRedactor until it closes
+STREAM_HOLD_OPENERS: dict[str, str] = {
+    "private_key": r"-----BEGIN\s+(?:RSA\s+)?(?:PRIVATE\s+)?KEY-----",
+}
+
+_HOLD_OPENERS = {name: re.compile(pattern) for name, pattern in STREAM_HOLD_OPENERS.items()}
+
+
+class StreamRedactor:
+    """
+    redact_text() over text that arrives in chunks.
+
+    The last ``window`` characters are held back, and so is any match that
+    reaches into them (policy leakage runs to the end of the line, so it is
+    held until the line ends) or an unclosed opener from
+    STREAM_HOLD_OPENERS. Everything before that is redacted and released.
+    A match can only be missed if a rule needs more than ``window``
+    characters before it matches at all; the longest such prefix among
+    the rules is a Google key (39 characters).
+    """
+
+    def __init__(self, window: int = 64):
+        self.window = window
+        self._pending = ""
+        self._found: set[str] = set()
+
+    @property
+    def redacted_types(self) -> list[str]:
+        return _ordered(self._found)
+
+    def _cut(self, text: str) -> int:
+        """Length of the prefix of text that no match in progress reaches into."""
+        cut = len(text) - self.window
+        if cut <= 0:
+            return 0
+        names = _candidates(text)
+        if not names:
+            return cut
+        for match in _combined(names).finditer(text):
+            if match.start() >= cut:
+                break
+            if match.end() > cut:
+                cut = match.start()
+                break
+        for name, opener in _HOLD_OPENERS.items():
+            if name not in names:
+                continue
+            for match in opener.finditer(text):
+                if match.start() >= cut:
+                    break
+                closed = _combined((name,)).match(text, match.start())
+                if closed is None:
+                    return match.start()
+        return cut
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; return the redacted text that is safe to release now."""
+        text = self._pending + chunk
+        cut = self._cut(text)
+        self._pending = text[cut:]
+        return _sub(text[:cut], self._found) if cut else ""
+
+    def finish(self) -> str:
+        """Redact and release whatever is still held back."""
+        text, self._pending = self._pending, ""
+        return _sub(text, self._found) if text else ""
+
+
+def _descend(quoted: tuple[tuple[str, ...], ...], step: str) -> tuple[tuple[str, ...], ...]:
+    """QUOTED_PATHS remainders below ``step`` (a key, or "*" for a list item)."""
+    return tuple(path[1:] for path in quoted if path[0] == step)
+
+
+def _redact_value(
+    value: Any,
+    found: set[str],
+    types: tuple[str, ...],
+    quoted: tuple[tuple[str, ...], ...] = (),
+    quoted_found: set[str] | None = None,
+) -> Any:
+    """
+    Redact every string inside value, considering only the given types.
+
+    Types matched inside a ``quoted`` path go to ``quoted_found`` instead of
+    ``found``. Returns value itself when nothing changed; otherwise a copy in
+    which only the containers on the path to a changed string are rebuilt.
+    """
+    if () in quoted:
+        found, quoted = quoted_found, ()
+    if isinstance(value, str):
+        return _sub(value, found, types, prefilter=False)
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, dict):
+        changed = {}
+        for key, item in value.items():
+            new = _redact_value(item, found, types, _descend(quoted, key), quoted_found)
+            if new is not item:
+                changed[key] = new
+        return {**value, **changed} if changed else value
+    if isinstance(value, (list, tuple)):
+        items = None
+        below = _descend(quoted, "*")
+        for index, item in enumerate(value):
+            new = _redact_value(item, found, types, below, quoted_found)
+            if new is not item:
+                if items is None:
+                    items = list(value)
+                items[index] = new
+        if items is None:
+            return value
+        return items if isinstance(value, list) else type(value)(items)
+    if isinstance(value, BaseModel):
+        update = {}
+        for name in type(value).model_fields:
+            item = getattr(value, name)
+            new = _redact_value(item, found, types, _descend(quoted, name), quoted_found)
+            if new is not item:
+                update[name] = new
+        return value.model_copy(update=update) if update else value
+    return value
+
+
+def redact_response(response: Any) -> Tuple[Any, list[str], list[str]]:
+    """
+    Redact message, ui and learning of an agent response in one pass each.
+
+    Works on plain dicts and on AgentResponse models. The input is never
+    mutated; unchanged subtrees (e.g. a clean show_plan payload) are shared
+    with the result instead of copied.
+
+    Returns:
+        Tuple of (redacted_response, types_redacted_in_agent_text,
+        types_redacted_only_in_QUOTED_PATHS)
+    """
+    found: set[str] = set()
+    quoted_found: set[str] = set()
+    is_model = isinstance(response, BaseModel)
+    fields = {
+        field: getattr(response, field, None) if is_model else response.get(field)
+        for field in REDACTED_FIELDS
+    }
     
-    redacted = text
-    for pattern in patterns:
-        redacted = re.sub(pattern, "[REDACTED_POLICY_LEAKAGE]", redacted)
+    # One prefilter over the serialized fields (JSON escaping never touches the
+    # literals, so this is a superset); clean responses (the norm) stop here
+    if is_model:
+        serialized = response.model_dump_json(include=set(REDACTED_FIELDS))
+    else:
+        serialized = json.dumps(list(fields.values()), ensure_ascii=False, default=str)
+    types = _candidates(serialized)
+    if not types:
+        return response, [], []
     
-    return redacted
+    update = {}
+    for field, item in fields.items():
+        new = _redact_value(item, found, types, _descend(QUOTED_PATHS, field), quoted_found)
+        if new is not item:
+            update[field] = new
+    if update:
+        response = response.model_copy(update=update) if is_model else {**response, **update}
+    return response, _ordered(found), _ordered(quoted_found - found)
 
 
 def redact_in_response(response: dict[str, Any]) -> dict[str, Any]:
     """
     Redact sensitive data from agent response.
-    
+
     Modifies response in-place and returns it.
     """
-    if "message" in response and isinstance(response["message"], str):
-        redacted_msg, redacted_types = redact_sensitive_data(response["message"])
-        redacted_msg = redact_policy_leakage(redacted_msg)
-        response["message"] = redacted_msg
-        
-        if redacted_types:
-            # Add flag to telemetry
-            if "telemetry" not in response:
-                response["telemetry"] = {}
-            if "risk" not in response["telemetry"]:
-                response["telemetry"]["risk"] = {}
-            if "flags" not in response["telemetry"]["risk"]:
-                response["telemetry"]["risk"]["flags"] = []
-            response["telemetry"]["risk"]["flags"].extend([f"redacted_{t}" for t in redacted_types])
-    
+    redacted, redacted_types, quoted_types = redact_response(response)
+    response.update(redacted)
+    sensitive_types = [t for t in redacted_types + quoted_types if t != "policy_leakage"]
+    if sensitive_types:
+        # Add flag to telemetry
+        risk = response.setdefault("telemetry", {}).setdefault("risk", {})
+        risk.setdefault("flags", []).extend([f"redacted_{t}" for t in sensitive_types])
+
     return response
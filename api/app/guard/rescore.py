@@ -0,0 +1,143 @@
+"""
+Re-score stored orchestrator logs with the current Guard v2 patterns.
+
+Walks ``orchestrator_logs`` in primary-key pages (constant memory), re-runs
+the input and output guards through the batch API and reports how verdicts
+changed. With ``--write`` the recomputed risk replaces ``risk_json``.
+
+Messages are re-scored one by one, without the user's earlier turns, so
+flags that depend on those turns (CONTEXT_FLAGS) cannot be recomputed;
+they are carried over from the stored risk instead of being dropped.
+
+Usage:
+    python -m app.guard.rescore [--workers N] [--page-size N] [--write]
+"""
+
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator
+
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.log_store import TemplateCache
+from app.models import OrchestratorLog
+
+from .batch import DEFAULT_CHUNK_SIZE, input_check_batch, output_check_batch
+from .guard_v2 import _apply_erosion, combine_risk
+
+# Flags decided from the user's conversation, not the message alone
+CONTEXT_FLAGS = ("MULTI_TURN_EROSION",)
+
+
+def _iter_pages(db: Session, page_size: int) -> Iterator[list[tuple[str, Any, Any, Any]]]:
+    """Yield pages of (id, input_json, output_json, risk_json) ordered by id."""
+    templates = TemplateCache(db)
+    last_id: str | None = None
+    while True:
+        query = db.query(
+            OrchestratorLog.id,
+            OrchestratorLog.input_json,
+            OrchestratorLog.output_json,
+            OrchestratorLog.template_hash,
+            OrchestratorLog.vars_json,
+            OrchestratorLog.risk_json,
+        )
+        if last_id is not None:
+            query = query.filter(OrchestratorLog.id > last_id)
+        rows = query.order_by(OrchestratorLog.id).limit(page_size).all()
+        if not rows:
+            return
+        # Compact rows are expanded back into full responses
+        yield [
+            (log_id, input_json, templates.output(output_json, template, variables, risk), risk)
+            for log_id, input_json, output_json, template, variables, risk in rows
+        ]
+        last_id = rows[-1][0]
+        db.expunge_all()
+
+
+def _carry_context_flags(old_risk: dict[str, Any] | None, input_result: dict[str, Any]) -> None:
+    """Re-apply CONTEXT_FLAGS from the stored risk to a fresh input verdict."""
+    old_flags = set((old_risk or {}).get("flags", []))
+    if "MULTI_TURN_EROSION" in old_flags and "MULTI_TURN_EROSION" not in input_result["risk"]["flags"]:
+        _apply_erosion(input_result)
+
+
+def _verdict_key(risk: dict[str, Any] | None) -> tuple:
+    risk = risk or {}
+    return (bool(risk.get("blocked", False)), risk.get("level", "low"), tuple(sorted(risk.get("flags", []))))
+
+
+def rescore(db: Session, workers: int = 1, page_size: int = 500, write: bool = False) -> dict[str, Any]:
+    """Re-score every log row and return a summary of verdict changes."""
+    summary: dict[str, Any] = {
+        "scanned": 0,
+        "changed": 0,
+        "newly_blocked": 0,
+        "unblocked": 0,
+        "flags_added": Counter(),
+        "flags_removed": Counter(),
+    }
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for page in _iter_pages(db, page_size):
+            messages = [(row[1] or {}).get("message", "") or "" for row in page]
+            outputs = [dict(row[2] or {}) for row in page]
+            input_results = input_check_batch(messages, workers, DEFAULT_CHUNK_SIZE, executor)
+            output_results = output_check_batch(outputs, workers, DEFAULT_CHUNK_SIZE, executor)
+
+            for row, input_result, output_result in zip(page, input_results, output_results):
+                log_id, _, _, old_risk = row
+                _carry_context_flags(old_risk, input_result)
+                new_risk = combine_risk(input_result["risk"], output_result["risk"])
+                summary["scanned"] += 1
+                old_key, new_key = _verdict_key(old_risk), _verdict_key(new_risk)
+                if old_key == new_key:
+                    continue
+                summary["changed"] += 1
+                if new_key[0] and not old_key[0]:
+                    summary["newly_blocked"] += 1
+                if old_key[0] and not new_key[0]:
+                    summary["unblocked"] += 1
+                summary["flags_added"].update(set(new_key[2]) - set(old_key[2]))
+                summary["flags_removed"].update(set(old_key[2]) - set(new_key[2]))
+                if write:
+                    db.query(OrchestratorLog).filter(OrchestratorLog.id == log_id).update(
+                        {"risk_json": new_risk}, synchronize_session=False
+                    )
+            if write:
+                db.commit()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="guard process pool size")
+    parser.add_argument("--page-size", type=int, default=500, help="rows fetched per query")
+    parser.add_argument("--write", action="store_true", help="store recomputed risk in risk_json")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = rescore(db, workers=args.workers, page_size=args.page_size, write=args.write)
+    finally:
+        db.close()
+
+    print(f"scanned:       {summary['scanned']}")
+    print(f"changed:       {summary['changed']}")
+    print(f"newly blocked: {summary['newly_blocked']}")
+    print(f"unblocked:     {summary['unblocked']}")
+    for title, counter in (("flags added", summary["flags_added"]), ("flags removed", summary["flags_removed"])):
+        if counter:
+            print(f"{title}:")
+            for flag, count in counter.most_common():
+                print(f"  {flag}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Static ReDoS checks for guard regex patterns."""
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+_REPEATS = {
+    sre_constants.MAX_REPEAT,
+    sre_constants.MIN_REPEAT,
+    getattr(sre_constants, "POSSESSIVE_REPEAT", sre_constants.MAX_REPEAT),
+}
+_UNBOUNDED = sre_constants.MAXREPEAT
+
+
+class UnsafePatternError(ValueError):
+    """Raised when a guard pattern can backtrack catastrophically."""
+
+
+def _children(op, av) -> list:
+    """Return the sub-pattern lists nested inside one parsed node."""
+    if op in _REPEATS:
+        return [av[2]]
+    if op == sre_constants.SUBPATTERN:
+        return [av[3]]
+    if op == sre_constants.BRANCH:
+        return list(av[1])
+    if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        return [av[1]]
+    if op == sre_constants.GROUPREF_EXISTS:
+        return [branch for branch in av[1:] if branch is not None]
+    if op == getattr(sre_constants, "ATOMIC_GROUP", None):
+        return [av]
+    return []
+
+
+def _inner_repeats(items) -> list[tuple[int, int]]:
+    """Collect (min, max) of every repeat reachable inside items."""
+    found = []
+    for op, av in items:
+        if op in _REPEATS:
+            found.append((av[0], av[1]))
+        for child in _children(op, av):
+            found.extend(_inner_repeats(child))
+    return found
+
+
+def _walk(items, problems: list[str]) -> None:
+    for op, av in items:
+        if op in _REPEATS:
+            outer_max = av[1]
+            if outer_max > 1:
+                for _, inner_max in _inner_repeats(av[2]):
+                    if inner_max > 1 and _UNBOUNDED in (outer_max, inner_max):
+                        problems.append("nested quantifier")
+                        break
+        for child in _children(op, av):
+            _walk(child, problems)
+
+
+def find_unsafe_constructs(pattern: str) -> list[str]:
+    """
+    Return descriptions of constructs that can backtrack catastrophically.
+
+    A repeat nested inside another repeat is rejected when either of them is
+    unbounded, e.g. ``(\\w+\\s+)*`` or ``(a+){2,5}``. Fully bounded nesting
+    such as ``(\\w{1,30}\\s{1,5}){0,8}`` is allowed.
+    """
+    problems: list[str] = []
+    _walk(sre_parse.parse(pattern), problems)
+    return problems
+
+
+def assert_patterns_safe(groups: dict[str, list[str]]) -> None:
+    """Raise UnsafePatternError if any pattern in groups is unsafe."""
+    errors = []
+    for name, patterns in groups.items():
+        for pattern in patterns:
+            for problem in find_unsafe_constructs(pattern):
+                errors.append(f"{name}: {problem} in {pattern!r}")
+    if errors:
+        raise UnsafePatternError("Unsafe guard patterns:\n" + "\n".join(errors))
@@ -72,3 +72,7 @@ class AgentResponse(BaseModel):
         if v not in allowed:
             raise ValueError(f"agent must be one of {allowed}")
         return v
+    
+    def public_json(self) -> str:
+        """Serialize in the public OrchestratorResponse shape (no risk score)."""
+        return self.model_dump_json(exclude={"telemetry": {"risk": {"score"}}})
@@ -1,17 +1,32 @@
 """Normalization utilities for Guard v2."""
 
 import base64
+import re
 import unicodedata
 import urllib.parse
 from typing import Tuple
 
 from .patterns import MAX_INPUT_CHARS
 
+ZERO_WIDTH_CHARS = (
+    "\u200B",  # Zero-width space
+    "\u200C",  # Zero-width non-joiner
+    "\u200D",  # Zero-width joiner
+    "\uFEFF",  # Zero-width no-break space
+)
+
+# Whole text made of base64 alphabet plus spaces/newlines (checked without copying)
+_BASE64_LIKE = re.compile(r"[A-Za-z0-9+/= \n]*")
+_BASE64_STRIP = str.maketrans({" ": None, "\n": None})
+
 
 def normalize_for_guard(text: str) -> Tuple[str, dict]:
     """
     Normalize text for guard analysis.
-    
+
+    Work is capped at MAX_INPUT_CHARS up front, and every step is skipped
+    when it cannot change the text, so plain messages are not copied at all.
+
     Returns:
         Tuple of (normalized_text, metadata_dict)
     """
@@ -19,58 +34,58 @@ def normalize_for_guard(text: str) -> Tuple[str, dict]:
         "original_length": len(text),
         "normalizations_applied": [],
     }
-    
-    normalized = text
-    
-    # 1. Unicode NFKC normalization
-    normalized = unicodedata.normalize("NFKC", normalized)
-    metadata["normalizations_applied"].append("NFKC")
-    
-    # 2. Remove zero-width characters
-    zero_width_chars = [
-        "\u200B",  # Zero-width space
-        "\u200C",  # Zero-width non-joiner
-        "\u200D",  # Zero-width joiner
-        "\uFEFF",  # Zero-width no-break space
-    ]
-    original_normalized = normalized
-    for char in zero_width_chars:
-        normalized = normalized.replace(char, "")
-    if normalized != original_normalized:
-        metadata["normalizations_applied"].append("zero_width_removal")
-    
+    applied = metadata["normalizations_applied"]
+
+    truncated = len(text) > MAX_INPUT_CHARS
+    normalized = text[:MAX_INPUT_CHARS] if truncated else text
+    is_ascii = normalized.isascii()
+
+    # 1. Unicode NFKC normalization (identity for ASCII; normalize() itself
+    #    returns already-normal text without copying)
+    if not is_ascii:
+        normalized = unicodedata.normalize("NFKC", normalized)
+    applied.append("NFKC")
+
+    # 2. Remove zero-width characters (never present in ASCII text). Only the
+    #    characters actually present are replaced; str.translate() with a
+    #    deletion table is far slower on non-ASCII text.
+    if not is_ascii:
+        removed = False
+        for char in ZERO_WIDTH_CHARS:
+            if char in normalized:
+                normalized = normalized.replace(char, "")
+                removed = True
+        if removed:
+            applied.append("zero_width_removal")
+
     # 3. URL decode
-    try:
-        decoded = urllib.parse.unquote(normalized)
-        if decoded != normalized:
-            normalized = decoded
-            metadata["normalizations_applied"].append("url_decode")
-    except Exception:
-        pass
-    
+    if "%" in normalized:
+        try:
+            decoded = urllib.parse.unquote(normalized)
+            if decoded != normalized:
+                normalized = decoded
+                applied.append("url_decode")
+        except Exception:
+            pass
+
     # 4. Base64 decode (only if looks like base64 and decodes to printable text)
-    # Check if string looks like base64 (alphanumeric + / + = padding)
-    base64_like = len(normalized) > 10 and all(
-        c.isalnum() or c in "+/=" for c in normalized.replace(" ", "").replace("\n", "")
-    )
-    if base64_like:
+    if len(normalized) > 10 and _BASE64_LIKE.fullmatch(normalized):
         try:
-            # Try to decode
-            decoded_bytes = base64.b64decode(normalized.replace(" ", "").replace("\n", ""), validate=True)
+            decoded_bytes = base64.b64decode(normalized.translate(_BASE64_STRIP), validate=True)
             decoded_str = decoded_bytes.decode("utf-8", errors="ignore")
             # Only use if result is mostly printable ASCII
             if decoded_str.isprintable() and len(decoded_str) > 5:
                 normalized = decoded_str
-                metadata["normalizations_applied"].append("base64_decode")
+                applied.append("base64_decode")
         except Exception:
             pass
-    
+
     # 5. Length limit
-    if len(normalized) > MAX_INPUT_CHARS:
+    if truncated or len(normalized) > MAX_INPUT_CHARS:
         normalized = normalized[:MAX_INPUT_CHARS]
-        metadata["normalizations_applied"].append("truncated")
+        applied.append("truncated")
         metadata["truncated_to"] = MAX_INPUT_CHARS
-    
+
     metadata["normalized_length"] = len(normalized)
-    
+
     return normalized, metadata
@@ -0,0 +1,191 @@
+"""
+Shared HTTP client for the Gemini generateContent API.
+
+Every LLM call site (app.routers.ai, app.routers.learning_plan, agents)
+goes through LLM_CLIENT instead of opening its own httpx client, so calls
+reuse keep-alive connections from one pool instead of paying a TCP and
+TLS handshake each time. The async pool serves async routes; sync routes
+running in the threadpool get a sync pool with the same limits.
+
+Pools are created on first use and closed by the app lifespan (aclose()).
+HTTP/2 is used when LLM_HTTP2 is set and the optional ``h2`` package is
+installed; otherwise connections stay on HTTP/1.1 keep-alive.
+
+LLM_FLIGHTS coalesces identical requests that are in flight at the same
+time (see SingleFlight), so a burst of the same prompt costs one call.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+GENERATE_PATH = "/v1beta/models/{model}:generateContent"
+STREAM_PATH = "/v1beta/models/{model}:streamGenerateContent"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class GeminiClient:
+    """
+    Pooled generateContent calls for one API base and key.
+
+    ``transport`` / ``sync_transport`` replace the network (tests). The
+    caller decides what a non-200 response means: generate() returns the
+    raw httpx.Response and lets httpx.TimeoutException / RequestError
+    propagate.
+    """
+
+    def __init__(
+        self,
+        api_base: str,
+        api_key: str | None,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+        sync_transport: httpx.BaseTransport | None = None,
+    ):
+        self.api_base = api_base.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.info("LLM_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1 keep-alive")
+        self._transport = transport
+        self._sync_transport = sync_transport
+        self._client: httpx.AsyncClient | None = None
+        self._sync_client: httpx.Client | None = None
+
+    @classmethod
+    def from_settings(cls) -> "GeminiClient":
+        return cls(
+            settings.llm_api_base,
+            settings.llm_api_key,
+            timeout=settings.llm_timeout_s,
+            max_connections=settings.llm_max_connections,
+            max_keepalive=settings.llm_max_keepalive,
+            keepalive_expiry=settings.llm_keepalive_expiry_s,
+            http2=settings.llm_http2,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def url(self, model: str | None = None) -> str:
+        return self.api_base + GENERATE_PATH.format(model=model or DEFAULT_MODEL)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, limits=self.limits, http2=self.http2, transport=self._transport
+            )
+        return self._client
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(
+                timeout=self.timeout, limits=self.limits, http2=self.http2, transport=self._sync_transport
+            )
+        return self._sync_client
+
+    async def generate(self, payload: dict[str, Any], model: str | None = None) -> httpx.Response:
+        return await self.client.post(self.url(model), params={"key": self.api_key}, json=payload)
+
+    async def stream_generate(self, payload: dict[str, Any], model: str | None = None) -> AsyncIterator[str]:
+        """
+        Response text as it is generated (streamGenerateContent over SSE).
+
+        A non-200 answer raises httpx.HTTPStatusError before any text.
+        """
+        url = self.api_base + STREAM_PATH.format(model=model or DEFAULT_MODEL)
+        params = {"key": self.api_key, "alt": "sse"}
+        async with self.client.stream("POST", url, params=params, json=payload) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                candidates = json.loads(line[5:]).get("candidates", [])
+                for part in candidates[0].get("content", {}).get("parts", []) if candidates else []:
+                    if part.get("text"):
+                        yield part["text"]
+
+    def generate_sync(self, payload: dict[str, Any], model: str | None = None) -> httpx.Response:
+        return self.sync_client.post(self.url(model), params={"key": self.api_key}, json=payload)
+
+    async def aclose(self) -> None:
+        """Close both pools; the next call opens fresh ones."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one.
+
+    The first caller for a key starts the call as its own task; callers
+    arriving while it runs await the same task, and all of them get its
+    result or its exception (timeouts and provider errors included). A
+    caller that is cancelled (client went away) stops waiting without
+    cancelling the call for the others. The key is forgotten as soon as
+    the call finishes, so later callers start a fresh one.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
+
+LLM_CLIENT = GeminiClient.from_settings()
+LLM_FLIGHTS = SingleFlight()
@@ -0,0 +1,203 @@
+"""
+Content-addressed cache for Gemini generateContent responses.
+
+Keys are a hash of the model and the request payload with whitespace in
+the prompt text collapsed, so the same prompt maps to the same entry no
+matter which user or request sent it. Lookups go to an in-memory LRU
+first and then to a SQLite file shared by all workers on the host; a disk
+hit is promoted to memory. Every entry carries its own expiry (the
+caller's per-endpoint TTL), stored as wall-clock time so the file tier
+stays valid across restarts.
+
+Only successful responses should be stored; callers decide what that
+means and which TTL applies.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.guard.cache import fingerprint
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def response_key(model: str, payload: dict[str, Any]) -> str:
+    """Cache key for one generateContent request."""
+    canonical = json.dumps(_normalize(payload), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return fingerprint(model, canonical)
+
+
+class SqliteResponseStore:
+    """
+    Response bodies in a SQLite file (``llm_response_cache`` table).
+
+    One connection per store, guarded by a lock; WAL mode lets several
+    worker processes read while one writes. Expired rows are deleted when
+    read and swept every ``prune_every`` writes.
+    """
+
+    def __init__(self, path: str, prune_every: int = 500, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.prune_every = prune_every
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, body TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        """(expires_at, body) for a live entry, or None."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT expires_at, body FROM llm_response_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[0] <= self._clock():
+                conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            return row[0], json.loads(row[1])
+
+    def set(self, key: str, expires_at: float, body: dict[str, Any]) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (key, expires_at, body) VALUES (?, ?, ?)",
+                (key, expires_at, json.dumps(body, ensure_ascii=False)),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (self._clock(),))
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM llm_response_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM responses with per-entry TTL and per-endpoint
+    hit/miss counters.
+
+    Meant to be used from the event loop; disk tier calls run in the
+    threadpool. ``disk=None`` keeps the memory tier only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2000,
+        disk: SqliteResponseStore | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.disk = disk
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._counters: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        )
+        self.evictions = 0
+
+    def _remember(self, key: str, expires_at: float, body: dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (expires_at, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, endpoint: str, key: str) -> dict[str, Any] | None:
+        """Cached response body or None (counts a hit or a miss for endpoint)."""
+        counters = self._counters[endpoint]
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                counters["memory_hits"] += 1
+                return entry[1]
+            del self._entries[key]
+        if self.disk is not None:
+            stored = await run_in_threadpool(self.disk.get, key)
+            if stored is not None:
+                self._remember(key, *stored)
+                counters["disk_hits"] += 1
+                return stored[1]
+        counters["misses"] += 1
+        return None
+
+    async def set(self, endpoint: str, key: str, body: dict[str, Any], ttl_seconds: float) -> None:
+        """Store body in both tiers for ttl_seconds (no-op when ttl <= 0)."""
+        if ttl_seconds <= 0:
+            return
+        expires_at = self._clock() + ttl_seconds
+        self._remember(key, expires_at, body)
+        if self.disk is not None:
+            await run_in_threadpool(self.disk.set, key, expires_at, body)
+        self._counters[endpoint]["stores"] += 1
+
+    def clear(self) -> None:
+        """Drop all entries (both tiers) and reset counters."""
+        self._entries.clear()
+        self._counters.clear()
+        self.evictions = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict[str, Any]:
+        endpoints = {}
+        for endpoint, counters in self._counters.items():
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            total = hits + counters["misses"]
+            endpoints[endpoint] = {**counters, "hit_ratio": hits / total if total else 0.0}
+        return {
+            "size": len(self._entries),
+            "evictions": self.evictions,
+            "disk": self.disk.path if self.disk is not None else None,
+            "endpoints": endpoints,
+        }
+
+
+def _from_settings() -> LLMResponseCache:
+    disk = SqliteResponseStore(settings.llm_cache_path) if settings.llm_cache_path else None
+    return LLMResponseCache(max_entries=settings.llm_cache_max_entries, disk=disk)
+
+
+LLM_CACHE = _from_settings()
@@ -0,0 +1,227 @@
+"""
+Retention for orchestrator_logs: archive, roll up into daily aggregates, drop.
+
+Postgres (orchestrator_logs partitioned by month, migration 0004): creates
+the partitions for the coming months, rolls every partition that ends
+before the retention cutoff into ``orchestrator_log_daily`` and drops it.
+Old rows that landed in the default partition are rolled up and deleted.
+
+SQLite: rows older than the hot window move to ``orchestrator_logs_archive``;
+archived rows older than the retention cutoff are rolled up and deleted.
+
+Either way, response templates no remaining row references are deleted.
+
+Cutoffs are aligned to midnight UTC, so every day is rolled up once. Run
+daily, e.g. from cron:
+
+Usage:
+    python -m app.log_retention [--hot-days N] [--retention-days N]
+"""
+
+import argparse
+import re
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import column, delete, insert, select, table, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.log_store import TemplateCache, delete_unused_templates
+from app.models import OrchestratorLog, OrchestratorLogArchive, OrchestratorLogDaily
+
+PARTITION_PREFIX = "orchestrator_logs_"
+DEFAULT_PARTITION = "orchestrator_logs_default"
+_PARTITION_NAME = re.compile(r"^orchestrator_logs_y(\d{4})m(\d{2})$")
+
+
+def _midnight(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_start(moment: datetime) -> datetime:
+    return _midnight(moment).replace(day=1)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}y{month.year:04d}m{month.month:02d}"
+
+
+def ensure_partitions(db: Session, now: datetime, months_ahead: int = 2) -> list[str]:
+    """Create monthly partitions from this month to months_ahead (Postgres)."""
+    month = _month_start(now)
+    names = []
+    for _ in range(months_ahead + 1):
+        name = partition_name(month)
+        db.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF orchestrator_logs '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+            )
+        )
+        names.append(name)
+        month = _next_month(month)
+    return names
+
+
+def _partitions(db: Session) -> list[str]:
+    rows = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'orchestrator_logs'::regclass"
+        )
+    )
+    return sorted(name for (name,) in rows)
+
+
+def _log_table(name: str):
+    """Lightweight handle on orchestrator_logs or any table with its columns."""
+    return table(
+        name,
+        column("id"),
+        column("user_id"),
+        column("output_json", OrchestratorLog.output_json.type),
+        column("template_hash"),
+        column("risk_json", OrchestratorLog.risk_json.type),
+        column("created_at", OrchestratorLog.created_at.type),
+    )
+
+
+def _day(moment: datetime) -> date:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+
+def roll_up(db: Session, table_name: str, cutoff: datetime, remove: bool = True) -> int:
+    """
+    Add rows of table_name created before cutoff to orchestrator_log_daily.
+
+    With remove=True the rows are deleted afterwards (same transaction; the
+    caller commits). Returns the number of rows rolled up.
+    """
+    logs = _log_table(table_name)
+    templates = TemplateCache(db)
+    groups: dict[tuple, dict[str, Any]] = defaultdict(lambda: {"turns": 0, "users": set(), "flags": Counter()})
+
+    rows = db.execute(
+        select(logs.c.user_id, logs.c.output_json, logs.c.template_hash, logs.c.risk_json, logs.c.created_at).where(
+            logs.c.created_at < cutoff
+        )
+    )
+    count = 0
+    for user_id, output_json, template, risk, created_at in rows:
+        risk = risk or {}
+        agent = templates.output(output_json, template, None, None).get("agent") or "unknown"
+        group = groups[(_day(created_at), agent, risk.get("level", "low"), bool(risk.get("blocked", False)))]
+        group["turns"] += 1
+        group["users"].add(user_id)
+        group["flags"].update(risk.get("flags") or [])
+        count += 1
+
+    for (day, agent, level, blocked), group in groups.items():
+        daily = db.get(OrchestratorLogDaily, (day, agent, level, blocked))
+        if daily is None:
+            daily = OrchestratorLogDaily(
+                day=day, agent=agent, risk_level=level, blocked=blocked, turns=0, users=0, flags_json={}
+            )
+            db.add(daily)
+        # users is summed if a day is ever rolled up in parts (an upper bound then)
+        daily.turns += group["turns"]
+        daily.users += len(group["users"])
+        flags = Counter(daily.flags_json or {})
+        flags.update(group["flags"])
+        daily.flags_json = dict(flags)
+
+    if remove and count:
+        db.execute(delete(logs).where(logs.c.created_at < cutoff))
+    return count
+
+
+def archive_rows(db: Session, cutoff: datetime) -> int:
+    """Move orchestrator_logs rows created before cutoff to the archive table (SQLite)."""
+    columns = [c.name for c in OrchestratorLogArchive.__table__.columns]
+    source = OrchestratorLog.__table__
+    old = select(*(source.c[name] for name in columns)).where(source.c.created_at < cutoff)
+    moved = db.execute(insert(OrchestratorLogArchive).from_select(columns, old)).rowcount
+    if moved:
+        db.execute(delete(source).where(source.c.created_at < cutoff))
+    return moved
+
+
+def run_retention(
+    db: Session,
+    now: datetime | None = None,
+    hot_days: int | None = None,
+    retention_days: int | None = None,
+) -> dict[str, Any]:
+    """Apply the retention policy once and return what was done."""
+    now = now or datetime.now(timezone.utc)
+    hot_days = settings.orchestrator_log_hot_days if hot_days is None else hot_days
+    retention_days = settings.orchestrator_log_retention_days if retention_days is None else retention_days
+    cutoff = _midnight(now - timedelta(days=retention_days))
+    summary: dict[str, Any] = {
+        "archived": 0,
+        "rolled_up": 0,
+        "templates_deleted": 0,
+        "partitions_created": [],
+        "partitions_dropped": [],
+    }
+
+    if db.get_bind().dialect.name == "postgresql":
+        summary["partitions_created"] = ensure_partitions(db, now)
+        db.commit()
+        for name in _partitions(db):
+            match = _PARTITION_NAME.match(name)
+            if name == DEFAULT_PARTITION:
+                summary["rolled_up"] += roll_up(db, name, cutoff)
+            elif match:
+                month = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+                if _next_month(month) > cutoff:
+                    continue
+                summary["rolled_up"] += roll_up(db, name, _next_month(month), remove=False)
+                # Dropping a whole month is far cheaper than deleting its rows
+                db.execute(text(f'DROP TABLE "{name}"'))
+                summary["partitions_dropped"].append(name)
+            db.commit()
+        summary["templates_deleted"] = delete_unused_templates(db, [OrchestratorLog.__table__])
+        db.commit()
+        return summary
+
+    summary["archived"] = archive_rows(db, _midnight(now - timedelta(days=hot_days)))
+    summary["rolled_up"] = roll_up(db, OrchestratorLogArchive.__tablename__, cutoff)
+    summary["templates_deleted"] = delete_unused_templates(
+        db, [OrchestratorLog.__table__, OrchestratorLogArchive.__table__]
+    )
+    db.commit()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hot-days", type=int, default=None, help="days kept in orchestrator_logs (SQLite)")
+    parser.add_argument("--retention-days", type=int, default=None, help="days of raw rows kept before roll-up")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = run_retention(db, hot_days=args.hot_days, retention_days=args.retention_days)
+    finally:
+        db.close()
+
+    print(f"archived:  {summary['archived']}")
+    print(f"rolled up: {summary['rolled_up']}")
+    print(f"templates deleted: {summary['templates_deleted']}")
+    for title in ("partitions_created", "partitions_dropped"):
+        if summary[title]:
+            print(f"{title.replace('_', ' ')}: {', '.join(summary[title])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Compact storage for orchestrator_logs.
+
+A logged response is split into a template and per-turn variables. The
+template is the static part: agent texts, quick replies, plan payloads.
+It is stored once in orchestrator_log_templates under the sha256 of its
+canonical JSON. Each log row keeps only the template hash, the few
+variable fields in ``vars_json``, and the risk block in ``risk_json``.
+The risk block used to be stored twice. A message the agent's template
+rendered stays in the template; one a model generated differs every turn,
+so rows flagged ``generated_message`` keep it in ``vars_json``. Retention deletes templates no
+row references any more (see delete_unused_templates).
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import Table, delete, exists, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import OrchestratorLogTemplate
+
+# Per-turn fields, by response section; everything else is template
+VARIABLE_FIELDS: dict[str, tuple[str, ...]] = {
+    "learning": ("fsm_state", "level", "confidence_score", "micro_fix"),
+}
+
+
+def template_hash(body: dict[str, Any]) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def split_output(
+    output: dict[str, Any], generated_message: bool = False
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Return (template, variables) for a response dict; risk is left out of
+    both. A generated message is a variable, a templated one is not.
+    """
+    template = dict(output)
+    variables: dict[str, Any] = {}
+    if generated_message and "message" in template:
+        variables["message"] = template.pop("message")
+    for section, fields in VARIABLE_FIELDS.items():
+        block = template.get(section)
+        if not isinstance(block, dict):
+            continue
+        block = dict(block)
+        for field in fields:
+            if field in block:
+                variables[f"{section}.{field}"] = block.pop(field)
+        template[section] = block
+    telemetry = template.get("telemetry")
+    if isinstance(telemetry, dict) and "risk" in telemetry:
+        # Stored once, in risk_json
+        template["telemetry"] = {key: value for key, value in telemetry.items() if key != "risk"}
+    return template, variables
+
+
+def expand_output(
+    template: dict[str, Any],
+    variables: dict[str, Any] | None,
+    risk: dict[str, Any] | None,
+) -> dict[str, Any]:
+    """Inverse of split_output; the template itself is not modified."""
+    output = dict(template)
+    for key, value in (variables or {}).items():
+        if "." not in key:
+            output[key] = value
+            continue
+        section, field = key.split(".", 1)
+        output[section] = {**output.get(section, {}), field: value}
+    if risk is not None:
+        output["telemetry"] = {**output.get("telemetry", {}), "risk": risk}
+    return output
+
+
+class TemplateStore:
+    """
+    Writes templates once and remembers recently seen hashes.
+
+    Hashes are only remembered after the caller's transaction commits
+    (see remember()), so a rolled-back batch never leaves the cache
+    pointing at a template row that does not exist. They are forgotten
+    ``known_ttl`` seconds after last use: retention deletes templates
+    whose rows are gone, and only a recently used template is sure to
+    still have one.
+    """
+
+    def __init__(
+        self,
+        max_known: int = 4096,
+        known_ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_known = max_known
+        self.known_ttl = known_ttl
+        self._clock = clock
+        self._known: OrderedDict[str, float] = OrderedDict()
+
+    def compact_rows(
+        self,
+        db: Session,
+        rows: Iterable[dict[str, Any]],
+    ) -> tuple[list[dict[str, Any]], list[str]]:
+        """
+        Return compacted copies of orchestrator_logs rows and the template
+        hashes they use, inserting templates not yet in the database. A row
+        may carry ``generated_message`` (see split_output); it is not a
+        column and is dropped from the copies.
+        """
+        compacted, templates = [], {}
+        for row in rows:
+            row = dict(row)
+            generated_message = row.pop("generated_message", False)
+            output = row.get("output_json")
+            if not isinstance(output, dict):
+                # executemany needs the same keys in every row
+                compacted.append({**row, "template_hash": None, "vars_json": None})
+                continue
+            template, variables = split_output(output, generated_message)
+            digest = template_hash(template)
+            templates.setdefault(digest, template)
+            compacted.append({**row, "output_json": None, "template_hash": digest, "vars_json": variables})
+
+        cutoff = self._clock() - self.known_ttl
+        unknown = [digest for digest in templates if self._known.get(digest, cutoff) <= cutoff]
+        if unknown:
+            existing = set(
+                db.scalars(select(OrchestratorLogTemplate.hash).where(OrchestratorLogTemplate.hash.in_(unknown)))
+            )
+            missing = [{"hash": digest, "body_json": templates[digest]} for digest in unknown if digest not in existing]
+            if missing:
+                db.execute(insert(OrchestratorLogTemplate), missing)
+        return compacted, list(templates)
+
+    def remember(self, hashes: Iterable[str]) -> None:
+        now = self._clock()
+        for digest in hashes:
+            self._known[digest] = now
+            self._known.move_to_end(digest)
+        while len(self._known) > self.max_known:
+            self._known.popitem(last=False)
+
+
+def delete_unused_templates(db: Session, log_tables: Iterable[Table]) -> int:
+    """Delete templates no row of log_tables references (not committed)."""
+    unused = delete(OrchestratorLogTemplate)
+    for logs in log_tables:
+        unused = unused.where(~exists().where(logs.c.template_hash == OrchestratorLogTemplate.hash))
+    return db.execute(unused).rowcount
+
+
+class TemplateCache:
+    """Read-side template lookup for jobs that expand many rows."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._bodies: dict[str, dict[str, Any]] = {}
+
+    def output(self, output_json: Any, template: str | None, variables: Any, risk: Any) -> dict[str, Any]:
+        """Full response dict for a stored row, legacy or compact."""
+        if template is None:
+            return dict(output_json or {})
+        body = self._bodies.get(template)
+        if body is None:
+            body = self._bodies[template] = self.db.get(OrchestratorLogTemplate, template).body_json
+        return expand_output(body, variables, risk)
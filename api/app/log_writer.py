@@ -0,0 +1,148 @@
+"""Write-behind persistence for OrchestratorLog rows."""
+
+import asyncio
+import logging
+from typing import Any, Callable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.log_store import TemplateStore
+from app.models import OrchestratorLog
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class OrchestratorLogWriter:
+    """
+    Queue audit-log rows in memory and bulk-insert them in the background.
+
+    Requests only enqueue a row; a single writer task collects up to
+    ``batch_size`` rows, waiting at most ``flush_interval`` seconds for a
+    batch to fill, and inserts them with one executemany in the threadpool.
+    The queue holds at most ``max_queue`` rows: when the database falls
+    behind, submit() waits for room instead of growing memory. stop()
+    flushes everything still queued.
+
+    Before start() (scripts, tests without lifespan) rows are written
+    through immediately, as before. Either way rows are stored compactly
+    (response template by hash, see app.log_store).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_queue: int = 10_000,
+        batch_size: int = 200,
+        flush_interval: float = 0.05,
+    ):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.blocked = 0
+        self.templates = TemplateStore()
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        # Set when a full batch is queued or on stop(): cuts the flush wait short
+        self._wake: asyncio.Event | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="orchestrator-log-writer")
+
+    async def stop(self) -> None:
+        """Flush queued rows and stop the writer."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, row: dict[str, Any]) -> None:
+        """Queue one orchestrator_logs row (column name -> value, plus generated_message; see app.log_store)."""
+        if not self.running:
+            await run_in_threadpool(self._write, [row])
+            return
+        if self._queue.full():
+            self.blocked += 1
+        # Backpressure: wait for the writer rather than dropping or buffering without bound
+        await self._queue.put(row)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            first = await queue.get()
+            if first is _STOP:
+                return
+            if queue.qsize() + 1 < self.batch_size and not self._stopping:
+                # Let a batch build up instead of one INSERT per request
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch, stopping = [first], False
+            while len(batch) < self.batch_size and not queue.empty():
+                row = queue.get_nowait()
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            await run_in_threadpool(self._write, batch)
+            if stopping:
+                return
+
+    def _write(self, rows: list[dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            try:
+                compacted, hashes = self.templates.compact_rows(db, rows)
+                db.execute(insert(OrchestratorLog), compacted)
+                db.commit()
+                self.templates.remember(hashes)
+                self.written += len(rows)
+                self.batches += 1
+                return
+            except Exception:
+                db.rollback()
+                if len(rows) == 1:
+                    self.failed += 1
+                    logger.exception("Failed to write orchestrator log")
+                    return
+            # One bad row (e.g. unknown user_id) must not drop the whole batch
+            for row in rows:
+                self._write([row])
+        finally:
+            db.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "blocked": self.blocked,
+        }
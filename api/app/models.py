@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, JSON, Text, Float, func
+from sqlalchemy import Column, String, Integer, Date, DateTime, Boolean, ForeignKey, JSON, Text, Float, UniqueConstraint, func
 
 from .db import Base
 
@@ -81,15 +81,81 @@ class UserAchievement(Base):
     unlocked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
+class OrchestratorLogTemplate(Base):
+    __tablename__ = "orchestrator_log_templates"
+
+    # sha256 of the canonical JSON body (see app.log_store)
+    hash = Column(String(64), primary_key=True)
+    body_json = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class OrchestratorLog(Base):
     __tablename__ = "orchestrator_logs"
 
     id = Column(String, primary_key=True)
     user_id = Column(String, ForeignKey("users.id"), index=True, nullable=False)
     input_json = Column(JSON, nullable=True)
+    # Legacy rows only; new rows reference a template plus per-turn vars_json
     output_json = Column(JSON, nullable=True)
+    template_hash = Column(String(64), ForeignKey("orchestrator_log_templates.hash"), nullable=True)
+    vars_json = Column(JSON, nullable=True)
     risk_json = Column(JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, nullable=False)
+
+
+class OrchestratorLogArchive(Base):
+    """Cold orchestrator_logs rows on SQLite (Postgres uses monthly partitions)."""
+
+    __tablename__ = "orchestrator_logs_archive"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)
+    input_json = Column(JSON, nullable=True)
+    output_json = Column(JSON, nullable=True)
+    template_hash = Column(String(64), nullable=True)
+    vars_json = Column(JSON, nullable=True)
+    risk_json = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), index=True, nullable=False)
+
+
+class OrchestratorLogDaily(Base):
+    """Daily roll-up of orchestrator_logs rows past retention."""
+
+    __tablename__ = "orchestrator_log_daily"
+
+    day = Column(Date, primary_key=True)
+    agent = Column(String, primary_key=True)
+    risk_level = Column(String, primary_key=True)
+    blocked = Column(Boolean, primary_key=True)
+    turns = Column(Integer, nullable=False, default=0)
+    users = Column(Integer, nullable=False, default=0)
+    flags_json = Column(JSON, nullable=True)  # flag -> count
+
+
+class GuardErosionState(Base):
+    __tablename__ = "guard_erosion_state"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0)
+    turns = Column(Integer, nullable=False, default=0)
+    recent_json = Column(JSON, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class ConversationTurn(Base):
+    __tablename__ = "conversation_turns"
+    # turn_id is unique per user, so a retried turn cannot be stored twice
+    __table_args__ = (UniqueConstraint("user_id", "turn_id", name="uq_conversation_turns_user_turn"),)
+
+    # One row per turn; only the user's last N are kept (see app.conversation)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("users.id"), index=True, nullable=False)
+    turn_id = Column(String, nullable=False)
+    user_message = Column(Text, nullable=False)
+    agent = Column(String, nullable=False)
+    reply = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)
 
 
 class LearningPlan(Base):
@@ -123,6 +189,24 @@ class LearningPlanLesson(Base):
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
 
+class LearningPlanJob(Base):
+    __tablename__ = "learning_plan_jobs"
+
+    # Background LLM generation of a plan (see app.plan_jobs)
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), index=True, nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True)
+    progress = Column(Integer, nullable=False, default=0)
+    request_json = Column(JSON, nullable=False)
+    fallback_plan_id = Column(String, ForeignKey("learning_plans.id"), nullable=True)
+    plan_id = Column(String, ForeignKey("learning_plans.id"), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
 class TelegramLink(Base):
     __tablename__ = "telegram_links"
 
@@ -0,0 +1,276 @@
+"""
+Background generation of learning plans.
+
+POST /api/learning-plan/generate stores a queued LearningPlanJob row and
+returns right away; PlanJobRunner's worker tasks pick jobs up and run the
+handler the router provides (LLM call, then persisting the plan). The
+table is the queue of record: the in-memory queue only carries job ids,
+and jobs are claimed with an atomic UPDATE so several processes can share
+the table. A running job's claim is refreshed every ``sweep_every``
+seconds while its process lives; on start() and on every sweep after
+that, queued jobs and running jobs whose claim has gone stale (their
+process died) are picked up again. stop() hands this process's running
+jobs back to the queue right away.
+
+Job statuses: queued -> running -> succeeded | failed | superseded.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import LearningPlanJob
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({"succeeded", "failed", "superseded"})
+
+
+class PlanJobError(Exception):
+    """A job failed for a reason that is safe to show to the user."""
+
+
+def job_to_dict(job: LearningPlanJob) -> dict[str, Any]:
+    return {
+        "id": job.id,
+        "user_id": job.user_id,
+        "status": job.status,
+        "progress": job.progress,
+        "request": job.request_json,
+        "fallback_plan_id": job.fallback_plan_id,
+        "plan_id": job.plan_id,
+        "attempts": job.attempts,
+        "error": job.error,
+    }
+
+
+class PlanJobRunner:
+    """
+    Worker pool for learning_plan_jobs.
+
+    ``handler(job, runner)`` does the work for one claimed job (a dict from
+    job_to_dict) and returns the id of the plan it stored, or None when
+    the job no longer applies (superseded). It may call
+    ``runner.progress()``. A PlanJobError fails the job with its message;
+    any other exception fails it with a generic one. A job is tried at
+    most ``max_attempts`` times across restarts.
+
+    Before start() (scripts, tests without lifespan) submitted jobs stay
+    queued in the table until a runner starts.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        handler: Callable[[dict[str, Any], "PlanJobRunner"], Awaitable[str | None]],
+        workers: int = 2,
+        max_attempts: int = 3,
+        stale_after: float = 120.0,
+        sweep_every: float = 30.0,
+    ):
+        self.session_factory = session_factory
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.sweep_every = sweep_every
+        self.succeeded = 0
+        self.failed = 0
+        self.superseded = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._queued: set[str] = set()
+        self._active: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._sweeper: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        for job_id in await run_in_threadpool(self._recover):
+            self._enqueue(job_id)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"learning-plan-job-{i}") for i in range(self.workers)
+        ]
+        self._sweeper = asyncio.create_task(self._sweep_loop(), name="learning-plan-job-sweeper")
+
+    async def stop(self) -> None:
+        """Stop the workers and put the jobs they were running back in the queue."""
+        tasks = self._tasks + ([self._sweeper] if self._sweeper else [])
+        self._tasks = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._sweeper = None
+        self._loop = None
+        self._queued.clear()
+        active, self._active = list(self._active), set()
+        if active:
+            await run_in_threadpool(self._release, active)
+
+    def notify(self, job_id: str) -> None:
+        """Hand a newly queued job to the workers; safe to call from any thread."""
+        if self._loop is not None and self.running:
+            self._loop.call_soon_threadsafe(self._enqueue, job_id)
+
+    async def progress(self, job_id: str, percent: int) -> None:
+        await run_in_threadpool(self._update, job_id, progress=percent)
+
+    def _enqueue(self, job_id: str) -> None:
+        # Sweeps find jobs that may already be waiting here; queue each once
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_every)
+            try:
+                for job_id in await run_in_threadpool(self._sweep, list(self._active)):
+                    self._enqueue(job_id)
+            except Exception:
+                logger.exception("Learning plan job sweep failed")
+
+    def _sweep(self, active: list[str]) -> list[str]:
+        """Refresh this process's claims, then requeue stale ones (as on start)."""
+        if active:
+            db = self.session_factory()
+            try:
+                db.execute(
+                    update(LearningPlanJob)
+                    .where(LearningPlanJob.id.in_(active), LearningPlanJob.status == "running")
+                    .values(claimed_at=datetime.now(timezone.utc))
+                )
+                db.commit()
+            finally:
+                db.close()
+        return self._recover()
+
+    def _release(self, job_ids: list[str]) -> None:
+        """Requeue interrupted jobs; the interruption does not use up an attempt."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(LearningPlanJob)
+                .where(LearningPlanJob.id.in_(job_ids), LearningPlanJob.status == "running")
+                .values(status="queued", claimed_at=None, attempts=LearningPlanJob.attempts - 1)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _recover(self) -> list[str]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale_after)
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(LearningPlanJob)
+                .where(LearningPlanJob.status == "running", LearningPlanJob.claimed_at < cutoff)
+                .values(status="queued")
+            )
+            db.commit()
+            jobs = (
+                db.query(LearningPlanJob.id)
+                .filter(LearningPlanJob.status == "queued")
+                .order_by(LearningPlanJob.created_at)
+                .all()
+            )
+            return [job_id for (job_id,) in jobs]
+        finally:
+            db.close()
+
+    def _claim(self, job_id: str) -> dict[str, Any] | None:
+        """Mark a queued job running for this worker; None if another worker has it."""
+        db = self.session_factory()
+        try:
+            claimed = db.execute(
+                update(LearningPlanJob)
+                .where(LearningPlanJob.id == job_id, LearningPlanJob.status == "queued")
+                .values(
+                    status="running",
+                    attempts=LearningPlanJob.attempts + 1,
+                    claimed_at=datetime.now(timezone.utc),
+                    progress=5,
+                )
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(LearningPlanJob, job_id)
+            if job.attempts > self.max_attempts:
+                job.status, job.error = "failed", "Plan generation failed. Please try again later."
+                db.commit()
+                return None
+            return job_to_dict(job)
+        finally:
+            db.close()
+
+    def _update(self, job_id: str, **values: Any) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(LearningPlanJob)
+                .where(LearningPlanJob.id == job_id, LearningPlanJob.status == "running")
+                .values(**values)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                job = await run_in_threadpool(self._claim, job_id)
+                if job is None:
+                    continue
+                self._active.add(job_id)
+                await self._run(job)
+            except Exception:
+                # Keep the worker alive; the job is retried once its claim goes stale
+                logger.exception("Learning plan worker failed on job %s", job_id)
+            # Once stop() cancels a worker its job stays in _active for _release
+            self._active.discard(job_id)
+
+    async def _run(self, job: dict[str, Any]) -> None:
+        try:
+            plan_id = await self.handler(job, self)
+        except PlanJobError as exc:
+            self.failed += 1
+            await run_in_threadpool(self._update, job["id"], status="failed", error=str(exc))
+            return
+        except Exception:
+            self.failed += 1
+            logger.exception("Learning plan job %s failed", job["id"])
+            await run_in_threadpool(
+                self._update, job["id"], status="failed", error="Plan generation failed. Please try again later."
+            )
+            return
+        if plan_id is None:
+            self.superseded += 1
+            await run_in_threadpool(self._update, job["id"], status="superseded", progress=100)
+        else:
+            self.succeeded += 1
+            await run_in_threadpool(self._update, job["id"], status="succeeded", progress=100, plan_id=plan_id)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "superseded": self.superseded,
+        }
@@ -0,0 +1,98 @@
+"""
+Incremental parser for a learning plan streamed as JSON text.
+
+The LLM returns one JSON object (schema in learning_plan.SYSTEM_PROMPT)
+in arbitrary chunks. PlanStreamParser scans each chunk once, tracking
+nesting depth and string state, and hands back every element of the
+top-level ``lessons`` array as soon as its closing brace arrives, so a
+lesson can be stored while the rest of the plan is still being
+generated. The other top-level fields (persona, plan_summary, ...) are
+collected in ``fields`` as they complete. Text before the first ``{``
+(prose, a Markdown code fence) is skipped.
+"""
+
+import json
+from typing import Any
+
+
+class PlanStreamParser:
+    """Feed text chunks, get completed lessons back (see module docstring)."""
+
+    def __init__(self):
+        self.fields: dict[str, Any] = {}
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: str | None = None
+        self._expect_value = False
+        self._value_start: int | None = None
+        self._in_lessons = False
+        self._lesson_start: int | None = None
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        """Consume a chunk; return the lessons it completed, in order."""
+        if self.done:
+            return []
+        self._text += chunk
+        lessons = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._expect_value and self._value_start is None:
+                        self._key = json.loads(text[self._string_start : i + 1])
+                continue
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                continue
+            if self._depth == 1 and self._expect_value and self._value_start is None and not c.isspace():
+                self._value_start = i
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 2 and c == "[" and self._key == "lessons":
+                    self._in_lessons = True
+                elif self._depth == 3 and c == "{" and self._in_lessons:
+                    self._lesson_start = i
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 2 and c == "}" and self._lesson_start is not None:
+                    lessons.append(json.loads(text[self._lesson_start : i + 1]))
+                    self._lesson_start = None
+                elif self._depth == 1 and c == "]" and self._in_lessons:
+                    self._in_lessons = False
+                elif self._depth == 0:
+                    self._end_value(text, i)
+                    self.done = True
+                    self._pos = i + 1
+                    return lessons
+            elif c == ":" and self._depth == 1:
+                self._expect_value = True
+            elif c == "," and self._depth == 1:
+                self._end_value(text, i)
+        self._pos = len(text)
+        return lessons
+
+    def _end_value(self, text: str, end: int) -> None:
+        """A top-level value ended just before ``end``."""
+        if self._value_start is not None and self._key not in (None, "lessons"):
+            try:
+                self.fields[self._key] = json.loads(text[self._value_start : end])
+            except json.JSONDecodeError:
+                pass
+        self._key = None
+        self._expect_value = False
+        self._value_start = None
@@ -5,13 +5,19 @@ import httpx
 
 from app.config import settings
 from app.db import get_db
+from app.llm import DEFAULT_MODEL, LLM_CLIENT, LLM_FLIGHTS
+from app.llm_cache import LLM_CACHE, response_key
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-DEFAULT_MODEL = "gemini-2.5-flash"
+# How long a response may be served from LLM_CACHE, per endpoint (0 disables)
+CACHE_TTLS = {
+    "process_onboarding": settings.llm_cache_ttl_onboarding_s,
+    "tutor_insights": settings.llm_cache_ttl_tutor_insights_s,
+    "evaluate_diagnostic": settings.llm_cache_ttl_diagnostic_s,
+}
 
 
 class OnboardingRequest(BaseModel):
@@ -28,25 +34,32 @@ class DiagnosticRequest(BaseModel):
     answer: str
 
 
-async def _call_gemini(model: str, payload: dict) -> dict:
-    """Call Gemini API with safe error handling."""
-    if not settings.llm_api_key:
+async def _call_gemini(model: str, payload: dict, endpoint: str) -> dict:
+    """
+    Call Gemini API with safe error handling.
+
+    Identical prompts are served from LLM_CACHE; identical prompts already
+    in flight share that one provider call (LLM_FLIGHTS), errors included.
+    """
+    if not LLM_CLIENT.configured:
         logger.error("LLM_API_KEY is not configured")
         raise HTTPException(
             status_code=500,
             detail="LLM provider is not available. Please contact support."
         )
 
-    url = GEMINI_API_URL.format(model=model or DEFAULT_MODEL)
-    
+    model = model or DEFAULT_MODEL
+    key = response_key(model, payload)
+    cached = await LLM_CACHE.get(endpoint, key)
+    if cached is not None:
+        return cached
+    return await LLM_FLIGHTS.do(key, lambda: _fetch(model, payload, endpoint, key))
+
+
+async def _fetch(model: str, payload: dict, endpoint: str, key: str) -> dict:
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                url,
-                params={"key": settings.llm_api_key},
-                json=payload,
-            )
-        
+        resp = await LLM_CLIENT.generate(payload, model)
+
         if resp.status_code != 200:
             # Log full error internally, but don't expose details to client
             error_data = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
@@ -59,8 +72,8 @@ async def _call_gemini(model: str, payload: dict) -> dict:
                 detail="LLM provider error. Please try again later."
             )
         
-        return resp.json()
-    
+        data = resp.json()
+
     except httpx.TimeoutException:
         logger.error("LLM provider timeout")
         raise HTTPException(
@@ -80,6 +93,10 @@ async def _call_gemini(model: str, payload: dict) -> dict:
             detail="An unexpected error occurred. Please try again later."
         )
 
+    if data.get("candidates"):
+        await LLM_CACHE.set(endpoint, key, data, CACHE_TTLS.get(endpoint, 0))
+    return data
+
 
 @router.post("/ai/process-onboarding")
 async def process_onboarding(payload: OnboardingRequest, db: Session = Depends(get_db)):
@@ -101,7 +118,7 @@ async def process_onboarding(payload: OnboardingRequest, db: Session = Depends(g
         ]
     }
 
-    data = await _call_gemini(DEFAULT_MODEL, request_body)
+    data = await _call_gemini(DEFAULT_MODEL, request_body, "process_onboarding")
     # Don't return raw data - extract and sanitize response
     # For now, return structured response (can be enhanced later)
     try:
@@ -137,7 +154,7 @@ async def tutor_insights(payload: TutorInsightsRequest):
         ]
     }
 
-    data = await _call_gemini(DEFAULT_MODEL, request_body)
+    data = await _call_gemini(DEFAULT_MODEL, request_body, "tutor_insights")
     # Don't return raw data - extract and sanitize response
     # For now, return structured response (can be enhanced later)
     try:
@@ -173,7 +190,7 @@ async def evaluate_diagnostic(payload: DiagnosticRequest):
         ]
     }
 
-    data = await _call_gemini(DEFAULT_MODEL, request_body)
+    data = await _call_gemini(DEFAULT_MODEL, request_body, "evaluate_diagnostic")
     # Don't return raw data - extract and sanitize response
     # For now, return structured response (can be enhanced later)
     try:
@@ -1,30 +1,39 @@
+import asyncio
 import json
+import logging
+import time
+from contextlib import aclosing
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
 from uuid import uuid4
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
-from app.db import get_db
-from app.models import LearningPlan, LearningPlanLesson, User
+from app.db import SessionLocal, get_db
+from app.llm import LLM_CLIENT
+from app.models import LearningPlan, LearningPlanJob, LearningPlanLesson, User
+from app.plan_jobs import TERMINAL_STATUSES, PlanJobError, PlanJobRunner
+from app.plan_stream import PlanStreamParser
 from app.schemas import (
     LearningPlanCurrentResponse,
     LearningPlanGenerateRequest,
     LearningPlanGenerateResponse,
+    LearningPlanJobResponse,
     LearningPlanLessonResponse,
     LearningPlanLessonShort,
     LearningPlanProgress,
 )
 from app.security import get_current_user
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-DEFAULT_MODEL = "gemini-2.5-flash"
+router = APIRouter()
 
 SYSTEM_PROMPT = (
     "You are LEARNING PLAN GENERATOR for \"SmartSpeek AI\".\n"
@@ -50,14 +59,12 @@ SYSTEM_PROMPT = (
 
 
 def _call_gemini(payload: dict[str, Any]) -> dict[str, Any]:
-    if not settings.llm_api_key:
+    if not LLM_CLIENT.configured:
         raise HTTPException(
             status_code=500,
             detail="LLM provider is not available. Please contact support."
         )
-    url = GEMINI_API_URL.format(model=DEFAULT_MODEL)
-    with httpx.Client(timeout=30) as client:
-        resp = client.post(url, params={"key": settings.llm_api_key}, json=payload)
+    resp = LLM_CLIENT.generate_sync(payload)
     if resp.status_code != 200:
         raise HTTPException(status_code=500, detail="LLM provider error. Please try again later.")
     return resp.json()
@@ -193,52 +200,43 @@ def _fallback_plan(request: LearningPlanGenerateRequest) -> dict[str, Any]:
     }
 
 
-@router.post("/learning-plan/generate", response_model=LearningPlanGenerateResponse)
-def generate_learning_plan(
-    payload: LearningPlanGenerateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    user_id = current_user.id
+def _llm_payload(payload: LearningPlanGenerateRequest) -> dict[str, Any]:
+    return {
+        "contents": [
+            {
+                "parts": [
+                    {
+                        "text": SYSTEM_PROMPT
+                        + "\nUser input:\n"
+                        + json.dumps(payload.model_dump(), ensure_ascii=False)
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def _response_text(raw: dict[str, Any]) -> str:
+    candidates = raw.get("candidates", [])
+    if candidates:
+        parts = candidates[0].get("content", {}).get("parts", [])
+        if parts:
+            return parts[0].get("text", "")
+    return ""
 
-    # Archive previous active plans
+
+def _persist_plan(
+    db: Session, user_id: str, payload: LearningPlanGenerateRequest, plan_data: dict[str, Any]
+) -> LearningPlan:
+    """Archive the user's active plans and add plan_data as the next version (not committed)."""
     db.query(LearningPlan).filter(
         LearningPlan.user_id == user_id, LearningPlan.status == "active"
     ).update({"status": "archived"})
 
     max_version = db.query(func.max(LearningPlan.version)).filter(LearningPlan.user_id == user_id).scalar() or 0
-    plan_version = int(max_version) + 1
 
-    # Try LLM generation; fallback to deterministic plan
-    plan_data: dict[str, Any]
-    try:
-        llm_payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": SYSTEM_PROMPT
-                            + "\nUser input:\n"
-                            + json.dumps(payload.model_dump(), ensure_ascii=False)
-                        }
-                    ]
-                }
-            ]
-        }
-        raw = _call_gemini(llm_payload)
-        candidates = raw.get("candidates", [])
-        text = ""
-        if candidates:
-            parts = candidates[0].get("content", {}).get("parts", [])
-            if parts:
-                text = parts[0].get("text", "")
-        plan_data = _extract_json_from_text(text) if text else _fallback_plan(payload)
-    except Exception:
-        plan_data = _fallback_plan(payload)
-
-    plan_id = str(uuid4())
     plan = LearningPlan(
-        id=plan_id,
+        id=str(uuid4()),
         user_id=user_id,
         plan_length=payload.plan_length,
         cefr_level=payload.cefr_level,
@@ -247,29 +245,301 @@ def generate_learning_plan(
         interests_json=payload.interests,
         persona_json=plan_data.get("persona"),
         status="active",
-        version=plan_version,
+        version=int(max_version) + 1,
     )
     db.add(plan)
 
     lessons = plan_data.get("lessons", [])
     for lesson in lessons:
-        lesson_index = int(lesson.get("lesson_index", 0)) or len(lessons)
-        status = "open" if lesson_index == 1 else "locked"
-        db.add(
-            LearningPlanLesson(
-                id=str(uuid4()),
-                plan_id=plan_id,
-                lesson_index=lesson_index,
-                title=lesson.get("title", f"Lesson {lesson_index}"),
-                focus_programs_json=lesson.get("focus_terms", []),
-                lesson_payload_json=lesson,
-                status=status,
-            )
+        db.add(_lesson_row(plan.id, int(lesson.get("lesson_index", 0)) or len(lessons), lesson))
+    return plan
+
+
+def _lesson_row(plan_id: str, lesson_index: int, lesson: dict[str, Any]) -> LearningPlanLesson:
+    return LearningPlanLesson(
+        id=str(uuid4()),
+        plan_id=plan_id,
+        lesson_index=lesson_index,
+        title=lesson.get("title", f"Lesson {lesson_index}"),
+        focus_programs_json=lesson.get("focus_terms", []),
+        lesson_payload_json=lesson,
+        status="open" if lesson_index == 1 else "locked",
+    )
+
+
+async def _generate_plan_job(job: dict[str, Any], runner: PlanJobRunner) -> str | None:
+    """PLAN_JOBS handler: ask the LLM for the plan and store it in place of the fallback."""
+    payload = LearningPlanGenerateRequest(**job["request"])
+    if job["plan_id"] is not None:
+        # An earlier attempt was cut off mid-stream: complete its plan instead of starting another
+        writer = _StreamedPlan(runner.session_factory, job, payload)
+        return await run_in_threadpool(writer.finish, {}, _fallback_plan(payload)["lessons"])
+    if not LLM_CLIENT.configured:
+        raise PlanJobError("LLM provider is not available. Please contact support.")
+    if settings.learning_plan_stream:
+        return await _stream_plan_job(job, runner, payload)
+    try:
+        resp = await LLM_CLIENT.generate(_llm_payload(payload))
+    except httpx.HTTPError as exc:
+        raise PlanJobError(_job_error(exc))
+    if resp.status_code != 200:
+        raise PlanJobError("LLM provider error. Please try again later.")
+    await runner.progress(job["id"], 60)
+
+    try:
+        plan_data = _extract_json_from_text(_response_text(resp.json()))
+    except json.JSONDecodeError:
+        plan_data = None
+    if not isinstance(plan_data, dict) or not plan_data.get("lessons"):
+        raise PlanJobError("LLM returned an unusable plan. Please try again.")
+    await runner.progress(job["id"], 80)
+    return await run_in_threadpool(_store_job_plan, runner.session_factory, job, payload, plan_data)
+
+
+def _store_job_plan(
+    session_factory: Callable[[], Session],
+    job: dict[str, Any],
+    payload: LearningPlanGenerateRequest,
+    plan_data: dict[str, Any],
+) -> str | None:
+    db = session_factory()
+    try:
+        # A newer generate request (or a finished retry of this job) already replaced the fallback
+        fallback = db.get(LearningPlan, job["fallback_plan_id"])
+        if fallback is None or fallback.status != "active":
+            return None
+        plan = _persist_plan(db, job["user_id"], payload, plan_data)
+        db.commit()
+        return plan.id
+    finally:
+        db.close()
+
+
+def _job_error(exc: Exception) -> str:
+    if isinstance(exc, httpx.TimeoutException):
+        return "Request to LLM provider timed out. Please try again."
+    if isinstance(exc, httpx.RequestError):
+        return "Unable to reach LLM provider. Please try again later."
+    if isinstance(exc, httpx.HTTPStatusError):
+        return "LLM provider error. Please try again later."
+    return "LLM returned an unusable plan. Please try again."
+
+
+async def _stream_plan_job(job: dict[str, Any], runner: PlanJobRunner, payload: LearningPlanGenerateRequest) -> str | None:
+    """
+    Streaming variant of _generate_plan_job: each lesson is stored as soon
+    as it has been generated, so lesson 1 of the new plan is usable while
+    the LLM is still writing the rest. If the stream breaks after some
+    lessons arrived, the missing ones are taken from the fallback plan;
+    the plan is recorded on the job, so a retry after the worker died
+    does the same.
+    """
+    parser = PlanStreamParser()
+    writer = _StreamedPlan(runner.session_factory, job, payload)
+    try:
+        async with aclosing(LLM_CLIENT.stream_generate(_llm_payload(payload))) as chunks:
+            async for chunk in chunks:
+                for lesson in parser.feed(chunk):
+                    if not await run_in_threadpool(writer.add, lesson, parser.fields):
+                        return None
+                    await runner.progress(job["id"], 10 + 85 * len(writer.stored) // payload.plan_length)
+                if parser.done:
+                    break
+    except (httpx.HTTPError, json.JSONDecodeError) as exc:
+        if writer.plan_id is None:
+            raise PlanJobError(_job_error(exc))
+        logger.warning("Plan stream for job %s broke after %d lessons: %r", job["id"], len(writer.stored), exc)
+    except Exception:
+        # The job fails, but the plan already replaced the fallback: leave it complete
+        if writer.plan_id is not None:
+            await run_in_threadpool(writer.finish, parser.fields, _fallback_plan(payload)["lessons"])
+        raise
+    if writer.plan_id is None:
+        raise PlanJobError("LLM returned an unusable plan. Please try again.")
+    return await run_in_threadpool(writer.finish, parser.fields, _fallback_plan(payload)["lessons"])
+
+
+class _StreamedPlan:
+    """The plan a streaming job is writing; each method runs in the threadpool with its own session."""
+
+    def __init__(
+        self, session_factory: Callable[[], Session], job: dict[str, Any], payload: LearningPlanGenerateRequest
+    ):
+        self.session_factory = session_factory
+        self.job = job
+        self.payload = payload
+        self.plan_id: str | None = job["plan_id"]
+        self.stored: set[int] = set()
+
+    def add(self, lesson: dict[str, Any], fields: dict[str, Any]) -> bool:
+        """Commit one lesson (the first one creates the plan); False once the plan was replaced."""
+        db = self.session_factory()
+        try:
+            if self.plan_id is None:
+                # Same check as _store_job_plan: a newer request may have replaced the fallback
+                fallback = db.get(LearningPlan, self.job["fallback_plan_id"])
+                if fallback is None or fallback.status != "active":
+                    return False
+                plan = _persist_plan(db, self.job["user_id"], self.payload, {"persona": fields.get("persona")})
+                db.query(LearningPlanJob).filter(LearningPlanJob.id == self.job["id"]).update({"plan_id": plan.id})
+                self.plan_id = plan.id
+            elif db.get(LearningPlan, self.plan_id).status != "active":
+                return False
+            lesson_index = int(lesson.get("lesson_index", 0)) or len(self.stored) + 1
+            if lesson_index not in self.stored and lesson_index <= self.payload.plan_length:
+                db.add(_lesson_row(self.plan_id, lesson_index, lesson))
+                self.stored.add(lesson_index)
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+    def finish(self, fields: dict[str, Any], fallback_lessons: list[dict[str, Any]]) -> str | None:
+        """Fill in the persona and any lessons the stream did not deliver."""
+        db = self.session_factory()
+        try:
+            plan = db.get(LearningPlan, self.plan_id)
+            if plan.status != "active":
+                return None
+            if plan.persona_json is None and fields.get("persona") is not None:
+                plan.persona_json = fields["persona"]
+            # From the database: a retry finishes a plan an earlier attempt started
+            stored = {
+                index
+                for (index,) in db.query(LearningPlanLesson.lesson_index).filter(LearningPlanLesson.plan_id == plan.id)
+            }
+            for lesson in fallback_lessons:
+                if lesson["lesson_index"] not in stored:
+                    db.add(_lesson_row(plan.id, lesson["lesson_index"], lesson))
+            db.commit()
+            return plan.id
+        finally:
+            db.close()
+
+
+PLAN_JOBS = PlanJobRunner(
+    SessionLocal,
+    _generate_plan_job,
+    workers=settings.learning_plan_job_workers,
+    max_attempts=settings.learning_plan_job_max_attempts,
+    stale_after=settings.learning_plan_job_stale_s,
+    sweep_every=settings.learning_plan_job_sweep_s,
+)
+
+
+@router.post("/learning-plan/generate", response_model=LearningPlanGenerateResponse)
+def generate_learning_plan(
+    payload: LearningPlanGenerateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    user_id = current_user.id
+
+    if settings.learning_plan_jobs:
+        # Answer with the deterministic plan now; PLAN_JOBS replaces it with the LLM plan
+        plan_data = _fallback_plan(payload)
+        plan = _persist_plan(db, user_id, payload, plan_data)
+        job = LearningPlanJob(
+            id=str(uuid4()),
+            user_id=user_id,
+            status="queued",
+            progress=0,
+            attempts=0,
+            request_json=payload.model_dump(),
+            fallback_plan_id=plan.id,
+        )
+        db.add(job)
+        db.commit()
+        PLAN_JOBS.notify(job.id)
+        return LearningPlanGenerateResponse(
+            plan_id=plan.id,
+            version=plan.version,
+            status="active",
+            job_id=job.id,
+            job_status="queued",
+            fallback_plan=plan_data,
         )
 
+    # Try LLM generation; fallback to deterministic plan
+    plan_data: dict[str, Any]
+    try:
+        text = _response_text(_call_gemini(_llm_payload(payload)))
+        plan_data = _extract_json_from_text(text) if text else _fallback_plan(payload)
+    except Exception:
+        plan_data = _fallback_plan(payload)
+
+    plan = _persist_plan(db, user_id, payload, plan_data)
     db.commit()
 
-    return LearningPlanGenerateResponse(plan_id=plan_id, version=plan_version, status="active")
+    return LearningPlanGenerateResponse(plan_id=plan.id, version=plan.version, status="active")
+
+
+def _job_response(job: LearningPlanJob) -> LearningPlanJobResponse:
+    return LearningPlanJobResponse(
+        job_id=job.id,
+        status=job.status,
+        progress=job.progress,
+        fallback_plan_id=job.fallback_plan_id,
+        plan_id=job.plan_id,
+        error=job.error,
+    )
+
+
+def _load_job(job_id: str, user_id: str) -> LearningPlanJobResponse | None:
+    db = PLAN_JOBS.session_factory()
+    try:
+        job = db.query(LearningPlanJob).filter(LearningPlanJob.id == job_id, LearningPlanJob.user_id == user_id).first()
+        return _job_response(job) if job else None
+    finally:
+        db.close()
+
+
+@router.get("/learning-plan/jobs/{job_id}", response_model=LearningPlanJobResponse)
+def get_plan_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = _load_job(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/learning-plan/jobs/{job_id}/events")
+async def plan_job_events(job_id: str, current_user: User = Depends(get_current_user)):
+    """Server-sent ``progress`` events while the job changes, then one ``done`` event."""
+    job = await run_in_threadpool(_load_job, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        _job_events(job, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _job_events(job: LearningPlanJobResponse, user_id: str):
+    # Polls the table rather than the runner, so any process can serve the stream
+    deadline = time.monotonic() + settings.learning_plan_job_events_timeout_s
+    last = None
+    while True:
+        data = job.model_dump_json()
+        if job.status in TERMINAL_STATUSES:
+            yield _sse("done", data)
+            return
+        if data != last:
+            yield _sse("progress", data)
+            last = data
+        if time.monotonic() >= deadline:
+            # The client can reconnect (or poll GET /jobs/{id}) to keep waiting
+            yield _sse("error", json.dumps({"detail": "Job is still running. Please check again later."}))
+            return
+        await asyncio.sleep(settings.learning_plan_job_poll_s)
+        job = await run_in_threadpool(_load_job, job.job_id, user_id)
+        if job is None:
+            yield _sse("error", json.dumps({"detail": "Job not found"}))
+            return
 
 
 @router.get("/learning-plan/current", response_model=LearningPlanCurrentResponse)
@@ -1,27 +1,191 @@
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from app.db import get_db
-from app.models import OrchestratorLog
+from app.config import settings
+from app.conversation import ConversationStore, SqlConversationBackend, Turn
+from app.db import SessionLocal
+from app.log_writer import OrchestratorLogWriter
 from app.schemas import OrchestratorRequest, OrchestratorResponse
-from app.guard.guard_v2 import input_check_v2, output_check_v2
+from app.guard.erosion_store import SqlErosionStore
+from app.guard.executor import GuardExecutor, GuardOverloadedError, input_check_async, output_check_async
+from app.guard.guard_v2 import EROSION_DETECTOR, combine_risk
+from app.guard.redact import StreamRedactor
+from app.guard.schemas import AgentHandoff, AgentResponse, AgentTelemetryRisk
 from app.agents.router import select_agent
+from app.agents.streaming import MessageSource, TemplateSource, collect, with_message
 from app.agents import tutor, buddy, assessor, planner
+from app.timing import StageHistograms, StageTimer, activate, deactivate, stage
 
 router = APIRouter()
 
+if settings.guard_erosion_persist:
+    EROSION_DETECTOR.store = SqlErosionStore(SessionLocal)
+
+# Guard checks run here instead of the shared threadpool (shut down in main.py)
+GUARD_EXECUTOR = GuardExecutor(
+    settings.guard_pool_workers,
+    settings.guard_pool_max_pending,
+    settings.guard_pool_niceness,
+)
+
+# Per-stage latency of orchestrator requests (ORCHESTRATOR_TIMING=true)
+STAGE_HISTOGRAMS = StageHistograms()
+
+# Audit log rows are written behind the response (started/flushed in main.py)
+LOG_WRITER = OrchestratorLogWriter(
+    SessionLocal,
+    max_queue=settings.orchestrator_log_queue_size,
+    batch_size=settings.orchestrator_log_batch_size,
+    flush_interval=settings.orchestrator_log_flush_ms / 1000,
+)
+
+# Each user's last turns, read here instead of client-resent history; new
+# turns are stored behind the response (started/flushed in main.py)
+CONVERSATIONS = ConversationStore(
+    settings.conversation_turns,
+    settings.conversation_max_users,
+    SqlConversationBackend(SessionLocal) if settings.conversation_persist else None,
+    cache_ttl=settings.conversation_cache_ttl_s,
+    max_queue=settings.conversation_queue_size,
+)
+
+# Produces the agents' message text; blocked turns always use the template
+TEMPLATE_SOURCE = TemplateSource()
+MESSAGE_SOURCE: MessageSource = TEMPLATE_SOURCE
+
 
 @router.post("/orchestrator/message", response_model=OrchestratorResponse)
-def orchestrator_message(payload: OrchestratorRequest, db: Session = Depends(get_db)):
-    # Get context messages for multi-turn analysis
-    context_messages = None
-    if payload.context and isinstance(payload.context.get("recent_messages"), list):
-        context_messages = payload.context["recent_messages"]
-    
-    # Enhanced input guard v2
-    input_result = input_check_v2(payload.last_user_message, context_messages=context_messages)
+async def orchestrator_message(payload: OrchestratorRequest):
+    if not settings.orchestrator_timing:
+        return await _orchestrate(payload)
+
+    timer = StageTimer()
+    token = activate(timer)
+    try:
+        response = await _orchestrate(payload)
+    finally:
+        deactivate(token)
+    STAGE_HISTOGRAMS.record_timer(timer)
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+
+@router.post("/orchestrator/message/stream")
+async def orchestrator_message_stream(payload: OrchestratorRequest):
+    """
+    Server-sent events variant of /orchestrator/message.
+
+    Events: ``meta`` (agent and locale, once routed), ``delta`` (message
+    text as it is generated, already redacted by a sliding-window output
+    guard), then ``done`` with the full response as /orchestrator/message
+    returns it, or ``error``. Input guard failures are plain HTTP errors.
+    A stream the client abandons is not logged.
+    """
+    timer = StageTimer() if settings.orchestrator_timing else None
+    token = activate(timer) if timer else None
+    try:
+        input_result, response, ctx = await _prepare(payload)
+    finally:
+        if token:
+            deactivate(token)
+    return StreamingResponse(
+        _stream_events(payload, input_result, response, ctx, timer),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _mark_first_token(timer: StageTimer | None) -> None:
+    """Record time to first token (from request start) as the ttft stage."""
+    if timer and "ttft" not in timer.stages:
+        timer.add("ttft", time.perf_counter() - timer.started)
+
+
+async def _stream_events(
+    payload: OrchestratorRequest,
+    input_result: dict[str, Any],
+    response: AgentResponse,
+    ctx: dict[str, Any],
+    timer: StageTimer | None,
+) -> AsyncIterator[str]:
+    token = activate(timer) if timer else None
+    try:
+        yield _sse("meta", json.dumps({"agent": response.agent, "locale": response.locale}))
+
+        source = TEMPLATE_SOURCE if input_result["risk"]["blocked"] else MESSAGE_SOURCE
+        redactor = StreamRedactor(settings.orchestrator_stream_guard_window)
+        parts = []
+        async for chunk in source.stream(response, ctx):
+            parts.append(chunk)
+            text = redactor.feed(chunk)
+            if text:
+                _mark_first_token(timer)
+                yield _sse("delta", json.dumps({"text": text}, ensure_ascii=False))
+        text = redactor.finish()
+        if text:
+            _mark_first_token(timer)
+            yield _sse("delta", json.dumps({"text": text}, ensure_ascii=False))
+
+        # The full-response output guard still decides the final risk
+        try:
+            generated = _generated(response, "".join(parts))
+            response = await _finish(payload, input_result, generated, generated_message=generated is not response)
+        except HTTPException as exc:
+            yield _sse("error", json.dumps({"detail": exc.detail}))
+            return
+        yield _sse("done", response.public_json())
+    finally:
+        if token:
+            deactivate(token)
+    if timer:
+        STAGE_HISTOGRAMS.record_timer(timer)
+
+
+async def _orchestrate(payload: OrchestratorRequest) -> Response:
+    input_result, templated, ctx = await _prepare(payload)
+    response = templated
+    if MESSAGE_SOURCE is not TEMPLATE_SOURCE and not input_result["risk"]["blocked"]:
+        with stage("generate"):
+            response = _generated(templated, await collect(MESSAGE_SOURCE, templated, ctx))
+    response = await _finish(payload, input_result, response, generated_message=response is not templated)
+
+    # Already validated once by build_response; skip FastAPI's response_model pass
+    return Response(content=response.public_json(), media_type="application/json")
+
+
+def _generated(response: AgentResponse, message: str) -> AgentResponse:
+    """The response with its generated message, held to the same schema as a templated one."""
+    if message == response.message:
+        return response
+    try:
+        return with_message(response, message)
+    except ValidationError:
+        raise HTTPException(status_code=502, detail="Agent produced an invalid response. Please try again.")
+
+
+async def _prepare(payload: OrchestratorRequest) -> tuple[dict[str, Any], AgentResponse, dict[str, Any]]:
+    """Input guard, routing and the agent's templated response."""
+    try:
+        # Enhanced input guard v2 (multi-turn erosion is tracked server-side per user)
+        with stage("guard_input"):
+            input_result = await input_check_async(GUARD_EXECUTOR, payload.last_user_message, payload.user_id)
+    except GuardOverloadedError:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
     
     # Safe mode: force TutorAgent or BuddyAgent
     if input_result["mode"] == "safe":
@@ -31,98 +195,104 @@ def orchestrator_message(payload: OrchestratorRequest, db: Session = Depends(get
         ctx["safety_mode"] = True
     else:
         # Normal routing
-        agent_name, ctx = select_agent(
-            input_result["sanitized_user_message"],
-            payload.fsm_state,
-            payload.context or {},
-            input_result["risk"]["level"],
-        )
+        with stage("select_agent"):
+            agent_name, ctx = select_agent(
+                input_result["sanitized_user_message"],
+                payload.fsm_state,
+                payload.context or {},
+                input_result["risk"]["level"],
+                input_result.get("routing_text"),
+            )
+
+    # Server-side history replaces anything the client sent as recent_messages
+    # (from the in-memory LRU; the database is only read on a miss)
+    with stage("context_load"):
+        history = await CONVERSATIONS.recent(payload.user_id)
 
     ctx.update(
         {
             "last_user_message": input_result["sanitized_user_message"],
+            "recent_messages": [turn.user_message for turn in history],
             "fsm_state": payload.fsm_state,
             "locale": payload.locale,
         }
     )
 
-    # Generate response
-    if input_result["risk"]["blocked"]:
-        response = buddy.respond(payload.locale, ctx)
-        response["telemetry"]["risk"] = input_result["risk"]
-        response["handoff"]["to_agent"] = "BuddyAgent"
-    else:
-        if agent_name == "TutorAgent":
-            response = tutor.respond(payload.locale, ctx)
-        elif agent_name == "BuddyAgent":
+    # Generate response (blocks of template-rendered responses are shared:
+    # replace them, never mutate them in place)
+    with stage("agent"):
+        if input_result["risk"]["blocked"]:
             response = buddy.respond(payload.locale, ctx)
-        elif agent_name == "PlannerAgent":
-            response = planner.respond(payload.locale, ctx)
+            response.telemetry = response.telemetry.model_copy(
+                update={"risk": AgentTelemetryRisk(**input_result["risk"])}
+            )
+            response.handoff = AgentHandoff(to_agent="BuddyAgent")
         else:
-            assessor_response = assessor.respond(payload.locale, ctx)
-            tutor_response = tutor.respond(payload.locale, ctx)
-            tutor_response["telemetry"]["events"].extend(assessor_response["telemetry"].get("events", []))
-            response = tutor_response
+            if agent_name == "TutorAgent":
+                response = tutor.respond(payload.locale, ctx)
+            elif agent_name == "BuddyAgent":
+                response = buddy.respond(payload.locale, ctx)
+            elif agent_name == "PlannerAgent":
+                response = planner.respond(payload.locale, ctx)
+            else:
+                assessor_response = assessor.respond(payload.locale, ctx)
+                tutor_response = tutor.respond(payload.locale, ctx)
+                tutor_response.telemetry = tutor_response.telemetry.model_copy(
+                    update={"events": tutor_response.telemetry.events + assessor_response.telemetry.events}
+                )
+                response = tutor_response
+    return input_result, response, ctx
 
-    # Enhanced output guard v2
-    output_result = output_check_v2(response)
-    
-    # If output was blocked, use fallback
-    if not output_result["accepted"]:
-        response = output_result["response"]
-    else:
-        response = output_result["response"]
 
-    # Aggregate risk from input and output
-    input_risk = input_result["risk"]
-    output_risk = output_result["risk"]
-    
-    # Combine flags
-    risk_flags = list(set(input_risk.get("flags", []) + output_risk.get("flags", [])))
-    
-    # Determine final level (max of both)
-    level_map = {"low": 0, "medium": 1, "high": 2}
-    final_level = max(
-        input_risk.get("level", "low"),
-        output_risk.get("level", "low"),
-        key=lambda x: level_map.get(x, 0)
-    )
-    
-    # Final score (max of both)
-    final_score = max(
-        input_risk.get("score", 0.0),
-        output_risk.get("score", 0.0)
-    )
-    
-    # Blocked if either is blocked
-    final_blocked = input_risk.get("blocked", False) or output_risk.get("blocked", False)
-    
-    # Combine notes
-    notes_parts = []
-    if input_risk.get("notes"):
-        notes_parts.append(f"Input: {input_risk['notes']}")
-    if output_risk.get("notes"):
-        notes_parts.append(f"Output: {output_risk['notes']}")
-    final_notes = " | ".join(notes_parts) if notes_parts else ""
-    
-    # Update response telemetry
-    response["telemetry"]["risk"] = {
-        "blocked": final_blocked,
-        "level": final_level,
-        "score": final_score,
-        "flags": risk_flags,
-        "notes": final_notes,
-    }
-
-    db.add(
-        OrchestratorLog(
-            id=str(uuid4()),
-            user_id=payload.user_id,
-            input_json={"message": payload.last_user_message},
-            output_json=response,
-            risk_json=response["telemetry"]["risk"],
+async def _finish(
+    payload: OrchestratorRequest,
+    input_result: dict[str, Any],
+    response: AgentResponse,
+    generated_message: bool = False,
+) -> AgentResponse:
+    """Output guard, final risk and the audit log row (generated_message: see app.log_store)."""
+    # Enhanced output guard v2 (agents return validated AgentResponse objects)
+    try:
+        with stage("guard_output"):
+            output_result = await output_check_async(GUARD_EXECUTOR, response)
+    except GuardOverloadedError:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
         )
+    response = output_result["response"]
+
+    # Aggregate risk from input and output
+    response.telemetry = response.telemetry.model_copy(
+        update={"risk": AgentTelemetryRisk(**combine_risk(input_result["risk"], output_result["risk"]))}
     )
-    db.commit()
+    output_json = response.model_dump()
 
+    # Blocked turns stay out of the conversation history; stored behind the response
+    if not input_result["risk"]["blocked"]:
+        with stage("context_save"):
+            await CONVERSATIONS.append(
+                payload.user_id,
+                Turn(
+                    turn_id=payload.turn_id or uuid4().hex,
+                    user_message=input_result["sanitized_user_message"],
+                    agent=response.agent,
+                    reply=response.message,
+                ),
+            )
+
+    # Queued for the background writer; only waits when the queue is full
+    with stage("log_enqueue"):
+        await LOG_WRITER.submit(
+            {
+                "id": str(uuid4()),
+                "user_id": payload.user_id,
+                "input_json": {"message": payload.last_user_message},
+                "output_json": output_json,
+                "risk_json": output_json["telemetry"]["risk"],
+                "generated_message": generated_message,
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
     return response
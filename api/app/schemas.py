@@ -52,6 +52,9 @@ class OrchestratorRequest(BaseModel):
     locale: str = "ru"
     fsm_state: str = ""
     last_user_message: str
+    # Client-chosen id of this turn; a retry with the same id is not recorded twice.
+    # History is kept server-side, so context no longer needs recent_messages.
+    turn_id: str | None = Field(default=None, max_length=64)
     context: dict[str, Any] | None = None
 
 
@@ -166,6 +169,19 @@ class LearningPlanGenerateResponse(BaseModel):
     plan_id: str
     version: int
     status: Literal["active", "archived"]
+    # Job mode: plan_id is the fallback plan; the LLM plan follows as a new version
+    job_id: str | None = None
+    job_status: str | None = None
+    fallback_plan: dict[str, Any] | None = None
+
+
+class LearningPlanJobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed", "superseded"]
+    progress: int
+    fallback_plan_id: str | None = None
+    plan_id: str | None = None
+    error: str | None = None
 
 
 class LearningPlanLessonShort(BaseModel):
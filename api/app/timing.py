@@ -0,0 +1,153 @@
+"""Per-request stage timing (Server-Timing) and in-process stage histograms."""
+
+import bisect
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from typing import Any
+
+_CURRENT_TIMER: ContextVar["StageTimer | None"] = ContextVar("stage_timer", default=None)
+_NO_STAGE = nullcontext()
+
+
+class StageTimer:
+    """Accumulates seconds per named stage for one request."""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, stages: dict[str, float]) -> None:
+        for name, seconds in stages.items():
+            self.add(name, seconds)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        entries = [f"{name};dur={seconds * 1e3:.2f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={self.total() * 1e3:.2f}")
+        return ", ".join(entries)
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+def stage(name: str):
+    """
+    Time a block into the current request's timer, if there is one.
+
+    Without an active timer this returns a shared no-op context manager,
+    so instrumented code costs one context-variable lookup.
+    """
+    timer = _CURRENT_TIMER.get()
+    if timer is None:
+        return _NO_STAGE
+    return _Stage(timer, name)
+
+
+def current_timer() -> StageTimer | None:
+    return _CURRENT_TIMER.get()
+
+
+def activate(timer: StageTimer | None) -> Token:
+    """Make timer current for this context; undo with deactivate(token)."""
+    return _CURRENT_TIMER.set(timer)
+
+
+def deactivate(token: Token) -> None:
+    _CURRENT_TIMER.reset(token)
+
+
+def call_timed(func: Any, *args: Any) -> tuple[Any, dict[str, float]]:
+    """
+    Run func(*args) under a fresh timer and return (result, stages).
+
+    For work that runs in another process, where the caller's context
+    variable is not visible; the caller merges the stages back.
+    """
+    timer = StageTimer()
+    token = activate(timer)
+    try:
+        return func(*args), timer.stages
+    finally:
+        deactivate(token)
+
+
+class StageHistograms:
+    """
+    Fixed-bucket latency histograms per stage.
+
+    Buckets are upper bounds in milliseconds (Prometheus-style, cumulative
+    on export). Recording is a bisect and two increments; percentiles are
+    estimated from the buckets. Meant to be updated from the event loop.
+    """
+
+    BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self) -> None:
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        counts = self._counts.get(name)
+        if counts is None:
+            counts = self._counts[name] = [0] * (len(self.BUCKETS_MS) + 1)
+            self._sums[name] = 0.0
+        counts[bisect.bisect_left(self.BUCKETS_MS, seconds * 1e3)] += 1
+        self._sums[name] += seconds
+
+    def record_timer(self, timer: StageTimer) -> None:
+        for name, seconds in timer.stages.items():
+            self.record(name, seconds)
+        self.record("total", timer.total())
+
+    def _percentile(self, counts: list[int], fraction: float) -> float | None:
+        """Upper bound (ms) of the bucket holding the given fraction of samples (None: overflow)."""
+        rank = fraction * sum(counts)
+        seen = 0
+        for bound, count in zip(self.BUCKETS_MS, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        result = {}
+        for name, counts in self._counts.items():
+            total = sum(counts)
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.BUCKETS_MS, counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = total
+            result[name] = {
+                "count": total,
+                "mean_ms": round(self._sums[name] / total * 1e3, 3) if total else 0.0,
+                "p50_ms": self._percentile(counts, 0.50),
+                "p95_ms": self._percentile(counts, 0.95),
+                "p99_ms": self._percentile(counts, 0.99),
+                "buckets": buckets,
+            }
+        return result
+
+    def reset(self) -> None:
+        self._counts.clear()
+        self._sums.clear()
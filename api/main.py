@@ -1,12 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.db import Base, engine
+from app.llm import LLM_CLIENT, LLM_FLIGHTS
+from app.llm_cache import LLM_CACHE
 from app.routers import courses, dashboard, progress, orchestrator, telegram, auth, ai, learning_plan, minigame_truefalse
 from app.guard.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from app.security import get_current_user
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await orchestrator.LOG_WRITER.start()
+    await orchestrator.CONVERSATIONS.start()
+    ensure_sqlite_tables()
+    await learning_plan.PLAN_JOBS.start()
+    try:
+        yield
+    finally:
+        await learning_plan.PLAN_JOBS.stop()
+        await orchestrator.CONVERSATIONS.stop()
+        await orchestrator.LOG_WRITER.stop()
+        orchestrator.GUARD_EXECUTOR.shutdown()
+        await LLM_CLIENT.aclose()
+        if LLM_CACHE.disk is not None:
+            LLM_CACHE.disk.close()
 
-app = FastAPI(title="SmartSpeek API", version="0.1.0")
+
+app = FastAPI(title="SmartSpeek API", version="0.1.0", lifespan=lifespan)
 
 # Security headers middleware (first, so it applies to all responses)
 app.add_middleware(SecurityHeadersMiddleware)
@@ -26,6 +50,7 @@ rate_limits = {
     "/api/auth/register": (10, 60),  # 10 requests per minute
     "/api/orchestrator/message": (30, 60),  # 30 requests per minute
     "/api/ai": (20, 60),  # 20 requests per minute for all /api/ai/* endpoints
+    "/api/health/": (30, 60),  # internal stats; /api/health itself is exempt
 }
 app.add_middleware(RateLimitMiddleware, limits=rate_limits)
 
@@ -39,7 +64,7 @@ app.include_router(ai.router, prefix="/api", tags=["ai"])
 app.include_router(learning_plan.router, prefix="/api", tags=["learning-plan"])
 app.include_router(minigame_truefalse.router, prefix="/api", tags=["minigame-truefalse"])
 
-@app.on_event("startup")
+
 def ensure_sqlite_tables():
     if str(engine.url).startswith("sqlite"):
         Base.metadata.create_all(bind=engine)
@@ -66,6 +91,17 @@ def ensure_sqlite_tables():
                 }
                 if "ix_users_email" not in idx:
                     conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)")
+                # Compact orchestrator log columns (see app.log_store)
+                log_cols = {
+                    row[1] for row in conn.exec_driver_sql("PRAGMA table_info(orchestrator_logs)").fetchall()
+                }
+                if "template_hash" not in log_cols:
+                    conn.exec_driver_sql("ALTER TABLE orchestrator_logs ADD COLUMN template_hash VARCHAR(64)")
+                if "vars_json" not in log_cols:
+                    conn.exec_driver_sql("ALTER TABLE orchestrator_logs ADD COLUMN vars_json JSON")
+                conn.exec_driver_sql(
+                    "CREATE INDEX IF NOT EXISTS ix_orchestrator_logs_created_at ON orchestrator_logs (created_at)"
+                )
                 conn.commit()
         except Exception:
             # Don't block startup in dev; auth endpoint will surface issues if any remain.
@@ -75,3 +111,49 @@ def ensure_sqlite_tables():
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
+
+
+def require_health_details() -> None:
+    """Internal stats exist only with HEALTH_DETAILS=true."""
+    if not settings.health_details:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+# Checked in order: disabled endpoints are a 404 before any auth
+health_details = APIRouter(
+    prefix="/api/health",
+    dependencies=[Depends(require_health_details), Depends(get_current_user)],
+)
+
+
+@health_details.get("/guard")
+def guard_health():
+    """Guard executor load (queue depth, rejections)."""
+    return orchestrator.GUARD_EXECUTOR.stats()
+
+
+@health_details.get("/timing")
+def orchestrator_timing():
+    """Per-stage orchestrator latency histograms (ORCHESTRATOR_TIMING=true)."""
+    return orchestrator.STAGE_HISTOGRAMS.snapshot()
+
+
+@health_details.get("/orchestrator-log")
+def orchestrator_log_health():
+    """Write-behind audit log queue (depth, rows written, failures)."""
+    return orchestrator.LOG_WRITER.stats()
+
+
+@health_details.get("/plan-jobs")
+def plan_jobs_health():
+    """Learning-plan generation workers (queue depth, finished jobs)."""
+    return learning_plan.PLAN_JOBS.stats()
+
+
+@health_details.get("/llm-cache")
+def llm_cache_health():
+    """LLM response cache size and per-endpoint hits/misses, plus coalesced calls."""
+    return {**LLM_CACHE.stats(), "single_flight": LLM_FLIGHTS.stats()}
+
+
+app.include_router(health_details, tags=["health"])
@@ -0,0 +1,6 @@
+import os
+
+# app.config requires DATABASE_URL; tests that import app modules use SQLite
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+# Keep the LLM response cache's file tier out of the working tree
+os.environ.setdefault("LLM_CACHE_PATH", "")
@@ -0,0 +1,50 @@
+"""Tests for precompiled agent response templates."""
+
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from app.agents import assessor, buddy, planner, tutor
+from app.guard.guard_v2 import output_check_v2
+from app.guard.schemas import AgentResponse
+
+CONTEXT = {"last_user_message": "I am work on it", "fsm_state": "lesson"}
+
+
+@pytest.mark.parametrize("agent", [tutor, buddy, planner, assessor])
+def test_rendered_response_is_schema_valid(agent):
+    response = agent.respond("ru", dict(CONTEXT))
+
+    # Same content as a fully validated response, and it survives the process pool
+    assert AgentResponse.model_validate(response.model_dump()) == AgentResponse.model_validate(
+        pickle.loads(pickle.dumps(response)).model_dump()
+    )
+    assert output_check_v2(response)["accepted"] is True
+
+
+def test_static_blocks_are_shared_and_frozen():
+    first, second = planner.respond("ru", {}), planner.respond("en", {})
+
+    assert first is not second
+    assert first.ui is second.ui
+    assert first.telemetry is second.telemetry
+    with pytest.raises(ValidationError):
+        first.handoff.to_agent = "BuddyAgent"
+    with pytest.raises(ValidationError):
+        first.telemetry.risk.blocked = True
+
+
+def test_per_turn_fields_are_overlaid():
+    first = tutor.respond("ru", {**CONTEXT, "last_user_message": "first"})
+    second = tutor.respond("ru", {**CONTEXT, "last_user_message": "second"})
+
+    assert first.learning.micro_fix[0]["before"] == "first"
+    assert second.learning.micro_fix[0]["before"] == "second"
+    assert first.learning.mini_practice is second.learning.mini_practice
+    assert first.ui is second.ui
+
+
+def test_per_turn_fields_are_validated():
+    with pytest.raises(ValidationError):
+        tutor.respond("ru", {**CONTEXT, "confidence_score": 7})
@@ -0,0 +1,113 @@
+"""Tests for the server-side multi-turn erosion detector."""
+
+import pytest
+
+from app.guard.erosion import ErosionDetector, ErosionState, count_triggers
+from app.guard.guard_v2 import EROSION_DETECTOR, INPUT_VERDICT_CACHE, input_check_v2
+
+
+@pytest.fixture(autouse=True)
+def clear_state():
+    EROSION_DETECTOR.reset()
+    INPUT_VERDICT_CACHE.clear()
+    yield
+    EROSION_DETECTOR.reset()
+    INPUT_VERDICT_CACHE.clear()
+
+
+class FakeStore:
+    def __init__(self):
+        self.rows: dict[str, dict] = {}
+        self.loads = 0
+        self.saves = 0
+
+    def load(self, user_id):
+        self.loads += 1
+        data = self.rows.get(user_id)
+        return ErosionState.from_dict(data) if data else None
+
+    def save(self, user_id, state):
+        self.saves += 1
+        self.rows[user_id] = state.to_dict()
+
+
+def test_count_triggers():
+    assert count_triggers("Remember what you said earlier?") == 2
+    assert count_triggers("Как дела?") == 0
+
+
+def test_flags_after_enough_turns():
+    """Triggers spread over a conversation flag once min_turns is reached."""
+    detector = ErosionDetector()
+    results = [detector.observe("u1", f"remember step {i}") for i in range(6)]
+    assert results[:5] == [False] * 5
+    assert results[5] is True
+
+
+def test_decay_clears_flag():
+    """Clean turns decay the score back under the threshold."""
+    detector = ErosionDetector()
+    for i in range(6):
+        detector.observe("u1", f"continue {i}")
+    assert detector.observe("u1", "Что такое present perfect?") is True
+
+    flagged = [detector.observe("u1", f"Пример номер {i}") for i in range(4)]
+    assert flagged[-1] is False
+
+
+def test_retry_does_not_advance_state():
+    """A resent identical message is not counted as a new turn."""
+    detector = ErosionDetector()
+    for _ in range(10):
+        detector.observe("u1", "remember this")
+    state = detector.state_for("u1")
+    assert state.turns == 1
+
+
+def test_users_are_independent_and_lru_bounded():
+    detector = ErosionDetector(max_users=2)
+    detector.observe("a", "hello")
+    detector.observe("b", "hello")
+    detector.observe("a", "again")
+    detector.observe("c", "hello")
+
+    assert detector.state_for("b") is None
+    assert detector.state_for("a") is not None
+    assert detector.state_for("c") is not None
+
+
+def test_store_restores_evicted_state():
+    """State survives eviction (or a restart) through the store."""
+    store = FakeStore()
+    detector = ErosionDetector(store=store)
+    for i in range(5):
+        detector.observe("u1", f"go on {i}")
+    assert store.saves == 5
+    assert store.loads == 1
+
+    restarted = ErosionDetector(store=store)
+    assert restarted.observe("u1", "go on 5") is True
+    assert store.loads == 2
+    assert restarted.state_for("u1").turns == 6
+
+
+def test_input_check_v2_uses_server_state():
+    """With user_id the flag comes from stored turns, not client context."""
+    for i in range(5):
+        result = input_check_v2(f"previous answer {i}", user_id="u1")
+        assert "MULTI_TURN_EROSION" not in result["risk"]["flags"]
+
+    result = input_check_v2("previous answer 5", user_id="u1")
+    assert "MULTI_TURN_EROSION" in result["risk"]["flags"]
+    assert result["risk"]["level"] == "medium"
+    assert result["mode"] == "normal"
+
+    # The cached base verdict stays clean for other users
+    other = input_check_v2("previous answer 5", user_id="u2")
+    assert "MULTI_TURN_EROSION" not in other["risk"]["flags"]
+
+
+def test_client_context_ignored_with_user_id():
+    context = ["remember", "earlier", "continue", "go on", "recall", "previous"]
+    result = input_check_v2("Привет", context_messages=context, user_id="u1")
+    assert "MULTI_TURN_EROSION" not in result["risk"]["flags"]
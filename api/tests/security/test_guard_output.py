@@ -2,7 +2,9 @@
 
 import pytest
 
+from app.agents.utils import build_response
 from app.guard.guard_v2 import output_check_v2
+from app.guard.schemas import AgentResponse
 
 
 def test_valid_response_accepted():
@@ -203,3 +205,30 @@ def test_fallback_response_structure():
     assert fallback["locale"] == "ru"
     assert len(fallback["message"]) > 0
     assert "guard_blocked_output" in fallback["telemetry"]["events"]
+
+
+def test_trusted_response_skips_revalidation(monkeypatch):
+    """Responses from build_response are not validated a second time."""
+    response = build_response("TutorAgent", "ru", "Вот правильный ответ.")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("model_validate called for a trusted response")
+
+    monkeypatch.setattr(AgentResponse, "model_validate", fail)
+    result = output_check_v2(response)
+
+    assert result["accepted"] is True
+    assert result["response"] is response
+
+
+def test_trusted_response_is_redacted():
+    """Content checks still apply to trusted responses."""
+    key = "sk-" + "a" * 40
+    response = build_response("TutorAgent", "ru", f"Here is the key {key}")
+
+    result = output_check_v2(response)
+
+    assert result["accepted"] is False
+    assert isinstance(result["response"], AgentResponse)
+    assert key not in result["response"].message
+    assert "[REDACTED_OPENAI_KEY]" in result["response"].message
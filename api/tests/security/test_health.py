@@ -0,0 +1,40 @@
+"""Tests for the internal /api/health/* stats endpoints."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.models import User
+from app.security import get_current_user
+
+DETAILS = [
+    "/api/health/guard",
+    "/api/health/timing",
+    "/api/health/orchestrator-log",
+    "/api/health/plan-jobs",
+    "/api/health/llm-cache",
+]
+
+
+@pytest.fixture
+def client():
+    # No lifespan: the stats are read, nothing is started
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("path", DETAILS)
+def test_stats_do_not_exist_by_default(client, path):
+    main.app.dependency_overrides[get_current_user] = lambda: User(id="u1")
+
+    assert client.get(path).status_code == 404
+    assert client.get("/api/health").json() == {"status": "ok"}
+
+
+@pytest.mark.parametrize("path", DETAILS)
+def test_enabled_stats_require_a_signed_in_user(client, monkeypatch, path):
+    monkeypatch.setattr(main.settings, "health_details", True)
+
+    assert client.get(path).status_code == 401
+    main.app.dependency_overrides[get_current_user] = lambda: User(id="u1")
+    assert client.get(path).status_code == 200
@@ -0,0 +1,107 @@
+"""Tests for the content-addressed LLM response cache."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.llm import GeminiClient
+from app.llm_cache import LLMResponseCache, SqliteResponseStore, response_key
+from app.routers import ai
+
+BODY = {"candidates": [{"content": {"parts": [{"text": "tip"}]}}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _payload(text: str) -> dict:
+    return {"contents": [{"parts": [{"text": text}]}]}
+
+
+def test_key_ignores_whitespace_but_not_model_or_content():
+    key = response_key("gemini-2.5-flash", _payload("Оцени ответ:  I  have went\n"))
+    assert key == response_key("gemini-2.5-flash", _payload("Оцени ответ: I have went"))
+    assert key != response_key("gemini-2.5-pro", _payload("Оцени ответ: I have went"))
+    assert key != response_key("gemini-2.5-flash", _payload("Оцени ответ: I went"))
+
+
+async def test_memory_tier_expires_and_evicts():
+    clock = Clock()
+    cache = LLMResponseCache(max_entries=2, clock=clock)
+    await cache.set("insights", "a", BODY, ttl_seconds=60)
+    await cache.set("insights", "b", BODY, ttl_seconds=600)
+    await cache.set("insights", "zero", BODY, ttl_seconds=0)
+
+    assert await cache.get("insights", "a") == BODY
+    clock.now += 61
+    assert await cache.get("insights", "a") is None
+    assert await cache.get("insights", "b") == BODY
+
+    await cache.set("insights", "c", BODY, ttl_seconds=600)
+    await cache.set("insights", "d", BODY, ttl_seconds=600)
+    assert await cache.get("insights", "b") is None
+    assert cache.stats()["endpoints"]["insights"] == {
+        "memory_hits": 2,
+        "disk_hits": 0,
+        "misses": 2,
+        "stores": 4,
+        "hit_ratio": 0.5,
+    }
+
+
+async def test_disk_tier_survives_a_new_process(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "llm_cache.sqlite3")
+    first = LLMResponseCache(disk=SqliteResponseStore(path, clock=clock), clock=clock)
+    await first.set("diagnostic", "k", BODY, ttl_seconds=60)
+    first.disk.close()
+
+    second = LLMResponseCache(disk=SqliteResponseStore(path, clock=clock), clock=clock)
+    assert await second.get("diagnostic", "k") == BODY
+    assert await second.get("diagnostic", "k") == BODY
+    assert second.stats()["endpoints"]["diagnostic"]["disk_hits"] == 1
+    assert second.stats()["endpoints"]["diagnostic"]["memory_hits"] == 1
+
+    clock.now += 61
+    third = LLMResponseCache(disk=SqliteResponseStore(path, clock=clock), clock=clock)
+    assert await third.get("diagnostic", "k") is None
+    second.disk.close()
+    third.disk.close()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    responses = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        handler.calls += 1
+        return responses.pop(0) if responses else httpx.Response(200, json=BODY)
+
+    handler.calls = 0
+    monkeypatch.setattr(ai, "LLM_CLIENT", GeminiClient("http://llm.test", "key", transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(ai, "LLM_CACHE", LLMResponseCache())
+    return handler, responses
+
+
+async def test_repeated_diagnostic_answers_reach_the_provider_once(upstream):
+    handler, responses = upstream
+    responses.append(httpx.Response(503, json={"error": {"message": "overloaded"}}))
+    app = FastAPI()
+    app.include_router(ai.router, prefix="/api")
+    answer = {"step_type": "grammar", "question": "Fix: I have went", "answer": "I went"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        # Provider errors are not cached
+        assert (await client.post("/api/ai/evaluate-diagnostic", json=answer)).status_code == 500
+        for _ in range(3):
+            response = await client.post("/api/ai/evaluate-diagnostic", json=answer)
+            assert response.json() == {"text": "tip", "status": "success"}
+
+    assert handler.calls == 2
+    stats = ai.LLM_CACHE.stats()["endpoints"]["evaluate_diagnostic"]
+    assert (stats["memory_hits"], stats["misses"], stats["stores"]) == (2, 2, 1)
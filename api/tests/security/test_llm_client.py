@@ -0,0 +1,86 @@
+"""Tests for the shared pooled Gemini client."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app import llm
+from app.llm import GeminiClient
+from app.llm_cache import LLMResponseCache
+from app.routers import ai, learning_plan
+
+
+def _reply(text: str):
+    def handler(request: httpx.Request) -> httpx.Response:
+        handler.requests.append(request)
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    handler.requests = []
+    return handler
+
+
+async def test_calls_share_one_pool_until_closed():
+    handler = _reply("ok")
+    client = GeminiClient("http://llm.test/", "key", transport=httpx.MockTransport(handler))
+
+    await client.generate({"contents": []})
+    pool = client.client
+    await client.generate({"contents": []}, model="gemini-x")
+    assert client.client is pool
+
+    assert [str(r.url) for r in handler.requests] == [
+        "http://llm.test/v1beta/models/gemini-2.5-flash:generateContent?key=key",
+        "http://llm.test/v1beta/models/gemini-x:generateContent?key=key",
+    ]
+
+    await client.aclose()
+    assert pool.is_closed
+    assert client.client is not pool
+
+
+def test_http2_needs_the_h2_package(monkeypatch):
+    monkeypatch.setattr(llm, "_http2_available", lambda: False)
+    assert GeminiClient("http://llm.test", "key", http2=True).http2 is False
+    monkeypatch.setattr(llm, "_http2_available", lambda: True)
+    assert GeminiClient("http://llm.test", "key", http2=False).http2 is False
+
+
+@pytest.fixture
+def shared_client(monkeypatch):
+    handler = _reply('{"feedback": "good"}')
+    client = GeminiClient(
+        "http://llm.test",
+        "key",
+        transport=httpx.MockTransport(handler),
+        sync_transport=httpx.MockTransport(handler),
+    )
+    monkeypatch.setattr(ai, "LLM_CLIENT", client)
+    monkeypatch.setattr(ai, "LLM_CACHE", LLMResponseCache(max_entries=0))
+    monkeypatch.setattr(learning_plan, "LLM_CLIENT", client)
+    return client, handler
+
+
+async def test_routes_use_the_shared_client(shared_client):
+    client, handler = shared_client
+    app = FastAPI()
+    app.include_router(ai.router, prefix="/api")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        for _ in range(2):
+            response = await http.post("/api/ai/tutor-insights", json={"prompt": "standups"})
+            assert response.json() == {"text": '{"feedback": "good"}', "status": "success"}
+
+    # The sync route's helper goes through the same client's sync pool
+    assert learning_plan._call_gemini({"contents": []})["candidates"]
+    assert len(handler.requests) == 3
+    await client.aclose()
+
+
+async def test_missing_key_is_reported_without_calling_out(monkeypatch):
+    handler = _reply("unused")
+    monkeypatch.setattr(ai, "LLM_CLIENT", GeminiClient("http://llm.test", None, transport=httpx.MockTransport(handler)))
+
+    with pytest.raises(ai.HTTPException) as exc:
+        await ai._call_gemini(ai.DEFAULT_MODEL, {"contents": []}, "tutor_insights")
+    assert exc.value.status_code == 500
+    assert handler.requests == []
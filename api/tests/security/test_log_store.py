@@ -0,0 +1,159 @@
+"""Tests for compact orchestrator log storage and retention."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.agents import buddy, planner, tutor
+from app.db import Base
+from app.log_retention import run_retention
+from app.log_store import TemplateCache, TemplateStore, expand_output, split_output
+from app.log_writer import OrchestratorLogWriter
+from app.models import OrchestratorLog, OrchestratorLogArchive, OrchestratorLogDaily, OrchestratorLogTemplate
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+RISK = {"blocked": False, "level": "low", "flags": [], "notes": "", "score": 0.0}
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _output(agent, message: str) -> dict:
+    response = agent.respond("ru", {"last_user_message": message, "fsm_state": "learning", "level": "B1"})
+    output = response.model_dump()
+    output["telemetry"]["risk"] = dict(RISK)
+    return output
+
+
+def _row(i: int, output: dict, created_at: datetime, risk: dict | None = None) -> dict:
+    return {
+        "id": f"log-{i}",
+        "user_id": f"user-{i % 3}",
+        "input_json": {"message": f"msg {i}"},
+        "output_json": output,
+        "risk_json": risk or output["telemetry"]["risk"],
+        "created_at": created_at,
+    }
+
+
+@pytest.mark.parametrize("agent", [tutor, buddy, planner])
+def test_split_and_expand_round_trip(agent):
+    output = _output(agent, "I have finished it yesterday")
+    template, variables = split_output(output)
+
+    assert "risk" not in template["telemetry"]
+    assert "micro_fix" not in template["learning"]
+    assert "message" not in variables and template["message"] == output["message"]
+    assert expand_output(template, variables, output["telemetry"]["risk"]) == output
+
+
+async def test_templates_are_stored_once(session_factory):
+    writer = OrchestratorLogWriter(session_factory)
+    outputs = [_output(tutor, f"message {i}") for i in range(5)]
+    for i, output in enumerate(outputs):
+        await writer.submit(_row(i, output, NOW))
+
+    with session_factory() as db:
+        assert db.scalar(select(func.count()).select_from(OrchestratorLogTemplate)) == 1
+        rows = db.execute(
+            select(
+                OrchestratorLog.output_json,
+                OrchestratorLog.template_hash,
+                OrchestratorLog.vars_json,
+                OrchestratorLog.risk_json,
+            ).order_by(OrchestratorLog.id)
+        ).all()
+        templates = TemplateCache(db)
+        assert [templates.output(*row) for row in rows] == outputs
+        assert all(row.output_json is None for row in rows)
+
+
+async def test_generated_messages_share_one_template(session_factory):
+    writer = OrchestratorLogWriter(session_factory)
+    outputs = [{**_output(tutor, "message"), "message": f"Generated reply {i}"} for i in range(5)]
+    for i, output in enumerate(outputs):
+        await writer.submit({**_row(i, output, NOW), "generated_message": True})
+
+    with session_factory() as db:
+        assert db.scalar(select(func.count()).select_from(OrchestratorLogTemplate)) == 1
+        rows = db.execute(
+            select(
+                OrchestratorLog.output_json,
+                OrchestratorLog.template_hash,
+                OrchestratorLog.vars_json,
+                OrchestratorLog.risk_json,
+            ).order_by(OrchestratorLog.id)
+        ).all()
+        templates = TemplateCache(db)
+        assert [templates.output(*row)["message"] for row in rows] == [f"Generated reply {i}" for i in range(5)]
+
+
+async def test_templated_messages_stay_in_the_template(session_factory):
+    writer = OrchestratorLogWriter(session_factory)
+    outputs = [_output(agent, f"message {i}") for i, agent in enumerate([tutor, buddy, planner, tutor])]
+    for i, output in enumerate(outputs):
+        await writer.submit({**_row(i, output, NOW), "generated_message": False})
+
+    with session_factory() as db:
+        assert db.scalar(select(func.count()).select_from(OrchestratorLogTemplate)) == 3
+        assert all("message" not in variables for variables in db.scalars(select(OrchestratorLog.vars_json)))
+        bodies = db.scalars(select(OrchestratorLogTemplate.body_json)).all()
+        assert {body["message"] for body in bodies} == {output["message"] for output in outputs}
+
+
+async def test_retention_archives_and_rolls_up(session_factory):
+    writer = OrchestratorLogWriter(session_factory)
+    blocked = {**RISK, "blocked": True, "level": "high", "flags": ["INSTRUCTION_OVERRIDE"]}
+    await writer.submit(_row(1, _output(buddy, "old"), NOW - timedelta(days=100), blocked))
+    await writer.submit(_row(2, _output(buddy, "old"), NOW - timedelta(days=100), blocked))
+    await writer.submit(_row(3, _output(tutor, "cold"), NOW - timedelta(days=40)))
+    await writer.submit(_row(4, _output(tutor, "hot"), NOW - timedelta(days=1)))
+
+    with session_factory() as db:
+        summary = run_retention(db, now=NOW, hot_days=30, retention_days=90)
+        assert summary["archived"] == 3
+        assert summary["rolled_up"] == 2
+        # The BuddyAgent template was only used by the rolled-up rows
+        assert summary["templates_deleted"] == 1
+        assert db.scalar(select(func.count()).select_from(OrchestratorLogTemplate)) == 1
+
+        assert db.scalars(select(OrchestratorLog.id)).all() == ["log-4"]
+        assert db.scalars(select(OrchestratorLogArchive.id)).all() == ["log-3"]
+        daily = db.scalars(select(OrchestratorLogDaily)).one()
+        assert (daily.agent, daily.risk_level, daily.blocked) == ("BuddyAgent", "high", True)
+        assert (daily.turns, daily.users) == (2, 2)
+        assert daily.flags_json == {"INSTRUCTION_OVERRIDE": 2}
+
+        # Running again the same day changes nothing
+        assert run_retention(db, now=NOW, hot_days=30, retention_days=90)["rolled_up"] == 0
+        assert db.scalars(select(OrchestratorLogDaily.turns)).one() == 2
+
+
+def test_template_store_rechecks_templates_retention_may_have_deleted(session_factory):
+    now = [0.0]
+    store = TemplateStore(known_ttl=60, clock=lambda: now[0])
+    row = _row(1, _output(buddy, "old"), NOW - timedelta(days=100))
+    with session_factory() as db:
+        compacted, hashes = store.compact_rows(db, [row])
+        db.execute(insert(OrchestratorLog), compacted)
+        db.commit()
+        store.remember(hashes)
+        run_retention(db, now=NOW, hot_days=30, retention_days=90)
+        assert db.scalar(select(func.count()).select_from(OrchestratorLogTemplate)) == 0
+
+        now[0] = 61
+        compacted, _ = store.compact_rows(db, [{**row, "id": "log-2", "created_at": NOW}])
+        db.execute(insert(OrchestratorLog), compacted)
+        db.commit()
+        assert db.get(OrchestratorLogTemplate, compacted[0]["template_hash"]) is not None
+
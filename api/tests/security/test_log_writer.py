@@ -0,0 +1,92 @@
+"""Tests for the write-behind orchestrator log writer."""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.log_writer import OrchestratorLogWriter
+from app.models import OrchestratorLog
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _row(i: int, user_id: str | None = "user_demo") -> dict:
+    return {
+        "id": f"log-{i}",
+        "user_id": user_id,
+        "input_json": {"message": f"msg {i}"},
+        "output_json": {},
+        "risk_json": {"blocked": False},
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _count(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(OrchestratorLog))
+
+
+async def test_writes_through_when_not_started(session_factory):
+    writer = OrchestratorLogWriter(session_factory)
+    await writer.submit(_row(1))
+    assert _count(session_factory) == 1
+
+
+async def test_batches_rows_and_flushes_on_stop(session_factory):
+    writer = OrchestratorLogWriter(session_factory, batch_size=50, flush_interval=10)
+    await writer.start()
+    for i in range(120):
+        await writer.submit(_row(i))
+    await writer.stop()
+
+    assert _count(session_factory) == 120
+    assert writer.batches == 3
+    assert writer.stats()["running"] is False
+
+
+async def test_flushes_partial_batch_after_interval(session_factory):
+    writer = OrchestratorLogWriter(session_factory, batch_size=100, flush_interval=0.01)
+    await writer.start()
+    await writer.submit(_row(1))
+    for _ in range(100):
+        if writer.written:
+            break
+        await asyncio.sleep(0.01)
+    await writer.stop()
+
+    assert writer.written == 1
+
+
+async def test_full_queue_applies_backpressure(session_factory):
+    writer = OrchestratorLogWriter(session_factory, max_queue=2, batch_size=1, flush_interval=0)
+    await writer.start()
+    await asyncio.gather(*(writer.submit(_row(i)) for i in range(10)))
+    await writer.stop()
+
+    assert writer.blocked > 0
+    assert _count(session_factory) == 10
+
+
+async def test_bad_row_does_not_drop_batch(session_factory):
+    writer = OrchestratorLogWriter(session_factory, batch_size=10, flush_interval=10)
+    await writer.start()
+    for i in range(3):
+        await writer.submit(_row(i))
+    await writer.submit(_row(99, user_id=None))  # violates NOT NULL
+    await writer.stop()
+
+    assert _count(session_factory) == 3
+    assert writer.failed == 1
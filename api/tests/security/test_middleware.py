@@ -0,0 +1,84 @@
+"""Tests for the ASGI security middlewares."""
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.config import settings
+from app.guard.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from app.guard.ratelimit import MemoryRateLimitStore
+
+
+def _token(sub: str, secret: str | None = None) -> str:
+    return jwt.encode({"sub": sub}, secret or settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+
+def _limited_app(limits: dict[str, tuple[int, int]]) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/api/{path:path}")
+    def anything(path: str):
+        return {"path": path}
+
+    app.add_middleware(RateLimitMiddleware, limits=limits, store=MemoryRateLimitStore())
+    return TestClient(app)
+
+
+def test_security_headers_on_plain_and_streaming_responses():
+    app = FastAPI()
+
+    @app.get("/plain")
+    def plain():
+        return Response("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    app.add_middleware(SecurityHeadersMiddleware)
+    client = TestClient(app)
+
+    plain_response = client.get("/plain")
+    assert plain_response.headers["X-Content-Type-Options"] == "nosniff"
+    assert plain_response.headers.get_list("X-Frame-Options") == ["DENY"]
+    assert "default-src 'self'" in plain_response.headers["Content-Security-Policy"]
+
+    stream_response = client.get("/stream")
+    assert stream_response.text == "abc"
+    assert stream_response.headers["Referrer-Policy"] == "no-referrer"
+
+
+def test_longest_prefix_wins():
+    client = _limited_app({"/api": (100, 60), "/api/ai": (1, 60)})
+
+    assert client.get("/api/ai/explain").status_code == 200
+    # The /api/ai limit is shared by every endpoint under it
+    assert client.get("/api/ai/quiz").status_code == 429
+    assert client.get("/api/courses").status_code == 200
+
+
+def test_health_is_never_limited():
+    client = _limited_app({"/api": (1, 60)})
+
+    assert all(client.get("/api/health").status_code == 200 for _ in range(3))
+
+
+def test_identity_comes_from_jwt_sub():
+    client = _limited_app({"/api/ai": (1, 60)})
+    alice = {"Authorization": f"Bearer {_token('alice')}"}
+    bob = {"Authorization": f"Bearer {_token('bob')}"}
+
+    # Same client IP, different users: separate buckets
+    assert client.get("/api/ai/explain", headers=alice).status_code == 200
+    assert client.get("/api/ai/explain", headers=bob).status_code == 200
+    assert client.get("/api/ai/explain", headers=alice).status_code == 429
+
+
+def test_forged_token_falls_back_to_ip():
+    client = _limited_app({"/api/ai": (1, 60)})
+    forged = {"Authorization": f"Bearer {_token('mallory', secret='not-the-secret')}"}
+
+    assert client.get("/api/ai/explain", headers=forged).status_code == 200
+    # No valid sub: both requests share the IP bucket
+    assert client.get("/api/ai/explain").status_code == 429
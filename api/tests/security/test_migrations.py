@@ -0,0 +1,102 @@
+"""Tests for data-moving Alembic migration steps, run on SQLite."""
+
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+import sqlalchemy as sa
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.agents import tutor
+from app.db import Base
+from app.log_store import TemplateStore
+from app.models import ConversationTurn, OrchestratorLog, User
+
+VERSIONS = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+NOW = datetime(2026, 10, 17, tzinfo=timezone.utc)
+
+
+def _migration(name: str):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(engine, step) -> None:
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            step()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__), [{"id": "u1", "name": "u1"}])
+    yield engine
+    engine.dispose()
+
+
+def test_0004_downgrade_expands_compact_rows_with_a_message_var(engine):
+    output = tutor.respond("ru", {"last_user_message": "I have went", "fsm_state": "learning"}).model_dump()
+    outputs = [output, {**output, "message": "Generated reply"}]
+    rows = [
+        {"id": f"log-{i}", "user_id": "u1", "input_json": {}, "output_json": out, "risk_json": out["telemetry"]["risk"]}
+        for i, out in enumerate(outputs)
+    ]
+    with Session(engine) as db:
+        compacted, _ = TemplateStore().compact_rows(db, rows)
+        db.execute(insert(OrchestratorLog), [{**row, "created_at": NOW} for row in compacted])
+        db.commit()
+
+    _run(engine, _migration("0004_compact_orchestrator_logs")._expand_compact_rows)
+
+    with engine.connect() as connection:
+        stored = connection.execute(select(OrchestratorLog.output_json).order_by(OrchestratorLog.id)).scalars().all()
+    assert stored == outputs
+
+
+def test_0007_downgrade_folds_turns_back_into_ring_buffers(engine):
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__), [{"id": "u2", "name": "u2"}])
+        connection.execute(
+            insert(ConversationTurn.__table__),
+            [
+                {
+                    "user_id": user_id,
+                    "turn_id": turn_id,
+                    "user_message": f"m {turn_id}",
+                    "agent": "TutorAgent",
+                    "reply": f"r {turn_id}",
+                    "created_at": float(i),
+                }
+                for i, (user_id, turn_id) in enumerate([("u1", "a"), ("u2", "x"), ("u1", "b")])
+            ],
+        )
+    migration = _migration("0007_conversation_turns")
+
+    _run(engine, migration.downgrade)
+
+    context = sa.table("conversation_context", sa.column("user_id"), sa.column("turns_json", sa.JSON))
+    with engine.connect() as connection:
+        stored = dict(connection.execute(sa.select(context.c.user_id, context.c.turns_json)).all())
+        assert "conversation_turns" not in sa.inspect(connection).get_table_names()
+    assert [turn["turn_id"] for turn in stored["u1"]] == ["a", "b"]
+    assert stored["u2"] == [
+        {"turn_id": "x", "user_message": "m x", "agent": "TutorAgent", "reply": "r x", "created_at": 1.0}
+    ]
+
+    # upgrade() reads the buffers back into one row per turn
+    _run(engine, migration.upgrade)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(ConversationTurn.user_id, ConversationTurn.turn_id).order_by(ConversationTurn.id)
+        ).all()
+    assert sorted(rows) == [("u1", "a"), ("u1", "b"), ("u2", "x")]
+
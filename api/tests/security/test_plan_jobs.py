@@ -0,0 +1,382 @@
+"""Tests for background learning-plan generation jobs."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, get_db
+from app.llm import GeminiClient
+from app.models import LearningPlan, LearningPlanJob, LearningPlanLesson, User
+from app.plan_jobs import TERMINAL_STATUSES, PlanJobRunner
+from app.routers import learning_plan
+from app.security import get_current_user
+
+REQUEST = {"plan_length": 7, "cefr_level": "B1", "goals": ["standups"]}
+
+
+def _llm_plan() -> str:
+    lessons = [{"lesson_index": i, "title": f"LLM lesson {i}", "focus_terms": [f"t{i}"]} for i in range(1, 8)]
+    return json.dumps({"persona": {"role": "dev"}, "lessons": lessons})
+
+
+class Provider:
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await self.release.wait()
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": {"message": "overloaded"}})
+        if request.url.path.endswith(":streamGenerateContent"):
+            return httpx.Response(200, content=_sse(_llm_plan()), headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": _llm_plan()}]}}]})
+
+
+def _sse(text: str, size: int = 40) -> bytes:
+    chunks = (text[i : i + size] for i in range(0, len(text), size))
+    return "".join(
+        f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': chunk}]}}]})}\r\n\r\n" for chunk in chunks
+    ).encode()
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    # A file, not StaticPool: workers, polls and requests use separate connections at once
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(User(id="u1", name="u1"))
+        db.commit()
+
+    provider = Provider()
+    runner = PlanJobRunner(factory, learning_plan._generate_plan_job, workers=1)
+    monkeypatch.setattr(learning_plan, "PLAN_JOBS", runner)
+    monkeypatch.setattr(learning_plan, "LLM_CLIENT", GeminiClient("http://llm.test", "key", transport=httpx.MockTransport(provider)))
+    monkeypatch.setattr(learning_plan.settings, "learning_plan_jobs", True)
+    monkeypatch.setattr(learning_plan.settings, "learning_plan_job_poll_s", 0.01)
+
+    def db_override():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(learning_plan.router, prefix="/api")
+    app.dependency_overrides[get_db] = db_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="u1")
+    yield app, runner, provider, factory
+    engine.dispose()
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _finished(client: httpx.AsyncClient, job_id: str) -> dict:
+    for _ in range(500):
+        job = (await client.get(f"/api/learning-plan/jobs/{job_id}")).json()
+        if job["status"] in TERMINAL_STATUSES:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def _plans(factory) -> list[tuple[int, str, str]]:
+    with factory() as db:
+        return [(p.version, p.status, p.id) for p in db.query(LearningPlan).order_by(LearningPlan.version)]
+
+
+@pytest.mark.parametrize("stream", [True, False])
+async def test_generate_returns_fallback_then_the_llm_plan_replaces_it(env, monkeypatch, stream):
+    app, runner, provider, factory = env
+    monkeypatch.setattr(learning_plan.settings, "learning_plan_stream", stream)
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        assert response["job_status"] == "queued"
+        assert len(response["fallback_plan"]["lessons"]) == 7
+
+        job = await _finished(client, response["job_id"])
+        current = (await client.get("/api/learning-plan/current")).json()
+    await runner.stop()
+
+    assert job["status"] == "succeeded" and job["progress"] == 100
+    assert job["fallback_plan_id"] == response["plan_id"]
+    assert current["plan_id"] == job["plan_id"] and current["version"] == 2
+    assert current["lessons"][0]["title"] == "LLM lesson 1"
+    assert [status for _, status, _ in _plans(factory)] == ["archived", "active"]
+
+
+async def test_provider_error_fails_the_job_and_keeps_the_fallback(env):
+    app, runner, provider, factory = env
+    provider.status = 503
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        job = await _finished(client, response["job_id"])
+    await runner.stop()
+
+    assert job["status"] == "failed"
+    assert job["error"] == "LLM provider error. Please try again later."
+    assert _plans(factory) == [(1, "active", response["plan_id"])]
+
+
+async def test_jobs_survive_a_restart_and_stale_ones_are_superseded(env):
+    app, runner, provider, factory = env
+    async with _client(app) as client:
+        # No runner yet (process down): both jobs wait in the table
+        first = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        second = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        with factory() as db:
+            # The first one was mid-run when its process died an hour ago
+            job = db.get(LearningPlanJob, first["job_id"])
+            job.status, job.attempts = "running", 1
+            job.claimed_at = datetime.now(timezone.utc) - timedelta(hours=1)
+            db.commit()
+
+        await runner.start()
+        jobs = [await _finished(client, r["job_id"]) for r in (first, second)]
+    await runner.stop()
+
+    # The newer request's fallback replaced the first one, so only the second job stores a plan
+    assert [job["status"] for job in jobs] == ["superseded", "succeeded"]
+    assert [status for _, status, _ in _plans(factory)] == ["archived", "archived", "active"]
+
+
+async def test_stop_hands_running_jobs_back_to_the_queue(env):
+    app, runner, provider, factory = env
+    provider.release.clear()
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        while provider.calls == 0:
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        with factory() as db:
+            job = db.get(LearningPlanJob, response["job_id"])
+            assert (job.status, job.attempts) == ("queued", 0)
+
+        # A restart right away (long before the claim would go stale) finishes it
+        provider.release.set()
+        await runner.start()
+        job = await _finished(client, response["job_id"])
+    await runner.stop()
+
+    assert job["status"] == "succeeded"
+
+
+async def test_sweep_picks_up_a_dead_process_job_without_a_restart(env):
+    app, runner, provider, factory = env
+    runner.stale_after, runner.sweep_every = 0.2, 0.05
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        with factory() as db:
+            # Another process claimed it and died
+            job = db.get(LearningPlanJob, response["job_id"])
+            job.status, job.attempts = "running", 1
+            job.claimed_at = datetime.now(timezone.utc)
+            db.commit()
+
+        await runner.start()
+        job = await _finished(client, response["job_id"])
+    await runner.stop()
+
+    assert job["status"] == "succeeded"
+
+
+async def test_live_claims_are_refreshed_and_not_stolen(env):
+    app, runner, provider, factory = env
+    runner.stale_after, runner.sweep_every = 0.2, 0.05
+    provider.release.clear()
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        # Several stale periods pass while the provider is still working
+        await asyncio.sleep(0.6)
+        provider.release.set()
+        job = await _finished(client, response["job_id"])
+    await runner.stop()
+
+    assert job["status"] == "succeeded"
+    assert provider.calls == 1
+    with factory() as db:
+        assert db.get(LearningPlanJob, response["job_id"]).attempts == 1
+
+
+async def test_events_stream_gives_up_after_the_timeout(env, monkeypatch):
+    app, runner, provider, factory = env
+    monkeypatch.setattr(learning_plan.settings, "learning_plan_job_events_timeout_s", 0.1)
+    async with _client(app) as client:
+        # No runner: the job never leaves the queue
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        body = (await client.get(f"/api/learning-plan/jobs/{response['job_id']}/events")).text
+
+    assert body.startswith("event: progress")
+    assert body.strip().split("\n\n")[-1].startswith("event: error")
+
+
+async def test_events_stream_progress_until_done(env):
+    app, runner, provider, factory = env
+    provider.release.clear()
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        stream = asyncio.ensure_future(client.get(f"/api/learning-plan/jobs/{response['job_id']}/events"))
+        await asyncio.sleep(0.1)
+        provider.release.set()
+        body = (await stream).text
+    await runner.stop()
+
+    events = [
+        (block.split("\n")[0].removeprefix("event: "), json.loads(block.split("\n")[1].removeprefix("data: ")))
+        for block in body.strip().split("\n\n")
+    ]
+    assert events[0][0] == "progress" and events[0][1]["status"] in {"queued", "running"}
+    assert events[-1][0] == "done" and events[-1][1]["status"] == "succeeded"
+    assert [name for name, _ in events[:-1]] == ["progress"] * (len(events) - 1)
+
+
+def _event(text: str) -> bytes:
+    return f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]})}\r\n\r\n".encode()
+
+
+class GatedStream:
+    """Streams the plan, pausing after lesson 1 until released; optionally breaks there instead."""
+
+    def __init__(self, fail_after_first: bool = False):
+        self.fail_after_first = fail_after_first
+        self.first_sent = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def body(self):
+        text = _llm_plan()
+        cut = text.index("}", text.index('"lessons"')) + 1
+        yield _event(text[:cut])
+        self.first_sent.set()
+        await self.release.wait()
+        if self.fail_after_first:
+            raise httpx.ReadError("connection reset")
+        yield _event(text[cut:])
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=self.body(), headers={"content-type": "text/event-stream"})
+
+
+@pytest.fixture
+def gated(env, monkeypatch):
+    def install(stream: GatedStream):
+        client = GeminiClient("http://llm.test", "key", transport=httpx.MockTransport(stream))
+        monkeypatch.setattr(learning_plan, "LLM_CLIENT", client)
+        return env
+
+    return install
+
+
+async def _first_lesson_stored(factory) -> list[tuple[str, int, str]]:
+    for _ in range(500):
+        with factory() as db:
+            rows = [(r.title, r.lesson_index, r.status) for r in db.query(LearningPlanLesson) if r.title.startswith("LLM")]
+        if rows:
+            return rows
+        await asyncio.sleep(0.01)
+    raise AssertionError("no streamed lesson was stored")
+
+
+async def test_lesson_one_is_usable_before_the_stream_ends(gated):
+    stream = GatedStream()
+    app, runner, _, factory = gated(stream)
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        await stream.first_sent.wait()
+        assert await _first_lesson_stored(factory) == [("LLM lesson 1", 1, "open")]
+
+        current = (await client.get("/api/learning-plan/current")).json()
+        assert current["version"] == 2 and [lesson["title"] for lesson in current["lessons"]] == ["LLM lesson 1"]
+        lesson = await client.get(f"/api/learning-plan/{current['plan_id']}/lessons/1")
+        assert lesson.status_code == 200
+        running = (await client.get(f"/api/learning-plan/jobs/{response['job_id']}")).json()
+        assert running["status"] == "running" and running["progress"] == 10 + 85 // 7
+
+        stream.release.set()
+        job = await _finished(client, response["job_id"])
+        current = (await client.get("/api/learning-plan/current")).json()
+    await runner.stop()
+
+    assert job["status"] == "succeeded" and job["plan_id"] == current["plan_id"]
+    assert [lesson["title"] for lesson in current["lessons"]] == [f"LLM lesson {i}" for i in range(1, 8)]
+
+
+async def test_broken_stream_keeps_streamed_lessons_and_fills_the_rest_from_the_fallback(gated):
+    stream = GatedStream(fail_after_first=True)
+    app, runner, _, factory = gated(stream)
+    stream.release.set()
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        job = await _finished(client, response["job_id"])
+        current = (await client.get("/api/learning-plan/current")).json()
+    await runner.stop()
+
+    fallback_titles = [lesson["title"] for lesson in response["fallback_plan"]["lessons"]]
+    assert job["status"] == "succeeded"
+    assert [lesson["title"] for lesson in current["lessons"]] == ["LLM lesson 1"] + fallback_titles[1:]
+
+
+async def test_retry_finishes_the_plan_an_interrupted_stream_started(gated):
+    stream = GatedStream()
+    app, runner, _, factory = gated(stream)
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        await stream.first_sent.wait()
+        await _first_lesson_stored(factory)
+        # The worker dies mid-stream; its claim goes back to the queue and the next start retries it
+        await runner.stop()
+        await runner.start()
+        job = await _finished(client, response["job_id"])
+        current = (await client.get("/api/learning-plan/current")).json()
+    await runner.stop()
+
+    fallback_titles = [lesson["title"] for lesson in response["fallback_plan"]["lessons"]]
+    assert job["status"] == "succeeded" and job["plan_id"] == current["plan_id"]
+    assert current["version"] == 2
+    assert [lesson["title"] for lesson in current["lessons"]] == ["LLM lesson 1"] + fallback_titles[1:]
+
+
+async def test_unexpected_error_mid_stream_still_leaves_a_complete_plan(gated, monkeypatch):
+    stream = GatedStream()
+    app, runner, _, factory = gated(stream)
+    stream.release.set()
+    progress = runner.progress
+
+    async def broken_progress(job_id, percent):
+        await progress(job_id, percent)
+        if percent > 10:
+            raise RuntimeError("bug")
+
+    monkeypatch.setattr(runner, "progress", broken_progress)
+    await runner.start()
+    async with _client(app) as client:
+        response = (await client.post("/api/learning-plan/generate", json=REQUEST)).json()
+        job = await _finished(client, response["job_id"])
+        current = (await client.get("/api/learning-plan/current")).json()
+    await runner.stop()
+
+    fallback_titles = [lesson["title"] for lesson in response["fallback_plan"]["lessons"]]
+    assert job["status"] == "failed"
+    assert [lesson["title"] for lesson in current["lessons"]] == ["LLM lesson 1"] + fallback_titles[1:]
+
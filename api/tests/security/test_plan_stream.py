@@ -0,0 +1,48 @@
+"""Tests for the incremental learning-plan parser."""
+
+import json
+
+from app.plan_stream import PlanStreamParser
+
+TRICKY = (
+    "Here is your plan:\n```json\n"
+    + json.dumps(
+        {
+            "persona": {"role": "dev", "note": "likes {braces} and [brackets]"},
+            "lessons": [
+                {"lesson_index": 1, "title": 'Say "hi" \\ {not a lesson}', "activities": [{"type": "quiz"}]},
+                {"lesson_index": 2, "title": "Стендап"},
+            ],
+            "plan_summary": "short, sweet",
+        },
+        ensure_ascii=False,
+    )
+    + "\n```"
+)
+
+
+def test_parser_yields_each_lesson_once_complete():
+    parser = PlanStreamParser()
+    lessons = []
+    seen_at = []
+    for i, char in enumerate(TRICKY):
+        for lesson in parser.feed(char):
+            lessons.append(lesson)
+            seen_at.append(i)
+
+    expected = json.loads(TRICKY[TRICKY.index("{") : TRICKY.rindex("}") + 1])
+    assert lessons == expected["lessons"]
+    # Each lesson is handed out at its own closing brace, not at the end of the document
+    assert seen_at[0] < TRICKY.index("Стендап") < seen_at[1] < TRICKY.index("plan_summary")
+    assert parser.done
+    assert parser.fields == {"persona": expected["persona"], "plan_summary": "short, sweet"}
+
+
+def test_parser_handles_arbitrary_chunking():
+    lessons = [{"lesson_index": i, "title": f"Lesson {i}"} for i in range(1, 8)]
+    text = json.dumps({"persona": {"role": "dev"}, "lessons": lessons})
+    for size in (1, 7, 64, len(text)):
+        parser = PlanStreamParser()
+        lessons = [lesson for i in range(0, len(text), size) for lesson in parser.feed(text[i : i + size])]
+        assert [lesson["lesson_index"] for lesson in lessons] == list(range(1, 8))
+        assert parser.fields == {"persona": {"role": "dev"}}
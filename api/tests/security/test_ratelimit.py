@@ -0,0 +1,194 @@
+"""Tests for the sliding-window rate limiter and its stores."""
+
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.guard.middleware import RateLimitMiddleware
+from app.guard.ratelimit import (
+    MemoryRateLimitStore,
+    RedisRateLimitStore,
+    SharedMemoryRateLimitStore,
+    SlidingWindowLimiter,
+)
+
+
+class FakeRedis:
+    """Just enough of a Redis client for RedisRateLimitStore."""
+
+    def __init__(self):
+        self.data: dict[str, int] = {}
+        self.ttl: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+    def decr(self, key):
+        with self.lock:
+            self.data[key] = self.data.get(key, 0) - 1
+            return self.data[key]
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+
+
+class FakePipeline:
+    """Queues commands and runs them under one lock, like MULTI/EXEC."""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        with self.redis.lock:
+            return [getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+@pytest.fixture(params=["memory", "shared", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryRateLimitStore()
+    elif request.param == "shared":
+        shared = SharedMemoryRateLimitStore(str(tmp_path / "ratelimit"), slots=1024)
+        yield shared
+        shared.close()
+    else:
+        yield RedisRateLimitStore(FakeRedis())
+
+
+def test_limit_within_window(store):
+    limiter = SlidingWindowLimiter(store)
+    decisions = [limiter.hit("client", 3, 60, now=1000.0 + i) for i in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[3].retry_after > 0
+
+
+def test_previous_window_is_weighted(store):
+    limiter = SlidingWindowLimiter(store)
+    # Window [960, 1020): fill the limit late in the window
+    for _ in range(10):
+        assert limiter.hit("client", 10, 60, now=1019.0).allowed
+
+    # 30s into the next window half of the previous count still applies
+    assert limiter.hit("client", 10, 60, now=1050.0).allowed
+    allowed = sum(limiter.hit("client", 10, 60, now=1050.0).allowed for _ in range(10))
+    assert allowed == 4
+
+
+def test_retry_after_is_honest(store):
+    limiter = SlidingWindowLimiter(store)
+    for _ in range(5):
+        limiter.hit("client", 5, 60, now=1000.0)
+    denied = limiter.hit("client", 5, 60, now=1000.0)
+
+    assert not denied.allowed
+    assert not limiter.hit("client", 5, 60, now=1000.0 + denied.retry_after - 1).allowed
+    assert limiter.hit("client", 5, 60, now=1000.0 + denied.retry_after).allowed
+
+
+def test_keys_are_independent(store):
+    limiter = SlidingWindowLimiter(store)
+    assert limiter.hit("a", 1, 60, now=1000.0).allowed
+    assert not limiter.hit("a", 1, 60, now=1000.0).allowed
+    assert limiter.hit("b", 1, 60, now=1000.0).allowed
+
+
+def test_memory_store_drops_idle_clients():
+    store = MemoryRateLimitStore()
+    limiter = SlidingWindowLimiter(store)
+    for i in range(1000):
+        limiter.hit(f"client-{i}", 10, 60, now=1000.0)
+
+    # Two windows later every old entry is expired and swept by new traffic
+    for i in range(200):
+        limiter.hit(f"fresh-{i}", 10, 60, now=1130.0)
+    assert len(store) == 200
+
+
+def test_shared_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "ratelimit")
+    first = SlidingWindowLimiter(SharedMemoryRateLimitStore(path, slots=1024))
+    second = SlidingWindowLimiter(SharedMemoryRateLimitStore(path, slots=1024))
+
+    assert first.hit("client", 2, 60, now=1000.0).allowed
+    assert second.hit("client", 2, 60, now=1000.0).allowed
+    assert not first.hit("client", 2, 60, now=1000.0).allowed
+
+
+def test_concurrent_hits_never_exceed_the_limit(store):
+    limiter = SlidingWindowLimiter(store)
+    start = threading.Barrier(8)
+    allowed = []
+
+    def worker():
+        start.wait()
+        allowed.extend(limiter.hit("client", 50, 60, now=1000.0).allowed for _ in range(20))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(allowed) == 50
+    # Rejected requests were taken back out: the window holds exactly the limit
+    assert store.incr("client", 16, 60) == (0, 51)
+
+
+def test_redis_store_sets_ttl():
+    redis = FakeRedis()
+    SlidingWindowLimiter(RedisRateLimitStore(redis)).hit("client", 5, 60, now=1000.0)
+    assert redis.ttl == {"rl:client:16": 120}
+
+
+def test_middleware_returns_retry_after():
+    app = FastAPI()
+
+    @app.get("/api/limited")
+    def limited():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, limits={"/api/limited": (2, 60)}, store=MemoryRateLimitStore())
+    client = TestClient(app)
+
+    assert client.get("/api/limited").status_code == 200
+    assert client.get("/api/limited").status_code == 200
+    response = client.get("/api/limited")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_middleware_calls_blocking_store_off_the_event_loop():
+    class BlockingStore(MemoryRateLimitStore):
+        blocking = True
+        threads: set[str] = set()
+
+        def incr(self, key, window_id, window):
+            self.threads.add(threading.current_thread().name)
+            return super().incr(key, window_id, window)
+
+    app = FastAPI()
+
+    @app.get("/api/limited")
+    async def limited():
+        return {"thread": threading.current_thread().name}
+
+    app.add_middleware(RateLimitMiddleware, limits={"/api/limited": (5, 60)}, store=BlockingStore())
+    loop_thread = TestClient(app).get("/api/limited").json()["thread"]
+
+    assert BlockingStore.threads and loop_thread not in BlockingStore.threads
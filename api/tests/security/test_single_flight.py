@@ -0,0 +1,93 @@
+"""Tests for single-flight coalescing of identical LLM calls."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.llm import GeminiClient, SingleFlight
+from app.llm_cache import LLMResponseCache
+from app.routers import ai
+
+BODY = {"candidates": [{"content": {"parts": [{"text": "tip"}]}}]}
+PAYLOAD = {"contents": [{"parts": [{"text": "Оцени ответ: I went home"}]}]}
+
+
+class Upstream:
+    """Mock provider that holds every call until released."""
+
+    def __init__(self, outcome=None):
+        self.calls = 0
+        self.outcome = outcome
+        self.release = asyncio.Event()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return httpx.Response(200, json=BODY)
+
+
+@pytest.fixture
+def patch_ai(monkeypatch):
+    def install(upstream: Upstream) -> SingleFlight:
+        flights = SingleFlight()
+        client = GeminiClient("http://llm.test", "key", transport=httpx.MockTransport(upstream))
+        monkeypatch.setattr(ai, "LLM_CLIENT", client)
+        # No cache: only coalescing can keep the calls down
+        monkeypatch.setattr(ai, "LLM_CACHE", LLMResponseCache(max_entries=0))
+        monkeypatch.setattr(ai, "LLM_FLIGHTS", flights)
+        return flights
+
+    return install
+
+
+async def _burst(n: int, upstream: Upstream) -> list:
+    waiters = [asyncio.ensure_future(ai._call_gemini(ai.DEFAULT_MODEL, PAYLOAD, "evaluate_diagnostic")) for _ in range(n)]
+    await asyncio.sleep(0.01)
+    upstream.release.set()
+    return await asyncio.gather(*waiters, return_exceptions=True)
+
+
+async def test_concurrent_identical_requests_make_one_upstream_call(patch_ai):
+    upstream = Upstream()
+    flights = patch_ai(upstream)
+
+    results = await _burst(50, upstream)
+
+    assert upstream.calls == 1
+    assert results == [BODY] * 50
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 49}
+
+    # Once finished, the next identical request is a new call
+    await ai._call_gemini(ai.DEFAULT_MODEL, PAYLOAD, "evaluate_diagnostic")
+    assert upstream.calls == 2
+
+
+async def test_timeout_is_delivered_to_every_waiter(patch_ai):
+    upstream = Upstream(outcome=httpx.ReadTimeout("slow provider"))
+    patch_ai(upstream)
+
+    results = await _burst(10, upstream)
+
+    assert upstream.calls == 1
+    assert all(isinstance(result, ai.HTTPException) and result.status_code == 504 for result in results)
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("k", call))
+    second = asyncio.ensure_future(flights.do("k", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    assert first.cancelled()
@@ -0,0 +1,64 @@
+"""Tests for stage timing of guard checks."""
+
+import pytest
+
+from app.guard.executor import GuardExecutor, input_check_async
+from app.guard.guard_v2 import INPUT_VERDICT_CACHE
+from app.timing import StageHistograms, StageTimer, activate, deactivate, stage
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    INPUT_VERDICT_CACHE.clear()
+    yield
+    INPUT_VERDICT_CACHE.clear()
+
+
+def test_stage_is_noop_without_timer():
+    with stage("anything"):
+        pass
+    assert stage("a") is stage("b")
+
+
+def test_stages_accumulate_and_render():
+    timer = StageTimer()
+    token = activate(timer)
+    try:
+        for _ in range(2):
+            with stage("agent"):
+                pass
+    finally:
+        deactivate(token)
+
+    assert list(timer.stages) == ["agent"]
+    header = timer.server_timing()
+    assert header.startswith("agent;dur=")
+    assert ", total;dur=" in header
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+async def test_guard_stages_come_back_from_executor(workers):
+    executor = GuardExecutor(workers=workers)
+    timer = StageTimer()
+    token = activate(timer)
+    try:
+        await input_check_async(executor, "Как сказать 'я закончил'?")
+    finally:
+        deactivate(token)
+        executor.shutdown()
+
+    assert {"guard_normalize", "guard_patterns"} <= set(timer.stages)
+
+
+def test_histogram_percentiles():
+    histograms = StageHistograms()
+    for _ in range(90):
+        histograms.record("agent", 0.0004)  # 0.4ms -> 0.5ms bucket
+    for _ in range(10):
+        histograms.record("agent", 0.030)  # 30ms -> 50ms bucket
+
+    snapshot = histograms.snapshot()["agent"]
+    assert snapshot["count"] == 100
+    assert snapshot["p50_ms"] == 0.5
+    assert snapshot["p95_ms"] == 50
+    assert snapshot["buckets"]["+Inf"] == 100